@@ -0,0 +1,6 @@
+"""
+SmartCameraスキーマパッケージ
+
+FlatBuffersコンパイラで生成したオブジェクト検出結果のクラスを提供するパッケージ
+（生成コードは名前空間SmartCameraのモジュールを参照する）
+"""
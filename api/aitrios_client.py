@@ -7,11 +7,21 @@ AITRIOSプラットフォームとの通信を担当するモジュール
 """
 
 import time
-import requests
 import base64
-import aiohttp
+import asyncio
 import settings
-import json
+import logging
+import functools
+import threading
+from utils import json_backend
+from utils.metrics import API_CALLS, API_LATENCY, TOKEN_REFRESHES
+from utils.lazy_import import lazy_import
+
+# 起動を速くするため、HTTPクライアントは最初の通信時に読み込む
+aiohttp = lazy_import("aiohttp")
+requests = lazy_import("requests")
+
+logger = logging.getLogger(__name__)
 
 # グローバル変数としてアクセストークンとその有効期限を保存
 ACCESS_TOKEN = None
@@ -21,6 +31,32 @@ TOKEN_EXPIRY = 0
 BASE_URL = "https://console.aitrios.sony-semicon.com/api/v1"
 PORTAL_URL = "https://auth.aitrios.sony-semicon.com/oauth2/default/v1/token"
 
+def track_api(endpoint):
+    """
+    API呼び出しの回数とレイテンシをメトリクスに記録するデコレーター
+    
+    Args:
+        endpoint (str): メトリクスのラベルに使用するエンドポイント名
+    
+    Returns:
+        function: 非同期メソッド用のデコレーター
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                # HTTPエラーは例外ではなくresultがERRORの応答として返される
+                outcome = "error" if isinstance(result, dict) and result.get("result") == "ERROR" else "ok"
+                return result
+            finally:
+                API_LATENCY.observe(time.perf_counter() - start, endpoint)
+                API_CALLS.inc(endpoint, outcome)
+        return wrapper
+    return decorator
+
 class AITRIOSClient:
     """AITRIOSプラットフォームとの通信を行うクライアントクラス"""
     
@@ -37,6 +73,38 @@ class AITRIOSClient:
         self.device_id = device_id
         self.client_id = client_id
         self.client_secret = client_secret
+        
+        # イベントループごとのHTTPセッション（接続プールを呼び出し間で再利用する）
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+    
+    def _get_session(self):
+        """
+        実行中のイベントループのHTTPセッションを取得（なければ作成）
+        
+        aiohttpのセッションは作成したイベントループでしか使えないため、
+        GUI・検出処理・Webサーバーのループごとに1つずつ保持する。
+        
+        Returns:
+            aiohttp.ClientSession: HTTPセッション
+        """
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                # 閉じられたループのセッションは使えないため破棄
+                for closed_loop in [other for other in self._sessions if other.is_closed()]:
+                    del self._sessions[closed_loop]
+                session = aiohttp.ClientSession()
+                self._sessions[loop] = session
+            return session
+    
+    async def close_session(self):
+        """実行中のイベントループのHTTPセッションを閉じる（ループを閉じる前に呼ぶ）"""
+        with self._sessions_lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
     
     async def get_access_token(self):
         """
@@ -60,19 +128,22 @@ class AITRIOSClient:
                 "scope": "system"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(PORTAL_URL, headers=headers, data=data) as response:
-                    if response.status == 200:
-                        token_data = await response.json()
-                        ACCESS_TOKEN = token_data["access_token"]
-                        # トークンの有効期限を設定（念のため10秒早めに期限切れとする）
-                        TOKEN_EXPIRY = current_time + token_data.get("expires_in", 3600) - 10
-                    else:
-                        response_text = await response.text()
-                        raise Exception(f"Failed to obtain access token: {response_text}")
+            session = self._get_session()
+            async with session.post(PORTAL_URL, headers=headers, data=data) as response:
+                if response.status == 200:
+                    token_data = await response.json(loads=json_backend.loads)
+                    ACCESS_TOKEN = token_data["access_token"]
+                    # トークンの有効期限を設定（念のため10秒早めに期限切れとする）
+                    TOKEN_EXPIRY = current_time + token_data.get("expires_in", 3600) - 10
+                    TOKEN_REFRESHES.inc("ok")
+                else:
+                    TOKEN_REFRESHES.inc("error")
+                    response_text = await response.text()
+                    raise Exception(f"Failed to obtain access token: {response_text}")
         
         return ACCESS_TOKEN
     
+    @track_api("get_device_info")
     async def get_device_info(self):
         """
         デバイスの情報を取得
@@ -87,13 +158,13 @@ class AITRIOSClient:
         }
         url = f"{BASE_URL}/devices/{self.device_id}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    response_text = await response.text()
-                    raise Exception(f"Failed to get device info: {response.status} - {response_text}")
+        session = self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                return await response.json(loads=json_backend.loads)
+            else:
+                response_text = await response.text()
+                raise Exception(f"Failed to get device info: {response.status} - {response_text}")
     
     async def get_connection_state(self):
         """
@@ -117,9 +188,10 @@ class AITRIOSClient:
             
             return connection_state, operation_state
         except Exception as e:
-            print(f"Error getting connection state: {str(e)}")
+            logger.warning("Error getting connection state: %s", e)
             return "Unknown", "Unknown"
     
+    @track_api("get_image_directories")
     async def get_image_directories(self):
         """
         デバイスの画像ディレクトリ一覧を取得
@@ -135,11 +207,12 @@ class AITRIOSClient:
         url = f"{BASE_URL}/devices/images/directories"
         params = {"device_id": self.device_id}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                print("response=", response.status)
-                return await response.json()
+        session = self._get_session()
+        async with session.get(url, headers=headers, params=params) as response:
+            logger.debug("Image directories response status: %s", response.status)
+            return await response.json(loads=json_backend.loads)
     
+    @track_api("get_images")
     async def get_images(self, sub_directory_name, file_name=None):
         """
         指定したサブディレクトリから画像を取得
@@ -159,10 +232,12 @@ class AITRIOSClient:
         url = f"{BASE_URL}/devices/{self.device_id}/images/directories/{sub_directory_name}"
         params = {"order_by": "DESC", "number_of_images": 1}  # 最新の画像を1つだけ取得
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                return await response.json()
+        session = self._get_session()
+        async with session.get(url, headers=headers, params=params) as response:
+            # Base64の画像は高速なJSONバックエンドでデコード（msgspecの場合はbytes）
+            return json_backend.decode_images(await response.read())
     
+    @track_api("get_inference_results")
     async def get_inference_results(self, number_of_inference_results=5, filter=None):
         """
         デバイスの推論結果を取得
@@ -188,10 +263,12 @@ class AITRIOSClient:
         if filter:
             params["filter"] = filter
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                return await response.json()
-        
+        session = self._get_session()
+        async with session.get(url, headers=headers, params=params) as response:
+            # Base64の推論結果は高速なJSONバックエンドでデコード（msgspecの場合はbytes）
+            return json_backend.decode_inference_results(await response.read())
+    
+    @track_api("start_inference")
     async def start_inference(self):
         """
         デバイスの推論処理を開始する
@@ -206,14 +283,15 @@ class AITRIOSClient:
         }
         url = f"{BASE_URL}/devices/{self.device_id}/inferenceresults/collectstart"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    response_text = await response.text()
-                    raise Exception(f"Failed to start inference: {response.status} - {response_text}")
+        session = self._get_session()
+        async with session.post(url, headers=headers) as response:
+            if response.status == 200:
+                return await response.json(loads=json_backend.loads)
+            else:
+                response_text = await response.text()
+                raise Exception(f"Failed to start inference: {response.status} - {response_text}")
     
+    @track_api("stop_inference")
     async def stop_inference(self):
         """
         デバイスの推論処理を停止する
@@ -228,15 +306,16 @@ class AITRIOSClient:
         }
         url = f"{BASE_URL}/devices/{self.device_id}/inferenceresults/collectstop"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    response_text = await response.text()
-                    raise Exception(f"Failed to stop inference: {response.status} - {response_text}")
+        session = self._get_session()
+        async with session.post(url, headers=headers) as response:
+            if response.status == 200:
+                return await response.json(loads=json_backend.loads)
+            else:
+                response_text = await response.text()
+                raise Exception(f"Failed to stop inference: {response.status} - {response_text}")
     
     # コマンドパラメーターファイル一覧を取得するメソッド
+    @track_api("get_command_parameter_files")
     async def get_command_parameter_files(self):
         """
         Consoleに登録されているコマンドパラメーターファイル一覧を取得
@@ -251,14 +330,15 @@ class AITRIOSClient:
         }
         url = f"{BASE_URL}/command_parameter_files"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    response_text = await response.text()
-                    raise Exception(f"Failed to get command parameter files: {response.status} - {response_text}")
+        session = self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                return await response.json(loads=json_backend.loads)
+            else:
+                response_text = await response.text()
+                raise Exception(f"Failed to get command parameter files: {response.status} - {response_text}")
     
+    @track_api("unbind_command_parameter_file")
     async def unbind_command_parameter_file(self, file_name, device_ids):
         """
         デバイスからコマンドパラメーターファイルをアンバインド
@@ -271,9 +351,9 @@ class AITRIOSClient:
             Dict[str, Any]: API応答
         """
         if not device_ids:
-            print(f"No device IDs provided for unbinding from {file_name}")
+            logger.info("No device IDs provided for unbinding from %s", file_name)
             return {"result": "SUCCESS", "message": "No devices to unbind"}
-            
+        
         token = await self.get_access_token()
         
         # 正しいエンドポイントとURLを使用
@@ -290,27 +370,28 @@ class AITRIOSClient:
             "Content-Type": "application/json"
         }
         
-        print(f"Unbinding command parameter file {file_name} from devices: {device_ids}")
+        logger.info("Unbinding command parameter file %s from devices: %s", file_name, device_ids)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # DELETEメソッドでJSONデータを送信
-                async with session.delete(url, headers=headers, json=data) as response:
-                    # 200または404なら成功 (404はファイルが存在しない場合)
-                    if response.status == 200 or response.status == 404:
-                        try:
-                            return await response.json()
-                        except:
-                            return {"result": "SUCCESS"}
-                    else:
-                        # エラーメッセージを記録するが例外は発生させない
-                        response_text = await response.text()
-                        print(f"Failed to unbind command parameter file: {response.status} - {response_text}")
-                        return {"result": "ERROR", "message": f"Unbind failed: {response_text}"}
+            session = self._get_session()
+            # DELETEメソッドでJSONデータを送信
+            async with session.delete(url, headers=headers, json=data) as response:
+                # 200または404なら成功 (404はファイルが存在しない場合)
+                if response.status == 200 or response.status == 404:
+                    try:
+                        return await response.json(loads=json_backend.loads)
+                    except:
+                        return {"result": "SUCCESS"}
+                else:
+                    # エラーメッセージを記録するが例外は発生させない
+                    response_text = await response.text()
+                    logger.error("Failed to unbind command parameter file: %s - %s", response.status, response_text)
+                    return {"result": "ERROR", "message": f"Unbind failed: {response_text}", "status": response.status}
         except Exception as e:
-            print(f"Exception in unbind_command_parameter_file: {str(e)}")
-            return {"result": "ERROR", "message": f"Exception: {str(e)}"}
+            logger.exception("Exception in unbind_command_parameter_file: %s", e)
+            return {"result": "ERROR", "message": f"Exception: {str(e)}", "status": None}
     
+    @track_api("update_command_parameter_file")
     async def update_command_parameter_file(self, file_name, comment, contents):
         """
         既存のコマンドパラメーターファイルを更新
@@ -336,23 +417,24 @@ class AITRIOSClient:
             "comment": comment
         }
         
-        print(f"Updating command parameter file: {file_name}")
-        print(f"Parameter length: {len(contents)}")
+        logger.info("Updating command parameter file: %s", file_name)
+        logger.debug("Parameter length: %d", len(contents))
         
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(url, headers=headers, json=data) as response:
-                response_text = await response.text()
-                print(f"Update response status: {response.status}, body: {response_text}")
-                
-                if response.status == 200:
-                    try:
-                        return json.loads(response_text)
-                    except:
-                        return {"result": "SUCCESS"}
-                else:
-                    print(f"Failed to update command parameter file: {response.status} - {response_text}")
-                    return {"result": "ERROR", "message": f"Update failed: {response_text}"}
+        session = self._get_session()
+        async with session.patch(url, headers=headers, json=data) as response:
+            response_text = await response.text()
+            logger.debug("Update response status: %s, body: %s", response.status, response_text)
+            
+            if response.status == 200:
+                try:
+                    return json_backend.loads(response_text)
+                except:
+                    return {"result": "SUCCESS"}
+            else:
+                logger.error("Failed to update command parameter file: %s - %s", response.status, response_text)
+                return {"result": "ERROR", "message": f"Update failed: {response_text}", "status": response.status}
     
+    @track_api("bind_command_parameter_file")
     async def bind_command_parameter_file(self, file_name, device_ids):
         """
         コマンドパラメーターファイルをデバイスにバインド
@@ -365,9 +447,9 @@ class AITRIOSClient:
             Dict[str, Any]: API応答
         """
         if not device_ids:
-            print(f"No device IDs provided for binding to {file_name}")
+            logger.info("No device IDs provided for binding to %s", file_name)
             return {"result": "SUCCESS", "message": "No devices to bind"}
-            
+        
         token = await self.get_access_token()
         
         # 正しいエンドポイントと形式
@@ -384,23 +466,23 @@ class AITRIOSClient:
             "Content-Type": "application/json"
         }
         
-        print(f"Binding command parameter file {file_name} to devices: {device_ids}")
+        logger.info("Binding command parameter file %s to devices: %s", file_name, device_ids)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # PUTメソッドでJSONデータを送信
-                async with session.put(url, headers=headers, json=data) as response:
-                    response_text = await response.text()
-                    print(f"Bind response status: {response.status}, body: {response_text}")
-                    
-                    if response.status == 200:
-                        try:
-                            return json.loads(response_text)
-                        except:
-                            return {"result": "SUCCESS"}
-                    else:
-                        print(f"Failed to bind command parameter file: {response.status} - {response_text}")
-                        return {"result": "ERROR", "message": f"Bind failed: {response_text}"}
+            session = self._get_session()
+            # PUTメソッドでJSONデータを送信
+            async with session.put(url, headers=headers, json=data) as response:
+                response_text = await response.text()
+                logger.debug("Bind response status: %s, body: %s", response.status, response_text)
+                
+                if response.status == 200:
+                    try:
+                        return json_backend.loads(response_text)
+                    except:
+                        return {"result": "SUCCESS"}
+                else:
+                    logger.error("Failed to bind command parameter file: %s - %s", response.status, response_text)
+                    return {"result": "ERROR", "message": f"Bind failed: {response_text}", "status": response.status}
         except Exception as e:
-            print(f"Exception in bind_command_parameter_file: {str(e)}")
-            return {"result": "ERROR", "message": f"Exception: {str(e)}"}
\ No newline at end of file
+            logger.exception("Exception in bind_command_parameter_file: %s", e)
+            return {"result": "ERROR", "message": f"Exception: {str(e)}", "status": None}
\ No newline at end of file
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+デシリアライズのリグレッションベンチマーク
+推論結果のデシリアライズを大量に繰り返し、sys.pathの長さがフレーム数に対して一定であることを確認する
+（1回あたりの処理時間は実行環境の負荷で変動するため参考値として表示し、--strict-timing指定時のみ判定に使う）
+
+使い方:
+    python benchmarks/deserialize_benchmark.py --frames 2000000 --rounds 10
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# プロジェクトルートをパスに追加（起動時に1回のみ）
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import flatbuffers
+from SmartCamera import BoundingBox2d, GeneralObject, ObjectDetectionData, ObjectDetectionTop
+from SmartCamera.BoundingBox import BoundingBox
+from core.detection_processor import DetectionProcessor
+
+def build_sample(num_objects=5):
+    """
+    ベンチマーク用の推論結果（FlatBuffers）を生成
+    
+    Args:
+        num_objects (int): 検出オブジェクト数
+    
+    Returns:
+        bytes: FlatBuffersでシリアライズされたデータ
+    """
+    builder = flatbuffers.Builder(1024)
+    
+    objects = []
+    for i in range(num_objects):
+        BoundingBox2d.Start(builder)
+        BoundingBox2d.AddLeft(builder, 10 * i)
+        BoundingBox2d.AddTop(builder, 20 * i)
+        BoundingBox2d.AddRight(builder, 10 * i + 50)
+        BoundingBox2d.AddBottom(builder, 20 * i + 80)
+        box = BoundingBox2d.End(builder)
+        
+        GeneralObject.Start(builder)
+        GeneralObject.AddClassId(builder, i % 3)
+        GeneralObject.AddBoundingBoxType(builder, BoundingBox.BoundingBox2d)
+        GeneralObject.AddBoundingBox(builder, box)
+        GeneralObject.AddScore(builder, 0.5 + i / (2 * num_objects))
+        objects.append(GeneralObject.End(builder))
+    
+    ObjectDetectionData.StartObjectDetectionListVector(builder, len(objects))
+    for obj in reversed(objects):
+        builder.PrependUOffsetTRelative(obj)
+    object_list = builder.EndVector()
+    
+    ObjectDetectionData.Start(builder)
+    ObjectDetectionData.AddObjectDetectionList(builder, object_list)
+    perception = ObjectDetectionData.End(builder)
+    
+    ObjectDetectionTop.Start(builder)
+    ObjectDetectionTop.AddPerception(builder, perception)
+    builder.Finish(ObjectDetectionTop.End(builder))
+    return bytes(builder.Output())
+
+def parse_args():
+    """コマンドライン引数をパース"""
+    parser = argparse.ArgumentParser(description='デシリアライズのリグレッションベンチマーク')
+    parser.add_argument('--frames', type=int, default=200000, help='デシリアライズする合計フレーム数')
+    parser.add_argument('--rounds', type=int, default=10, help='計測を区切る回数')
+    parser.add_argument('--objects', type=int, default=5, help='1フレームあたりの検出オブジェクト数')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='前半の区間に対して許容する後半の区間の処理時間の増加率（中央値で比較）')
+    parser.add_argument('--strict-timing', action='store_true',
+                        help='処理時間の増加率が許容値を超えた場合も失敗とする（通常は警告のみ）')
+    return parser.parse_args()
+
+def main():
+    """ベンチマークのエントリーポイント"""
+    args = parse_args()
+    buf = build_sample(args.objects)
+    processor = DetectionProcessor(None, ["class0", "class1", "class2"])
+    
+    # 遅延インポートを済ませてから計測
+    assert len(processor.deserialize_flatbuffers(buf)) == args.objects
+    
+    per_round = max(1, args.frames // args.rounds)
+    initial_path_length = len(sys.path)
+    timings = []
+    
+    print(f"frames={per_round * args.rounds} objects={args.objects} rounds={args.rounds}")
+    for round_index in range(args.rounds):
+        start = time.perf_counter()
+        for _ in range(per_round):
+            processor.deserialize_flatbuffers(buf)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed / per_round)
+        print(f"round {round_index + 1:3d}: {timings[-1] * 1e6:8.2f} us/frame  sys.path={len(sys.path)}")
+    
+    # 計測のばらつきを抑えるため、前半と後半の区間の中央値を比較（参考値）
+    half = max(1, len(timings) // 2)
+    growth = statistics.median(timings[-half:]) / statistics.median(timings[:half]) - 1
+    path_growth = len(sys.path) - initial_path_length
+    print(f"per-frame change: {growth * 100:+.1f}%  sys.path change: {path_growth:+d}")
+    
+    # sys.pathの増加は処理時間と違い環境に左右されないため、これのみで判定する
+    if path_growth != 0:
+        print("FAIL: sys.path grows with the number of frames")
+        return 1
+    if growth > args.tolerance:
+        print(f"WARN: per-frame time grew by more than {args.tolerance * 100:.0f}% (timing is informational)")
+        if args.strict_timing:
+            return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+パラメーター適用ジャーナルモジュール
+コマンドパラメーターの適用をトランザクションとして記録し、中断時の再開・取り消しに使用する
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ジャーナルファイルのデフォルトの保存先
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".kumadt", "apply_journal.json")
+
+# トランザクションの状態
+STATE_STARTED = "started"            # 開始（まだデバイスをアンバインドしていない）
+STATE_UNBOUND = "unbound"            # デバイスをアンバインド済み
+STATE_UPDATED = "updated"            # ファイルを更新済み
+STATE_ROLLING_BACK = "rolling_back"  # ロールバック中
+STATE_COMMITTED = "committed"        # 完了
+STATE_ROLLED_BACK = "rolled_back"    # ロールバック完了
+STATE_FAILED = "failed"              # ロールバックできずに失敗（手動での確認が必要）
+
+# 完了しており、ジャーナルから削除してよい状態
+FINISHED_STATES = (STATE_COMMITTED, STATE_ROLLED_BACK)
+
+class ApplyJournal:
+    """パラメーター適用のトランザクションを記録するジャーナル"""
+    
+    def __init__(self, path=None):
+        """
+        ジャーナルの初期化
+        
+        Args:
+            path (str, optional): ジャーナルを保存するファイルのパス（省略時はメモリ上のみ）
+        """
+        self.path = path
+        self.transactions = {}
+        if path:
+            self._load()
+    
+    def begin(self, file_name, device_ids, previous_parameter, new_parameter):
+        """
+        トランザクションを開始
+        
+        Args:
+            file_name (str): パラメーターファイル名
+            device_ids (list): 対象のデバイスIDのリスト
+            previous_parameter (dict): 適用前のファイルの内容（不明な場合はNone）
+            new_parameter (dict): 適用するファイルの内容
+        
+        Returns:
+            dict: トランザクション
+        """
+        transaction = {
+            "id": uuid.uuid4().hex,
+            "file_name": file_name,
+            "device_ids": list(device_ids),
+            "previous_parameter": previous_parameter,
+            "new_parameter": new_parameter,
+            "state": STATE_STARTED,
+            "bound_device_ids": [],
+            "error": "",
+            "started_at": time.time(),
+            "updated_at": time.time()
+        }
+        self.transactions[transaction["id"]] = transaction
+        self._save()
+        return transaction
+    
+    def update(self, transaction, **changes):
+        """
+        トランザクションの状態を更新
+        
+        Args:
+            transaction (dict): トランザクション
+            **changes: 更新する項目
+        """
+        transaction.update(changes)
+        transaction["updated_at"] = time.time()
+        if transaction["state"] in FINISHED_STATES:
+            self.transactions.pop(transaction["id"], None)
+            logger.info("Transaction %s for file %s finished: %s", transaction["id"], transaction["file_name"], transaction["state"])
+        self._save()
+    
+    def pending(self):
+        """
+        完了していないトランザクションを取得
+        
+        Returns:
+            list: トランザクションのリスト（開始順）
+        """
+        return sorted(self.transactions.values(), key=lambda transaction: transaction["started_at"])
+    
+    def discard(self, transaction):
+        """
+        トランザクションをジャーナルから削除（手動で対応した場合など）
+        
+        Args:
+            transaction (dict): トランザクション
+        """
+        self.transactions.pop(transaction["id"], None)
+        self._save()
+    
+    def _load(self):
+        """ジャーナルファイルを読み込む"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.transactions = {transaction["id"]: transaction for transaction in data.get("transactions", [])}
+            if self.transactions:
+                logger.warning("Found %d unfinished parameter apply transactions in %s", len(self.transactions), self.path)
+        except Exception as e:
+            logger.error("Failed to load apply journal from %s: %s", self.path, e)
+    
+    def _save(self):
+        """ジャーナルファイルに保存"""
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            
+            # 書き込み途中で中断しても壊れないよう、一時ファイルに書いてから置き換える
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"transactions": list(self.transactions.values())}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error("Failed to save apply journal to %s: %s", self.path, e)
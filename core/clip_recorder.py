@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+クリップ録画モジュール
+対象クラスを検出したときに、検出の前後N秒のフレームを動画ファイル（MP4・MJPEG-AVI）に書き出す
+
+直前のフレームはデバイスごとにJPEGのままリングバッファに保持し、保持量は
+フレーム数ではなくバイト数で制限する（Mode 0/1/2でフレームの大きさが大きく異なるため）。
+フレームのエンコードと動画の書き出しはバックグラウンドのスレッドで行い、検出処理は待たせない。
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.image_utils import encode_jpeg
+from utils.lazy_import import lazy_import
+from utils.metrics import CLIPS, STAGE_SECONDS
+from utils.overlay_renderer import OverlayRenderer
+
+# 起動を速くするため、OpenCVとNumPyは最初の使用時に読み込む
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# 動画の形式ごとの拡張子とFourCC
+CLIP_FORMATS = {
+    "mp4": (".mp4", "mp4v"),
+    "avi": (".avi", "MJPG"),
+}
+
+# デフォルトの録画設定
+DEFAULT_PRE_SECONDS = 10
+DEFAULT_POST_SECONDS = 10
+DEFAULT_BUFFER_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_CLIP_SECONDS = 120
+DEFAULT_CLIP_FPS = 5
+DEFAULT_MIN_SCORE = 0.5
+
+# バックグラウンドスレッドに渡すイベントの最大数（超えた分のフレームは破棄）
+EVENT_QUEUE_SIZE = 64
+
+class FrameRingBuffer:
+    """エンコード済みのフレームを合計バイト数の上限まで保持するリングバッファ"""
+    
+    def __init__(self, max_bytes=DEFAULT_BUFFER_BYTES):
+        """
+        リングバッファの初期化
+        
+        Args:
+            max_bytes (int): 保持するJPEGの合計バイト数の上限
+        """
+        self.max_bytes = max_bytes
+        self.frames = deque()
+        self.total_bytes = 0
+    
+    def append(self, timestamp, jpeg):
+        """
+        フレームを追加し、上限を超えた分を古いものから破棄
+        
+        Args:
+            timestamp (float): フレームの受信時刻（time.monotonic）
+            jpeg (bytes): JPEGのバイト列
+        """
+        self.frames.append((timestamp, jpeg))
+        self.total_bytes += len(jpeg)
+        # 最新のフレームは上限を超えていても残す
+        while self.total_bytes > self.max_bytes and len(self.frames) > 1:
+            _, evicted = self.frames.popleft()
+            self.total_bytes -= len(evicted)
+    
+    def since(self, timestamp):
+        """
+        指定した時刻以降のフレームを取得
+        
+        Args:
+            timestamp (float): 開始時刻（time.monotonic）
+        
+        Returns:
+            list: (時刻, JPEGのバイト列)のリスト（古い順）
+        """
+        return [frame for frame in self.frames if frame[0] >= timestamp]
+
+class ClipRecorder:
+    """対象クラスの検出時に前後のフレームを動画ファイルに書き出すクラス"""
+    
+    def __init__(self, processor, output_dir, target_classes, pre_seconds=DEFAULT_PRE_SECONDS,
+                 post_seconds=DEFAULT_POST_SECONDS, buffer_bytes=DEFAULT_BUFFER_BYTES, clip_format="mp4",
+                 fps=DEFAULT_CLIP_FPS, min_score=DEFAULT_MIN_SCORE, max_clip_seconds=DEFAULT_MAX_CLIP_SECONDS):
+        """
+        クリップ録画の初期化
+        
+        Args:
+            processor (DetectionProcessor): フレームと推論結果を提供する検出プロセッサ
+            output_dir (str): クリップの保存先ディレクトリ
+            target_classes (list): 録画を開始するクラス名のリスト
+            pre_seconds (float): 検出前に含める秒数
+            post_seconds (float): 最後の検出後に含める秒数
+            buffer_bytes (int): デバイスごとのリングバッファ（と録画中のクリップ）の合計バイト数の上限
+            clip_format (str): 動画の形式（"mp4", "avi"）
+            fps (float): 書き出す動画のフレームレート（フレームを複製・間引いて実時間に合わせる）
+            min_score (float): 録画を開始する検出の最小スコア
+            max_clip_seconds (float): 検出が続く場合のクリップの最大秒数
+        """
+        if clip_format not in CLIP_FORMATS:
+            raise ValueError(f"Unsupported clip format: {clip_format}")
+        
+        self.processor = processor
+        self.output_dir = output_dir
+        self.target_classes = set(target_classes)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.buffer_bytes = buffer_bytes
+        self.clip_format = clip_format
+        self.fps = fps
+        self.min_score = min_score
+        self.max_clip_seconds = max_clip_seconds
+        
+        # デバイスごとのリングバッファと録画中のクリップ（バックグラウンドスレッドでのみ操作）
+        self.buffers = {}
+        self.active_clips = {}
+        
+        # 検出プロセッサからのイベントを受け取るキューと、動画を書き出すスレッド
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.writer = None
+        self.thread = None
+        self.dropped_frames = 0
+    
+    def start(self):
+        """バックグラウンドスレッドを起動して検出プロセッサのリスナーに登録"""
+        if self.thread is not None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-writer")
+        self.thread = threading.Thread(target=self._run, name="clip-recorder", daemon=True)
+        self.thread.start()
+        self.processor.add_detection_listener(self.on_batch)
+        self.processor.add_frame_listener(self.on_frame)
+    
+    def stop(self, timeout=10.0):
+        """
+        リスナーを解除し、録画中のクリップを書き出してから終了
+        
+        Args:
+            timeout (float): 終了を待つ最大時間（秒）
+        """
+        if self.thread is None:
+            return
+        self.processor.remove_detection_listener(self.on_batch)
+        self.processor.remove_frame_listener(self.on_frame)
+        # 終了の通知はキューが一杯の場合も空くまで待って渡す
+        try:
+            self.events.put(("stop", None, None), timeout=timeout)
+        except queue.Full:
+            logger.warning("Clip recorder did not stop in time; the active clip may be lost")
+        self.thread.join(timeout)
+        self.writer.shutdown(wait=True)
+        self.thread = None
+    
+    def _get_device_id(self):
+        """検出プロセッサが処理しているデバイスのIDを取得"""
+        return getattr(self.processor.aitrios_client, "device_id", "") or "device"
+    
+    def _put_event(self, event):
+        """
+        イベントをキューに追加（一杯の場合は破棄して検出処理を待たせない）
+        
+        Args:
+            event (tuple): (種類, デバイスID, データ)
+        
+        Returns:
+            bool: 追加できた場合はTrue
+        """
+        try:
+            self.events.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+    
+    def on_batch(self, timestamps, batch):
+        """
+        推論結果のバッチから対象クラスの検出を探す（検出プロセッサのリスナー、処理スレッドから呼ばれる）
+        
+        Args:
+            timestamps (list): フレームのタイムスタンプのリスト
+            batch (numpy.ndarray): BATCH_DTYPEの配列
+        """
+        if not len(batch):
+            return
+        
+        objclass = self.processor.objclass
+        detected = set()
+        for class_id in np.unique(batch["class_id"][batch["score"] >= self.min_score]).tolist():
+            class_name = OverlayRenderer.get_class_name(class_id, objclass)
+            if class_name in self.target_classes:
+                detected.add(class_name)
+        
+        if detected and not self._put_event(("trigger", self._get_device_id(), (time.monotonic(), sorted(detected)))):
+            logger.warning("Clip recorder queue is full; trigger for %s was dropped", sorted(detected))
+    
+    def on_frame(self, frame_key, image, detection_labels):
+        """
+        表示したフレームをバックグラウンドスレッドに渡す（検出プロセッサのリスナー、処理スレッドから呼ばれる）
+        
+        Args:
+            frame_key (tuple): フレームの識別キー
+            image (numpy.ndarray): バウンディングボックスを描画した画像（共有されるため変更しない）
+            detection_labels (list): 検出ラベルのリスト
+        """
+        if not self._put_event(("frame", self._get_device_id(), (time.monotonic(), image))):
+            self.dropped_frames += 1
+    
+    def _run(self):
+        """イベントを処理するバックグラウンドスレッド"""
+        while True:
+            try:
+                kind, device_id, data = self.events.get(timeout=1.0)
+            except queue.Empty:
+                # フレームが届かなくても、検出後の秒数が過ぎたクリップは書き出す
+                self._finish_expired(time.monotonic())
+                continue
+            
+            try:
+                if kind == "stop":
+                    for device_id in list(self.active_clips):
+                        self._finish_clip(device_id)
+                    return
+                if kind == "frame":
+                    self._add_frame(device_id, *data)
+                elif kind == "trigger":
+                    self._trigger(device_id, *data)
+                self._finish_expired(time.monotonic())
+            except Exception:
+                logger.exception("クリップ録画の処理でエラーが発生しました")
+    
+    def _add_frame(self, device_id, timestamp, image):
+        """
+        フレームをJPEGにエンコードしてリングバッファと録画中のクリップに追加
+        
+        Args:
+            device_id (str): デバイスID
+            timestamp (float): フレームの受信時刻
+            image (numpy.ndarray): フレームの画像
+        """
+        with STAGE_SECONDS.time("clip_encode"):
+            jpeg = encode_jpeg(image)
+        if jpeg is None:
+            return
+        
+        buffer = self.buffers.get(device_id)
+        if buffer is None:
+            buffer = self.buffers[device_id] = FrameRingBuffer(self.buffer_bytes)
+        buffer.append(timestamp, jpeg)
+        
+        clip = self.active_clips.get(device_id)
+        if clip is not None:
+            clip["frames"].append((timestamp, jpeg))
+            clip["bytes"] += len(jpeg)
+            # 録画中のクリップもリングバッファと同じバイト数を上限とする
+            if clip["bytes"] >= self.buffer_bytes:
+                logger.info("Clip for %s reached the byte budget; writing it now", device_id)
+                self._finish_clip(device_id)
+    
+    def _trigger(self, device_id, timestamp, class_names):
+        """
+        対象クラスの検出で録画を開始（録画中であれば終了時刻を延長）
+        
+        Args:
+            device_id (str): デバイスID
+            timestamp (float): 検出した時刻
+            class_names (list): 検出した対象クラス名のリスト
+        """
+        clip = self.active_clips.get(device_id)
+        if clip is not None:
+            clip["end"] = min(timestamp + self.post_seconds, clip["start"] + self.max_clip_seconds)
+            clip["classes"].update(class_names)
+            return
+        
+        buffer = self.buffers.get(device_id)
+        frames = buffer.since(timestamp - self.pre_seconds) if buffer is not None else []
+        start = frames[0][0] if frames else timestamp
+        self.active_clips[device_id] = {
+            "start": start,
+            "end": min(timestamp + self.post_seconds, start + self.max_clip_seconds),
+            "started_at": datetime.now(),
+            "classes": set(class_names),
+            "frames": list(frames),
+            "bytes": sum(len(jpeg) for _, jpeg in frames)
+        }
+        logger.info("Recording clip for %s (%s)", device_id, ", ".join(class_names))
+    
+    def _finish_expired(self, now):
+        """
+        検出後の秒数が過ぎたクリップを書き出す
+        
+        Args:
+            now (float): 現在時刻（time.monotonic）
+        """
+        for device_id, clip in list(self.active_clips.items()):
+            if now >= clip["end"]:
+                self._finish_clip(device_id)
+    
+    def _finish_clip(self, device_id):
+        """
+        録画中のクリップを書き出しスレッドに渡す
+        
+        Args:
+            device_id (str): デバイスID
+        """
+        clip = self.active_clips.pop(device_id, None)
+        if clip is None or not clip["frames"]:
+            return
+        
+        extension, _ = CLIP_FORMATS[self.clip_format]
+        classes = "-".join(sorted(clip["classes"])).replace(" ", "_")
+        file_name = f"{device_id}_{clip['started_at'].strftime('%Y%m%d_%H%M%S')}_{classes}{extension}"
+        self.writer.submit(self._write_clip, os.path.join(self.output_dir, file_name), clip["frames"])
+    
+    def _write_clip(self, path, frames):
+        """
+        フレームを動画ファイルに書き出す（書き出しスレッドで実行）
+        
+        フレームの間隔は一定でないため、動画のフレームを最初のフレームからk / fps秒の時刻に割り当て、
+        各時刻までに届いた最新のフレームを書き出して実時間に合わせる（間隔が広い場合は複製し、狭い場合は間引く）。
+        フレームサイズが途中で変わった場合は最初のフレームのサイズに合わせる。
+        
+        Args:
+            path (str): 保存先のパス
+            frames (list): (時刻, JPEGのバイト列)のリスト
+        """
+        _, fourcc = CLIP_FORMATS[self.clip_format]
+        temp_path = f"{path}.part{os.path.splitext(path)[1]}"
+        writer = None
+        written = 0
+        try:
+            with STAGE_SECONDS.time("clip_write"):
+                start = frames[0][0]
+                slot_count = int((frames[-1][0] - start) * self.fps) + 1
+                index = 0
+                decoded_index = -1
+                image = None
+                for slot in range(slot_count):
+                    # この時刻までに届いた最新のフレームを選ぶ
+                    slot_time = start + slot / self.fps
+                    while index + 1 < len(frames) and frames[index + 1][0] <= slot_time:
+                        index += 1
+                    
+                    # 選んだフレームが変わった場合のみデコードする（間引いたフレームはデコードしない）
+                    if index != decoded_index:
+                        decoded_index = index
+                        decoded = cv2.imdecode(np.frombuffer(frames[index][1], np.uint8), cv2.IMREAD_COLOR)
+                        if decoded is not None:
+                            image = decoded
+                            if writer is None:
+                                size = (image.shape[1], image.shape[0])
+                                writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*fourcc), self.fps, size)
+                                if not writer.isOpened():
+                                    raise RuntimeError(f"VideoWriter could not open {temp_path} ({fourcc})")
+                            elif (image.shape[1], image.shape[0]) != size:
+                                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                    
+                    if image is not None:
+                        writer.write(image)
+                        written += 1
+            
+            if writer is None:
+                return
+            writer.release()
+            writer = None
+            os.replace(temp_path, path)
+            CLIPS.inc("ok")
+            logger.info("Saved clip %s (%d frames, %d video frames)", path, len(frames), written)
+            self.processor.notify_status("クリップを保存しました: %s", path)
+        except Exception as e:
+            CLIPS.inc("error")
+            logger.error("Failed to write clip %s: %s", path, e)
+        finally:
+            if writer is not None:
+                writer.release()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -6,28 +6,143 @@
 AITRIOSデバイスのコマンドパラメーターを管理する
 """
 
+import os
 import json
 import base64
+import hashlib
 import time
+import asyncio
+import functools
 import logging
+import random
 from typing import Dict, Any, List, Optional, Tuple
 
+from core.apply_journal import (
+    ApplyJournal, STATE_UNBOUND, STATE_UPDATED, STATE_ROLLING_BACK, STATE_COMMITTED, STATE_ROLLED_BACK, STATE_FAILED
+)
+
+logger = logging.getLogger(__name__)
+
+# 一括適用でのAPI呼び出しの最大同時実行数
+DEFAULT_BULK_CONCURRENCY = 8
+
+# 一時的なエラーとして再試行するHTTPステータス（Noneは通信エラー）
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+def _is_transient_error(result):
+    """
+    API応答が通信エラーやサーバー側の一時的なエラーかどうか
+    
+    Args:
+        result (Dict[str, Any]): API応答
+    
+    Returns:
+        bool: 一時的なエラー（再試行でき、処理されたかどうかも不明）であればTrue
+    """
+    return "status" in result and (result["status"] is None or result["status"] in TRANSIENT_STATUS_CODES)
+
+def _flatten_parameters(value, path, fields):
+    """
+    パラメーターを「パス: 値」の辞書に展開
+    
+    Args:
+        value: 展開する値
+        path (str): 値のパス
+        fields (Dict[str, Any]): 展開結果を格納する辞書
+    """
+    if isinstance(value, dict):
+        for key in sorted(value):
+            _flatten_parameters(value[key], f"{path}.{key}" if path else str(key), fields)
+    elif isinstance(value, (list, tuple)):
+        for index, item in enumerate(value):
+            _flatten_parameters(item, f"{path}[{index}]", fields)
+        if not value:
+            fields[path] = []
+    else:
+        fields[path] = value
+
+def parameter_digest(parameter):
+    """
+    パラメーターの内容を表すダイジェストを取得（キーの順序に依存しない）
+    
+    Args:
+        parameter (Dict[str, Any]): パラメーター
+    
+    Returns:
+        str: SHA-256のダイジェスト
+    """
+    canonical = json.dumps(parameter, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def diff_parameters(current, new):
+    """
+    2つのパラメーターの差分を取得
+    
+    JSONとして同じ内容であれば（キーの順序の違いは無視）差分なしとする。
+    値は型も含めて比較し、Trueと1や1と1.0は異なる値として扱う。
+    
+    Args:
+        current (Dict[str, Any]): 現在のパラメーター（不明な場合はNone）
+        new (Dict[str, Any]): 新しいパラメーター
+    
+    Returns:
+        List[Dict[str, Any]]: 変更されたフィールド（path, old, new）のリスト
+    """
+    current_fields = {}
+    new_fields = {}
+    if current is not None:
+        _flatten_parameters(json.loads(json.dumps(current)), "", current_fields)
+    _flatten_parameters(json.loads(json.dumps(new)), "", new_fields)
+    
+    changes = []
+    for path in sorted(set(current_fields) | set(new_fields)):
+        old_value = current_fields.get(path)
+        new_value = new_fields.get(path)
+        if path not in current_fields or path not in new_fields or json.dumps(old_value) != json.dumps(new_value):
+            changes.append({"path": path, "old": old_value, "new": new_value})
+    return changes
+
 class CommandParameterManager:
     """
     AITRIOSデバイスのコマンドパラメーターを管理するクラス
     """
     
-    def __init__(self, aitrios_client):
+    def __init__(self, aitrios_client, cache_path=None, journal_path=None):
         """
         コマンドパラメーター管理の初期化
         
         Args:
             aitrios_client: AITRIOSクライアント
+            cache_path (str, optional): パラメーターファイル一覧を保存するファイルのパス（起動直後の表示に使用）
+            journal_path (str, optional): パラメーター適用のジャーナルを保存するファイルのパス（中断した適用の再開・取り消しに使用）
         """
         self.aitrios_client = aitrios_client
         self.parameter_files_cache = {}
         self.cache_timestamp = 0
         self.cache_ttl = 300  # 5分のキャッシュTTL
+        
+        # キャッシュ更新時に作成する索引（デバイスID → (ファイル名, ファイル情報)、ファイル名 → デバイスIDのリスト）
+        self.device_index = {}
+        self.file_devices = {}
+        
+        # デバイスIDごとに、最後にバインドして反映させたファイル名と内容のダイジェスト
+        self.applied_parameters = {}
+        
+        # 実行中のキャッシュ更新（同時に1つのみ）と、キャッシュの世代
+        # （パラメーターの適用などでキャッシュを変更するたびに増やし、それ以前に開始した更新の結果は破棄する）
+        self._refresh_task = None
+        self._refresh_generation = 0
+        self._cache_generation = 0
+        
+        # パラメーター適用のジャーナルと、一時的なエラーの再試行回数・待機時間の基準（秒）
+        self.journal = ApplyJournal(journal_path)
+        self.retry_attempts = 3
+        self.retry_backoff = 1.0
+        
+        # ディスクに保存したキャッシュがあれば読み込む（期限切れとして扱い、最初の参照時に更新）
+        self.cache_path = cache_path
+        if cache_path:
+            self._load_disk_cache()
     
     async def get_device_parameters(self, device_id):
         """
@@ -35,7 +150,7 @@ class CommandParameterManager:
         
         Args:
             device_id: デバイスID
-            
+        
         Returns:
             Dict[str, Any]: コマンドパラメーター
         """
@@ -48,33 +163,211 @@ class CommandParameterManager:
             
             # バインドされている場合はそのファイルのパラメーターを返す
             if bound_file_info and "parameter" in bound_file_info:
-                print(f"Found parameters for device {device_id} in file {bound_file_name}")
+                logger.debug("Found parameters for device %s in file %s", device_id, bound_file_name)
                 return bound_file_info["parameter"]
             
             # バインドされていない場合はエラー
-            print(f"No parameter file found for device {device_id}")
+            logger.warning("No parameter file found for device %s", device_id)
             return {}
-            
+        
         except Exception as e:
-            print(f"Error getting device parameters for {device_id}: {str(e)}")
+            logger.error("Error getting device parameters for %s: %s", device_id, e)
             return {}
     
     async def _update_parameter_files_cache(self):
-        """キャッシュを更新"""
-        current_time = time.time()
+        """
+        キャッシュを更新
         
-        # キャッシュの有効期限が切れていたら更新
-        if current_time - self.cache_timestamp > self.cache_ttl or not self.parameter_files_cache:
-            try:
-                # コマンドパラメーターファイル一覧を取得
-                self.parameter_files_cache = await self.aitrios_client.get_command_parameter_files()
-                self.cache_timestamp = current_time
-                print(f"Updated parameter files cache. Found {len(self.parameter_files_cache.get('parameter_list', []))} files")
-            except Exception as e:
-                print(f"Error updating parameter files cache: {str(e)}")
-                if not self.parameter_files_cache:
-                    # 初回取得失敗時は空のキャッシュを作成
-                    self.parameter_files_cache = {"parameter_list": []}
+        キャッシュがあれば期限切れでもすぐに返し、バックグラウンドで更新する（stale-while-revalidate）。
+        キャッシュがない場合は更新の完了を待つ。
+        """
+        if self.parameter_files_cache and not self.is_cache_expired():
+            return
+        
+        task = self._get_refresh_task()
+        if self.parameter_files_cache:
+            return
+        
+        # 待機中の呼び出し元がキャンセルされても、他の呼び出し元と共有している更新は継続する
+        await asyncio.shield(task)
+    
+    def is_cache_expired(self):
+        """
+        キャッシュの有効期限が切れているかどうか
+        
+        Returns:
+            bool: 期限切れであればTrue
+        """
+        return time.time() - self.cache_timestamp > self.cache_ttl
+    
+    def _get_refresh_task(self, force=False):
+        """
+        実行中のキャッシュ更新を取得（なければ開始）
+        
+        Args:
+            force (bool): 実行中の更新の結果は使わず、新しく開始した更新を返すかどうか
+        
+        Returns:
+            asyncio.Task: キャッシュ更新のタスク（結果は一覧を取得してキャッシュに反映できたかどうか）
+        """
+        if force:
+            # 実行中の更新は開始時点の一覧を取得しているため、結果を破棄させる
+            self._cache_generation += 1
+        
+        loop = asyncio.get_running_loop()
+        task = self._refresh_task
+        if (task is None or task.done() or task.get_loop() is not loop
+                or self._refresh_generation != self._cache_generation):
+            self._refresh_generation = self._cache_generation
+            task = loop.create_task(self._refresh_parameter_files(self._cache_generation))
+            self._refresh_task = task
+        return task
+    
+    async def _refresh_parameter_files(self, generation):
+        """
+        パラメーターファイル一覧を取得してキャッシュを更新
+        
+        取得中にパラメーターを適用した場合や新しい更新が開始された場合は、古い一覧で
+        キャッシュを上書きしないよう結果を破棄する。
+        
+        Args:
+            generation (int): 更新を開始した時点のキャッシュの世代
+        
+        Returns:
+            bool: 取得した一覧をキャッシュに反映できた場合はTrue
+        """
+        try:
+            # コマンドパラメーターファイル一覧を取得
+            parameter_files = await self.aitrios_client.get_command_parameter_files()
+            if generation != self._cache_generation:
+                logger.debug("Discarding parameter files fetched before the cache was modified")
+                return False
+            self._set_parameter_files(parameter_files)
+            self.cache_timestamp = time.time()
+            logger.info("Updated parameter files cache. Found %d files", len(self.parameter_files_cache.get('parameter_list', [])))
+            self._save_disk_cache()
+            return True
+        except Exception as e:
+            logger.error("Error updating parameter files cache: %s", e)
+            if not self.parameter_files_cache:
+                # 初回取得失敗時は空のキャッシュを作成
+                self._set_parameter_files({"parameter_list": []})
+            return False
+    
+    def invalidate_parameter_file(self, file_name, parameter=None):
+        """
+        パラメーターファイル1件分のキャッシュを更新
+        
+        適用したパラメーターが分かっている場合はキャッシュに書き込み、一覧全体は再取得しない。
+        分からない場合はキャッシュ全体を期限切れにする。
+        
+        Args:
+            file_name (str): パラメーターファイル名
+            parameter (Dict[str, Any], optional): ファイルに書き込んだパラメーター
+        """
+        # 実行中の更新は変更前の一覧を取得している可能性があるため、結果を破棄させる
+        self._cache_generation += 1
+        
+        if parameter is None:
+            self.cache_timestamp = 0
+            return
+        
+        for param_file in self.parameter_files_cache.get("parameter_list", []):
+            if param_file.get("file_name") == file_name:
+                param_file["parameter"] = parameter
+                self._save_disk_cache()
+                return
+        
+        # キャッシュにないファイルの場合は一覧を再取得
+        self.cache_timestamp = 0
+    
+    def _load_disk_cache(self):
+        """ディスクに保存したパラメーターファイル一覧を読み込む"""
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._set_parameter_files(data.get("parameter_files", {"parameter_list": []}))
+            # 保存時刻から期限切れを判定する（通常は期限切れとしてバックグラウンドで更新される）
+            self.cache_timestamp = data.get("timestamp", 0)
+            self.applied_parameters = data.get("applied_parameters", {})
+            logger.info("Loaded parameter files cache from %s", self.cache_path)
+        except Exception as e:
+            logger.warning("Failed to load parameter files cache from %s: %s", self.cache_path, e)
+    
+    def _save_disk_cache(self):
+        """パラメーターファイル一覧をディスクに保存"""
+        if not self.cache_path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_path))
+            os.makedirs(directory, exist_ok=True)
+            
+            # 書き込み途中のファイルを読み込まないよう、一時ファイルに書いてから置き換える
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "timestamp": self.cache_timestamp,
+                    "parameter_files": self.parameter_files_cache,
+                    "applied_parameters": self.applied_parameters
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            logger.warning("Failed to save parameter files cache to %s: %s", self.cache_path, e)
+    
+    def _set_parameter_files(self, parameter_files):
+        """
+        パラメーターファイル一覧をキャッシュに設定して索引を作り直す
+        
+        Args:
+            parameter_files (Dict[str, Any]): get_command_parameter_filesのレスポンス
+        """
+        device_index = {}
+        file_devices = {}
+        for param_file in parameter_files.get("parameter_list", []):
+            file_name = param_file.get("file_name", "")
+            device_ids = param_file.get("device_ids", []) or []
+            file_devices[file_name] = list(device_ids)
+            for device_id in device_ids:
+                # 複数のファイルに含まれる場合は一覧で先に現れるファイルを優先
+                device_index.setdefault(device_id, (file_name, param_file))
+        
+        self.parameter_files_cache = parameter_files
+        self.device_index = device_index
+        self.file_devices = file_devices
+    
+    def _record_applied(self, file_name, device_ids, parameter):
+        """
+        デバイスにファイルの内容を反映させたことを記録
+        
+        Args:
+            file_name (str): パラメーターファイル名
+            device_ids (List[str]): バインドしたデバイスIDのリスト
+            parameter (Dict[str, Any]): 反映させた内容（不明な場合はNoneで記録を削除）
+        """
+        digest = parameter_digest(parameter) if parameter is not None else None
+        for device_id in device_ids:
+            if digest is None:
+                self.applied_parameters.pop(device_id, None)
+            else:
+                self.applied_parameters[device_id] = {"file_name": file_name, "digest": digest}
+        self._save_disk_cache()
+    
+    def has_received(self, device_id, file_name, parameter):
+        """
+        デバイスがファイルの内容をバインドにより反映済みかどうか
+        
+        Args:
+            device_id (str): デバイスID
+            file_name (str): パラメーターファイル名
+            parameter (Dict[str, Any]): ファイルの内容
+        
+        Returns:
+            bool: このアプリケーションから反映させた記録があればTrue
+        """
+        applied = self.applied_parameters.get(device_id)
+        return applied is not None and applied.get("file_name") == file_name and applied.get("digest") == parameter_digest(parameter)
     
     async def get_parameter_file_for_device(self, device_id):
         """
@@ -82,111 +375,536 @@ class CommandParameterManager:
         
         Args:
             device_id: デバイスID
-            
+        
         Returns:
             Tuple[str, Dict[str, Any]]: (ファイル名, バインド情報)
         """
         # キャッシュを更新
         await self._update_parameter_files_cache()
         
-        # このデバイスがバインドされているファイルを確認
-        for param_file in self.parameter_files_cache.get("parameter_list", []):
-            device_ids = param_file.get("device_ids", [])
-            if device_id in device_ids:
-                file_name = param_file.get("file_name", "")
-                print(f"Device {device_id} is bound to file {file_name}")
-                return file_name, param_file
+        # このデバイスがバインドされているファイルを索引から取得
+        entry = self.device_index.get(device_id)
+        if entry is not None:
+            logger.debug("Device %s is bound to file %s", device_id, entry[0])
+            return entry
         
         # 見つからない場合は空の情報を返す
         return "", {}
     
-    async def apply_parameters(self, device_id, parameters):
+    async def get_devices_for_file(self, file_name):
+        """
+        パラメーターファイルにバインドされているデバイスを取得
+        
+        Args:
+            file_name: パラメーターファイル名
+        
+        Returns:
+            List[str]: デバイスIDのリスト
+        """
+        # キャッシュを更新
+        await self._update_parameter_files_cache()
+        
+        return list(self.file_devices.get(file_name, []))
+    
+    async def get_devices_sharing_file(self, device_id):
+        """
+        デバイスと同じパラメーターファイルにバインドされている他のデバイスを取得
+        
+        Args:
+            device_id: デバイスID
+        
+        Returns:
+            List[str]: デバイスIDのリスト（バインドされていない場合は空）
+        """
+        file_name, _ = await self.get_parameter_file_for_device(device_id)
+        if not file_name:
+            return []
+        return [other for other in self.file_devices.get(file_name, []) if other != device_id]
+    
+    def get_affected_devices(self, device_ids):
+        """
+        適用すると一緒にアンバインド・再バインドされる、選択していないデバイスをキャッシュから取得
+        
+        Args:
+            device_ids (List[str]): 適用するデバイスIDのリスト
+        
+        Returns:
+            List[str]: 同じパラメーターファイルにバインドされている他のデバイスIDのリスト
+        """
+        selected = set(device_ids)
+        affected = []
+        for device_id in device_ids:
+            entry = self.device_index.get(device_id)
+            if entry is None:
+                continue
+            for other in self.file_devices.get(entry[0], []):
+                if other not in selected and other not in affected:
+                    affected.append(other)
+        return affected
+    
+    async def apply_parameters(self, device_id, parameters, force=False):
         """
         デバイスにコマンドパラメーターを適用
         
         Args:
             device_id: デバイスID
             parameters: 適用するパラメーター
-            
+            force (bool): 差分がなくても適用するかどうか
+        
         Returns:
             Dict[str, Any]: 実行結果
         """
+        result = await self.apply_parameters_bulk([device_id], parameters, max_concurrency=1, force=force)
+        device_result = result["results"].get(device_id)
+        if device_result is None:
+            return {"success": result["success"], "message": result["message"]}
+        
+        # 同じファイルにバインドされている他のデバイスの失敗も結果に含める
+        failed = [f"{other}: {other_result['message']}"
+                  for other, other_result in result["results"].items() if other != device_id and not other_result["success"]]
+        if device_result["success"] and failed:
+            return {
+                "success": False,
+                "message": "同じパラメーターファイルの他のデバイスへの適用に失敗しました: " + " / ".join(failed),
+                "skipped": device_result["skipped"],
+                "changes": device_result["changes"]
+            }
+        return {
+            "success": device_result["success"],
+            "message": device_result["message"],
+            "skipped": device_result["skipped"],
+            "changes": device_result["changes"]
+        }
+    
+    async def apply_parameters_bulk(self, device_ids, parameters, max_concurrency=DEFAULT_BULK_CONCURRENCY, progress=None, force=False):
+        """
+        複数のデバイスにコマンドパラメーターを適用
+        
+        デバイスをバインドされているファイルごとにまとめ、ファイルの更新は1回のみ行う。
+        アンバインドとバインドはセマフォで同時実行数を制限して並列に実行する。
+        ファイルを更新すると同じファイルのすべてのデバイスに影響するため、選択していないデバイスも
+        アンバインド・再バインドし、resultsにも含める。
+        ファイルの現在の内容と差分がなく、すべてのデバイスがその内容を反映済みのファイルは、
+        forceを指定しない限り適用を省略する（反映させた記録のないデバイスがあれば省略しない）。
+        
+        Args:
+            device_ids (List[str]): デバイスIDのリスト
+            parameters: 適用するパラメーター
+            max_concurrency (int): API呼び出しの最大同時実行数
+            progress (function, optional): デバイスの処理が終わるたびに(完了数, 全体数, デバイスID, 結果)で呼ばれる関数
+            force (bool): 差分がなくても適用するかどうか
+        
+        Returns:
+            Dict[str, Any]: 全体の実行結果（resultsにデバイスIDごとの結果と変更されたフィールド）
+        """
+        device_ids = list(dict.fromkeys(device_ids))
+        results = {}
+        
+        # 処理するデバイスの全体数（同じファイルにバインドされている選択していないデバイスを含む）
+        targets = list(device_ids)
+        
+        def report(device_id, success, message, file_name="", changes=None, skipped=False):
+            results[device_id] = {
+                "success": success,
+                "message": message,
+                "file_name": file_name,
+                "changes": changes or [],
+                "skipped": skipped
+            }
+            if progress is not None:
+                try:
+                    progress(len(results), len(targets), device_id, results[device_id])
+                except Exception:
+                    logger.exception("Error in bulk apply progress callback")
+        
         try:
             # パラメーターの検証
             if "commands" not in parameters:
-                return {"success": False, "message": "無効なパラメーター形式です。'commands'キーが必要です。"}
+                return {"success": False, "message": "無効なパラメーター形式です。'commands'キーが必要です。", "results": results}
             
-            # キャッシュを更新
-            await self._update_parameter_files_cache()
+            # 適用先のファイルとロールバックに使う適用前の内容は、有効期限に関係なく最新の一覧から取得する
+            # （実行中のバックグラウンドの更新は破棄し、新しく開始した共有の更新を待つ）
+            if not await asyncio.shield(self._get_refresh_task(force=True)):
+                message = "パラメーターファイル一覧を取得できないため適用を中止しました"
+                for device_id in device_ids:
+                    report(device_id, False, message)
+                return {"success": False, "message": message, "results": results}
             
-            # デバイスがバインドされているファイルを確認
-            bound_file_name, bound_file_info = await self.get_parameter_file_for_device(device_id)
+            # デバイスをバインドされているファイルごとにまとめる
+            groups = {}
+            for device_id in device_ids:
+                bound_file_name, bound_file_info = await self.get_parameter_file_for_device(device_id)
+                if not bound_file_name or not bound_file_info:
+                    # バインドされていない場合はエラー
+                    report(device_id, False, "デバイスにパラメーターファイルがバインドされていません。コンソールでバインドしてください。")
+                    continue
+                groups.setdefault(bound_file_name, []).append(device_id)
             
-            # バインドされていない場合はエラー
-            if not bound_file_name or not bound_file_info:
-                return {"success": False, "message": "デバイスにパラメーターファイルがバインドされていません。コンソールでバインドしてください。"}
-            
-            # コメントとパラメーターを準備
-            comment = f"Updated parameters for device {device_id}"
+            # ファイルを更新すると同じファイルのすべてのデバイスに影響するため、
+            # 選択していないデバイスもアンバインド・再バインドの対象に含める
+            for file_name, file_devices in groups.items():
+                others = [other for other in self.file_devices.get(file_name, []) if other not in file_devices]
+                if others:
+                    logger.info("File %s is also bound to unselected devices %s; rebinding them too", file_name, others)
+                    file_devices.extend(others)
+                    targets.extend(other for other in others if other not in targets)
             
             # パラメーターをJSONに変換してBase64エンコード
-            command_param_data = {
-                "commands": parameters.get("commands", [])
-            }
-            
-            command_param_json = json.dumps(command_param_data, indent=4, ensure_ascii=False)
-            encoded_param_data = base64.b64encode(command_param_json.encode('utf-8')).decode('utf-8')
-            
-            print(f"Preparing to update command parameter file {bound_file_name} for device {device_id}")
-            print(f"Encoded contents length: {len(encoded_param_data)} bytes")
+            command_param_data, encoded_param_data = self._encode_parameters(parameters)
             
             # エンコードされたデータが空でないか確認
             if not encoded_param_data:
-                print("Generated parameter data is empty")
-                return {"success": False, "message": "パラメーターのエンコードに失敗しました"}
+                logger.error("Generated parameter data is empty")
+                for file_devices in groups.values():
+                    for device_id in file_devices:
+                        report(device_id, False, "パラメーターのエンコードに失敗しました")
+                return {"success": False, "message": "パラメーターのエンコードに失敗しました", "results": results}
+            
+            # ファイルの現在の内容と比較し、差分がなく全デバイスに反映済みのファイルは適用を省略
+            changes_by_file = {}
+            for file_name, file_devices in list(groups.items()):
+                _, file_info = self.device_index[file_devices[0]]
+                changes = diff_parameters(file_info.get("parameter"), command_param_data)
+                not_received = [device_id for device_id in file_devices if not self.has_received(device_id, file_name, command_param_data)]
+                if not changes and not not_received and not force:
+                    logger.info("Parameters of file %s are unchanged; skipping %s", file_name, file_devices)
+                    for device_id in file_devices:
+                        report(device_id, True, "パラメーターに変更がないため適用を省略しました", file_name, skipped=True)
+                    del groups[file_name]
+                    continue
+                changes_by_file[file_name] = changes
+                if changes:
+                    logger.info("Parameters of file %s changed: %s", file_name, [change["path"] for change in changes])
+                elif not_received:
+                    logger.info("Parameters of file %s are unchanged but not yet applied to %s", file_name, not_received)
             
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+            await asyncio.gather(*[
+                self._apply_to_file(file_name, file_devices, command_param_data, encoded_param_data, semaphore,
+                                    functools.partial(report, changes=changes_by_file[file_name]),
+                                    previous_parameter=self.device_index[file_devices[0]][1].get("parameter"))
+                for file_name, file_devices in groups.items()
+            ])
+        except Exception as e:
+            logger.exception("Error applying command parameters to %s: %s", device_ids, e)
+            for device_id in targets:
+                if device_id not in results:
+                    report(device_id, False, f"エラーが発生しました: {str(e)}")
+            return {"success": False, "message": f"エラーが発生しました: {str(e)}", "results": results}
+        
+        succeeded = sum(1 for result in results.values() if result["success"])
+        skipped = sum(1 for result in results.values() if result["skipped"])
+        message = f"{len(targets)}台中{succeeded}台に適用しました"
+        if skipped:
+            message += f"（変更なしで省略: {skipped}台）"
+        return {
+            "success": succeeded == len(targets),
+            "message": message,
+            "results": results
+        }
+    
+    async def preview_changes(self, device_ids, parameters):
+        """
+        適用した場合に変更されるフィールドをデバイスごとに取得（APIへの書き込みは行わない）
+        
+        Args:
+            device_ids (List[str]): デバイスIDのリスト
+            parameters: 適用するパラメーター
+        
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: デバイスIDと変更されたフィールドのリスト（バインドされていない場合はNone）
+        """
+        await self._update_parameter_files_cache()
+        command_param_data = {"commands": parameters.get("commands", [])}
+        
+        changes = {}
+        for device_id in device_ids:
+            entry = self.device_index.get(device_id)
+            changes[device_id] = diff_parameters(entry[1].get("parameter"), command_param_data) if entry else None
+        return changes
+    
+    def _encode_parameters(self, parameters):
+        """
+        パラメーターをファイルの内容（JSONのBase64）に変換
+        
+        Args:
+            parameters: 適用するパラメーター
+        
+        Returns:
+            Tuple[Dict[str, Any], str]: (ファイルに書き込むパラメーター, Base64エンコードされた内容)
+        """
+        command_param_data = {
+            "commands": parameters.get("commands", [])
+        }
+        return command_param_data, self._encode_contents(command_param_data)
+    
+    def _encode_contents(self, contents):
+        """
+        ファイルの内容をそのままJSONのBase64に変換
+        
+        Args:
+            contents (Dict[str, Any]): ファイルの内容
+        
+        Returns:
+            str: Base64エンコードされた内容
+        """
+        contents_json = json.dumps(contents, indent=4, ensure_ascii=False)
+        encoded_contents = base64.b64encode(contents_json.encode('utf-8')).decode('utf-8')
+        logger.debug("Encoded contents length: %d bytes", len(encoded_contents))
+        return encoded_contents
+    
+    async def _call_api(self, semaphore, func, *args):
+        """
+        APIを呼び出し、一時的なエラーの場合はバックオフしながら再試行
+        
+        Args:
+            semaphore (asyncio.Semaphore): API呼び出しの同時実行数を制限するセマフォ
+            func: 呼び出すAITRIOSクライアントのメソッド
+            *args: 引数
+        
+        Returns:
+            Dict[str, Any]: API応答（例外の場合はresultがERRORの応答）
+        """
+        result = {}
+        for attempt in range(self.retry_attempts):
             try:
-                # デバイスをアンバインド
-                print(f"Unbinding device {device_id} from file {bound_file_name}")
-                unbind_result = await self.aitrios_client.unbind_command_parameter_file(bound_file_name, [device_id])
-                
-                if unbind_result.get("result") != "SUCCESS":
-                    print(f"Unbind may have failed: {unbind_result}")
-                else:
-                    print(f"Successfully unbound device {device_id} from file {bound_file_name}")
-                
-                # パラメーターファイルを更新
-                print(f"Updating command parameter file {bound_file_name}")
-                update_result = await self.aitrios_client.update_command_parameter_file(bound_file_name, comment, encoded_param_data)
-                
-                if update_result.get("result") != "SUCCESS":
-                    print(f"Failed to update parameter file: {update_result}")
-                    return {"success": False, "message": f"パラメーターファイルの更新に失敗しました: {update_result.get('message', '')}"}
-                
-                print(f"Successfully updated parameter file {bound_file_name}")
-                
-                # デバイスを再バインド
-                print(f"Rebinding device {device_id} to file {bound_file_name}")
-                bind_result = await self.aitrios_client.bind_command_parameter_file(bound_file_name, [device_id])
-                
-                if bind_result.get("result") != "SUCCESS":
-                    print(f"Failed to bind device: {bind_result}")
-                    return {"success": False, "message": f"デバイスのバインドに失敗しました: {bind_result.get('message', '')}"}
-                
-                print(f"Successfully bound device {device_id} to file {bound_file_name}")
-                
-                # キャッシュをクリア
-                self.cache_timestamp = 0
-                
-                return {"success": True, "message": f"コマンドパラメーターを正常に適用しました"}
-                
+                async with semaphore:
+                    result = await func(*args)
             except Exception as api_error:
-                print(f"API error while applying command parameters: {str(api_error)}")
-                return {"success": False, "message": f"APIエラー: {str(api_error)}"}
+                logger.error("API error in %s: %s", func.__name__, api_error)
+                result = {"result": "ERROR", "message": f"APIエラー: {str(api_error)}", "status": None}
             
-        except Exception as e:
-            print(f"Error applying command parameters for {device_id}: {str(e)}")
-            return {"success": False, "message": f"エラーが発生しました: {str(e)}"}
+            if result.get("result") == "SUCCESS":
+                return result
+            
+            # 通信エラーやサーバー側の一時的なエラー以外は再試行しない
+            if not _is_transient_error(result) or attempt == self.retry_attempts - 1:
+                break
+            
+            delay = self.retry_backoff * (2 ** attempt) * (1 + random.random())
+            logger.warning("%s failed (%s); retrying in %.1f s", func.__name__, result.get("message", ""), delay)
+            await asyncio.sleep(delay)
+        return result
+    
+    async def _unbind_device(self, semaphore, file_name, device_id):
+        """
+        デバイスをアンバインド（失敗しても処理は継続する）
+        
+        Args:
+            semaphore (asyncio.Semaphore): API呼び出しの同時実行数を制限するセマフォ
+            file_name (str): パラメーターファイル名
+            device_id (str): デバイスID
+        """
+        logger.info("Unbinding device %s from file %s", device_id, file_name)
+        unbind_result = await self._call_api(semaphore, self.aitrios_client.unbind_command_parameter_file, file_name, [device_id])
+        if unbind_result.get("result") != "SUCCESS":
+            logger.warning("Unbind may have failed: %s", unbind_result)
+        else:
+            logger.info("Successfully unbound device %s from file %s", device_id, file_name)
+    
+    async def _bind_device(self, semaphore, file_name, device_id):
+        """
+        デバイスをバインド
+        
+        Args:
+            semaphore (asyncio.Semaphore): API呼び出しの同時実行数を制限するセマフォ
+            file_name (str): パラメーターファイル名
+            device_id (str): デバイスID
+        
+        Returns:
+            Tuple[bool, str]: (成否, 失敗時のメッセージ)
+        """
+        logger.info("Rebinding device %s to file %s", device_id, file_name)
+        bind_result = await self._call_api(semaphore, self.aitrios_client.bind_command_parameter_file, file_name, [device_id])
+        if bind_result.get("result") != "SUCCESS":
+            logger.error("Failed to bind device: %s", bind_result)
+            message = bind_result.get("message", "")
+            if message.startswith("APIエラー"):
+                return False, message
+            return False, f"デバイスのバインドに失敗しました: {message}"
+        logger.info("Successfully bound device %s to file %s", device_id, file_name)
+        return True, ""
+    
+    async def _apply_to_file(self, file_name, device_ids, command_param_data, encoded_param_data, semaphore, report,
+                             previous_parameter=None, transaction=None):
+        """
+        1つのパラメーターファイルを更新し、対象のデバイスをアンバインド・再バインド
+        
+        各段階をジャーナルに記録し、ファイルの更新後にバインドに失敗した場合は
+        適用前の内容に戻してデバイスを再バインドする（ロールバック）。
+        
+        Args:
+            file_name (str): パラメーターファイル名
+            device_ids (List[str]): 対象のデバイスIDのリスト
+            command_param_data (Dict[str, Any]): ファイルに書き込むパラメーター
+            encoded_param_data (str): Base64エンコードされたファイルの内容
+            semaphore (asyncio.Semaphore): API呼び出しの同時実行数を制限するセマフォ
+            report (function): デバイスごとの結果を(デバイスID, 成否, メッセージ, ファイル名)で記録する関数
+            previous_parameter (Dict[str, Any], optional): 適用前のファイルの内容（ロールバックに使用）
+            transaction (dict, optional): 再開するトランザクション（省略時は新しく開始）
+        """
+        comment = f"Updated parameters for device {device_ids[0]}" if len(device_ids) == 1 else f"Updated parameters for {len(device_ids)} devices"
+        logger.info("Preparing to update command parameter file %s for devices %s", file_name, device_ids)
+        
+        if transaction is None:
+            transaction = self.journal.begin(file_name, device_ids, previous_parameter, command_param_data)
+        
+        # デバイスをアンバインド
+        await asyncio.gather(*[self._unbind_device(semaphore, file_name, device_id) for device_id in device_ids])
+        self.journal.update(transaction, state=STATE_UNBOUND)
+        self._record_applied(file_name, device_ids, None)
+        
+        # パラメーターファイルを更新（ファイルごとに1回）
+        logger.info("Updating command parameter file %s", file_name)
+        update_result = await self._call_api(
+            semaphore, self.aitrios_client.update_command_parameter_file, file_name, comment, encoded_param_data
+        )
+        
+        if update_result.get("result") != "SUCCESS":
+            logger.error("Failed to update parameter file: %s", update_result)
+            message = update_result.get("message", "")
+            failure = message if message.startswith("APIエラー") else f"パラメーターファイルの更新に失敗しました: {message}"
+            
+            if _is_transient_error(update_result):
+                # 通信エラーやサーバーエラーではファイルが更新されたかどうか分からないため、適用前の内容に戻す
+                self.journal.update(transaction, error=failure)
+                rolled_back = await self._rollback(transaction, semaphore)
+                suffix = "（適用前の内容にロールバックしました）" if rolled_back else "（ロールバックに失敗しました。デバイスの状態を確認してください）"
+                for device_id in device_ids:
+                    report(device_id, False, failure + suffix, file_name)
+                return
+            
+            # 要求が拒否されたためファイルは更新されておらず、アンバインドしたデバイスを元のファイルに戻す
+            bind_results = await asyncio.gather(*[self._bind_device(semaphore, file_name, device_id) for device_id in device_ids])
+            restored = all(success for success, _ in bind_results)
+            self._record_applied(
+                file_name, [device_id for device_id, (success, _) in zip(device_ids, bind_results) if success],
+                transaction["previous_parameter"]
+            )
+            self.journal.update(transaction, state=STATE_ROLLED_BACK if restored else STATE_FAILED, error=failure)
+            for device_id in device_ids:
+                report(device_id, False, failure, file_name)
+            return
+        
+        logger.info("Successfully updated parameter file %s", file_name)
+        self.journal.update(transaction, state=STATE_UPDATED)
+        
+        # 適用したファイルのみキャッシュを更新
+        self.invalidate_parameter_file(file_name, command_param_data)
+        
+        # デバイスを再バインド
+        bind_results = await asyncio.gather(*[self._bind_device(semaphore, file_name, device_id) for device_id in device_ids])
+        bound = [device_id for device_id, (success, _) in zip(device_ids, bind_results) if success]
+        self.journal.update(transaction, bound_device_ids=bound)
+        self._record_applied(file_name, bound, command_param_data)
+        
+        if len(bound) == len(device_ids):
+            self.journal.update(transaction, state=STATE_COMMITTED)
+            for device_id in device_ids:
+                report(device_id, True, "コマンドパラメーターを正常に適用しました", file_name)
+            return
+        
+        # バインドに失敗したデバイスがある場合は適用前の内容に戻す
+        failure = next(message for success, message in bind_results if not success)
+        self.journal.update(transaction, error=failure)
+        rolled_back = await self._rollback(transaction, semaphore)
+        suffix = "（適用前の内容にロールバックしました）" if rolled_back else "（ロールバックに失敗しました。デバイスの状態を確認してください）"
+        for device_id, (success, message) in zip(device_ids, bind_results):
+            report(device_id, False, (message if not success else failure) + suffix, file_name)
+    
+    async def _rollback(self, transaction, semaphore):
+        """
+        トランザクションを取り消し、ファイルを適用前の内容に戻してデバイスを再バインド
+        
+        Args:
+            transaction (dict): トランザクション
+            semaphore (asyncio.Semaphore): API呼び出しの同時実行数を制限するセマフォ
+        
+        Returns:
+            bool: ロールバックに成功したかどうか
+        """
+        file_name = transaction["file_name"]
+        previous_parameter = transaction["previous_parameter"]
+        self.journal.update(transaction, state=STATE_ROLLING_BACK)
+        
+        if previous_parameter is not None:
+            logger.warning("Rolling back command parameter file %s (transaction %s)", file_name, transaction["id"])
+            # commands以外のキーも含め、適用前の内容をそのまま書き戻す
+            encoded_previous = self._encode_contents(previous_parameter)
+            restore_result = await self._call_api(
+                semaphore, self.aitrios_client.update_command_parameter_file,
+                file_name, f"Rollback of transaction {transaction['id']}", encoded_previous
+            )
+            if restore_result.get("result") != "SUCCESS":
+                logger.error("Failed to restore parameter file %s: %s", file_name, restore_result)
+                self.journal.update(transaction, state=STATE_FAILED)
+                return False
+            self.invalidate_parameter_file(file_name, previous_parameter)
+        else:
+            # 適用前の内容が不明な場合はファイルを戻せないため、デバイスのバインドのみ戻す
+            logger.error("Previous contents of %s are unknown; only rebinding devices", file_name)
+        
+        # 戻した内容をデバイスに反映するため、アンバインドしてから再バインド
+        async def rebind(device_id):
+            await self._unbind_device(semaphore, file_name, device_id)
+            return await self._bind_device(semaphore, file_name, device_id)
+        bind_results = await asyncio.gather(*[rebind(device_id) for device_id in transaction["device_ids"]])
+        self._record_applied(
+            file_name, [device_id for device_id, (success, _) in zip(transaction["device_ids"], bind_results) if success], previous_parameter
+        )
+        
+        restored = previous_parameter is not None and all(success for success, _ in bind_results)
+        self.journal.update(transaction, state=STATE_ROLLED_BACK if restored else STATE_FAILED)
+        return restored
+    
+    def get_pending_transactions(self):
+        """
+        前回の起動で完了しなかったパラメーター適用を取得
+        
+        Returns:
+            List[dict]: トランザクションのリスト
+        """
+        return self.journal.pending()
+    
+    async def recover_pending_transactions(self, rollback=False, max_concurrency=DEFAULT_BULK_CONCURRENCY):
+        """
+        完了しなかったパラメーター適用を再開、または取り消す
+        
+        Args:
+            rollback (bool): Trueの場合は取り消し、Falseの場合は再開する（ロールバック中・失敗したものは常に取り消す）
+            max_concurrency (int): API呼び出しの最大同時実行数
+        
+        Returns:
+            Dict[str, Any]: 全体の実行結果（resultsにデバイスIDごとの結果）
+        """
+        results = {}
+        
+        def report(device_id, success, message, file_name=""):
+            results[device_id] = {"success": success, "message": message, "file_name": file_name}
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        transactions = self.journal.pending()
+        for transaction in transactions:
+            file_name = transaction["file_name"]
+            if rollback or transaction["state"] in (STATE_ROLLING_BACK, STATE_FAILED):
+                restored = await self._rollback(transaction, semaphore)
+                message = "中断された適用を取り消しました" if restored else "中断された適用を取り消せませんでした。デバイスの状態を確認してください"
+                for device_id in transaction["device_ids"]:
+                    report(device_id, restored, message, file_name)
+            else:
+                logger.info("Resuming command parameter apply for file %s (transaction %s)", file_name, transaction["id"])
+                command_param_data, encoded_param_data = self._encode_parameters(transaction["new_parameter"])
+                await self._apply_to_file(
+                    file_name, transaction["device_ids"], command_param_data, encoded_param_data, semaphore, report,
+                    transaction=transaction
+                )
+        
+        succeeded = sum(1 for result in results.values() if result["success"])
+        return {
+            "success": succeeded == len(results),
+            "message": f"中断されたパラメーター適用 {len(transactions)} 件を処理しました（{len(results)}台中{succeeded}台が成功）",
+            "results": results
+        }
     
     def get_default_parameters(self):
         """
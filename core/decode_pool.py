@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+デコードプールモジュール
+JPEGデコード・FlatBuffersの解析・バウンディングボックスの描画を別プロセスで実行する
+
+入力のペイロードと出力のフレーム・検出結果は共有メモリで受け渡し、
+数MBの配列をpickleしないようにする。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from core.detection_decoder import decode_detections, detections_to_array, DETECTION_DTYPE
+from utils.image_utils import get_jpeg_size, select_reduced_decode
+from utils.overlay_renderer import OverlayRenderer
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセスごとのレンダラー（ラベル画像のキャッシュをプロセス内で再利用）
+_worker_renderer = None
+
+def _get_worker_renderer():
+    """ワーカープロセス内のレンダラーを取得"""
+    global _worker_renderer
+    if _worker_renderer is None:
+        _worker_renderer = OverlayRenderer()
+    return _worker_renderer
+
+def _decode_image_bytes(image_bytes, display_size):
+    """
+    JPEGのバイト列をデコード（表示サイズが分かる場合は縮小デコード）
+    
+    Args:
+        image_bytes (memoryview): JPEGのバイト列
+        display_size (tuple): 表示領域のサイズ (幅, 高さ)、Noneの場合はフル解像度
+    
+    Returns:
+        tuple: (OpenCV画像データ, 元画像に対する縮小率)
+    """
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    size = get_jpeg_size(image_bytes) if display_size else None
+    if size is None:
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR), 1.0
+    
+    factor, flag = select_reduced_decode(size[0], size[1], *display_size)
+    image = cv2.imdecode(nparr, flag)
+    if image is None or factor == 1:
+        return image, 1.0
+    return image, image.shape[1] / size[0]
+
+def decode_job(input_name, image_size, metadata_size, display_size, render, objclass):
+    """
+    ワーカープロセスで実行するデコード処理
+    
+    入力の共有メモリは[JPEG][FlatBuffers]の順に格納されている。
+    出力は新しい共有メモリに[フレーム][検出結果の配列]の順に格納する。
+    
+    Args:
+        input_name (str): 入力の共有メモリの名前
+        image_size (int): JPEGのバイト数（0の場合は画像なし）
+        metadata_size (int): FlatBuffersのバイト数（0の場合は推論結果なし）
+        display_size (tuple): 縮小デコードに使用する表示サイズ、Noneの場合はフル解像度
+        render (bool): フレームにバウンディングボックスを描画するかどうか
+        objclass (list): クラスのリスト
+    
+    Returns:
+        dict: 出力の共有メモリの名前と配列の形状、縮小率、検出ラベル
+    """
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    try:
+        image = None
+        scale = 1.0
+        if image_size:
+            image, scale = _decode_image_bytes(input_shm.buf[:image_size], display_size)
+        
+        detections = []
+        if metadata_size:
+            detections = decode_detections(bytes(input_shm.buf[image_size:image_size + metadata_size]))
+    finally:
+        input_shm.close()
+    
+    labels = None
+    if render and image is not None:
+        image, labels = _get_worker_renderer().render(image, detections, objclass, scale_x=scale, scale_y=scale)
+    
+    det_array = detections_to_array(detections)
+    frame_bytes = image.nbytes if image is not None else 0
+    output_shm = shared_memory.SharedMemory(create=True, size=max(1, frame_bytes + det_array.nbytes))
+    try:
+        if image is not None:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=output_shm.buf)[...] = image
+        np.ndarray(det_array.shape, dtype=DETECTION_DTYPE, buffer=output_shm.buf, offset=frame_bytes)[...] = det_array
+    finally:
+        output_shm.close()
+    
+    return {
+        "name": output_shm.name,
+        "frame_shape": image.shape if image is not None else None,
+        "frame_dtype": image.dtype.str if image is not None else None,
+        "detection_count": len(det_array),
+        "scale": scale,
+        "labels": labels
+    }
+
+def _discard_output(future):
+    """
+    受け取られなかったdecode_jobの出力の共有メモリを破棄
+    
+    Args:
+        future (concurrent.futures.Future): decode_jobのFuture
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        output_shm = shared_memory.SharedMemory(name=future.result()["name"])
+        output_shm.close()
+        output_shm.unlink()
+    except FileNotFoundError:
+        pass
+
+class DecodePool:
+    """共有メモリでペイロードを受け渡すデコード用のプロセスプール"""
+    
+    def __init__(self, max_workers=None):
+        """
+        デコードプールの初期化
+        
+        Args:
+            max_workers (int, optional): ワーカープロセス数（省略時はCPUコア数）
+        """
+        self.max_workers = max_workers
+        # Tkinterやasyncioのスレッドをforkしないようにspawnでワーカーを起動
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    
+    async def decode(self, image_bytes=None, metadata_bytes=None, display_size=None, render=False, objclass=()):
+        """
+        画像と推論結果をワーカープロセスでデコード
+        
+        Args:
+            image_bytes (bytes, optional): JPEGのバイト列
+            metadata_bytes (bytes, optional): FlatBuffersのバイト列
+            display_size (tuple, optional): 縮小デコードに使用する表示サイズ
+            render (bool): フレームにバウンディングボックスを描画するかどうか
+            objclass (list): クラスのリスト（描画時のラベルに使用）
+        
+        Returns:
+            tuple: (画像, 縮小率, 検出結果の配列, 検出ラベル)、描画しない場合の検出ラベルはNone
+        """
+        image_size = len(image_bytes) if image_bytes else 0
+        metadata_size = len(metadata_bytes) if metadata_bytes else 0
+        
+        # ペイロードを共有メモリにコピー（ワーカーには名前とサイズのみを渡す）
+        input_shm = shared_memory.SharedMemory(create=True, size=max(1, image_size + metadata_size))
+        try:
+            if image_size:
+                input_shm.buf[:image_size] = image_bytes
+            if metadata_size:
+                input_shm.buf[image_size:image_size + metadata_size] = metadata_bytes
+            
+            future = self._executor.submit(
+                decode_job, input_shm.name, image_size, metadata_size, display_size, render, list(objclass)
+            )
+            try:
+                result = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # 実行中でキャンセルできなかった場合は、完了後に出力の共有メモリを破棄
+                future.add_done_callback(_discard_output)
+                raise
+        finally:
+            input_shm.close()
+            input_shm.unlink()
+        
+        return self._collect(result)
+    
+    def _collect(self, result):
+        """
+        ワーカーが出力した共有メモリから画像と検出結果を取り出す
+        
+        Args:
+            result (dict): decode_jobの戻り値
+        
+        Returns:
+            tuple: (画像, 縮小率, 検出結果の配列, 検出ラベル)
+        """
+        output_shm = shared_memory.SharedMemory(name=result["name"])
+        try:
+            image = None
+            frame_bytes = 0
+            if result["frame_shape"] is not None:
+                # 共有メモリは解放するため、プロセス内の配列にコピーする
+                frame = np.ndarray(result["frame_shape"], dtype=np.dtype(result["frame_dtype"]), buffer=output_shm.buf)
+                image = frame.copy()
+                frame_bytes = frame.nbytes
+                del frame
+            
+            det_view = np.ndarray((result["detection_count"],), dtype=DETECTION_DTYPE, buffer=output_shm.buf, offset=frame_bytes)
+            det_array = det_view.copy()
+            del det_view
+        finally:
+            output_shm.close()
+            output_shm.unlink()
+        
+        return image, result["scale"], det_array, result["labels"]
+    
+    def shutdown(self, wait=False):
+        """
+        ワーカープロセスを終了
+        
+        Args:
+            wait (bool): 実行中の処理の完了を待つかどうか
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+検出結果デコーダーモジュール
+FlatBuffers形式の推論結果（SmartCamera.ObjectDetectionTop）から検出結果を取り出す
+"""
+
+import numpy as np
+from flatbuffers import encode, packer
+from flatbuffers.number_types import Uint8Flags, Uint32Flags, Int32Flags, Float32Flags
+from flatbuffers.table import Table
+
+from SmartCamera.BoundingBox import BoundingBox
+from utils.json_backend import base64_bytes
+
+# スキーマのフィールドのvtableオフセット（SmartCameraの生成コードと同じ値）
+TOP_PERCEPTION = 4              # ObjectDetectionTop.perception
+DATA_OBJECT_LIST = 4            # ObjectDetectionData.object_detection_list
+OBJECT_CLASS_ID = 4             # GeneralObject.class_id
+OBJECT_BOUNDING_BOX_TYPE = 6    # GeneralObject.bounding_box_type
+OBJECT_BOUNDING_BOX = 8         # GeneralObject.bounding_box
+OBJECT_SCORE = 10               # GeneralObject.score
+BOX_LEFT = 4                    # BoundingBox2d.left
+BOX_TOP = 6                     # BoundingBox2d.top
+BOX_RIGHT = 8                   # BoundingBox2d.right
+BOX_BOTTOM = 10                 # BoundingBox2d.bottom
+
+# 検出結果の配列の型（プロセス間の受け渡しや一括処理に使用）
+DETECTION_DTYPE = np.dtype([
+    ("class_id", np.uint32),
+    ("score", np.float32),
+    ("left", np.int32),
+    ("top", np.int32),
+    ("right", np.int32),
+    ("bottom", np.int32),
+])
+
+# 複数フレームの検出結果を連結した配列の型（frameはフレームのインデックス）
+BATCH_DTYPE = np.dtype([("frame", np.uint32)] + DETECTION_DTYPE.descr)
+
+def _get_field(table, field, flags, default):
+    """
+    テーブルのスカラーフィールドを取得
+    
+    Args:
+        table (flatbuffers.table.Table): テーブル
+        field (int): フィールドのvtableオフセット
+        flags: フィールドの数値型
+        default: フィールドがない場合の値
+    
+    Returns:
+        フィールドの値
+    """
+    offset = table.Offset(field)
+    if offset == 0:
+        return default
+    return table.Get(flags, offset + table.Pos)
+
+def decode_detection_rows(buf, on_error=None):
+    """
+    FlatBuffersデータから検出結果をタプルで取り出す
+    
+    BoundingBox2d以外のバウンディングボックスを持つオブジェクトは対象外とする。
+    
+    Args:
+        buf (bytes): FlatBuffersでシリアライズされたデータ
+        on_error (function, optional): オブジェクトの処理に失敗したときに(インデックス, 例外)で呼ばれる関数
+    
+    Returns:
+        list: (class_id, score, left, top, right, bottom)のタプルのリスト
+    """
+    top = Table(buf, encode.Get(packer.uoffset, buf, 0))
+    offset = top.Offset(TOP_PERCEPTION)
+    if offset == 0:
+        return []
+    
+    perception = Table(buf, top.Indirect(offset + top.Pos))
+    offset = perception.Offset(DATA_OBJECT_LIST)
+    if offset == 0:
+        return []
+    
+    count = perception.VectorLen(offset)
+    vector = perception.Vector(offset)
+    
+    results = []
+    for i in range(count):
+        try:
+            detection = Table(buf, perception.Indirect(vector + i * 4))
+            
+            # BoundingBox2dの場合のみ処理
+            if _get_field(detection, OBJECT_BOUNDING_BOX_TYPE, Uint8Flags, BoundingBox.NONE) != BoundingBox.BoundingBox2d:
+                continue
+            box_offset = detection.Offset(OBJECT_BOUNDING_BOX)
+            if box_offset == 0:
+                continue
+            box = Table(buf, detection.Indirect(box_offset + detection.Pos))
+            
+            results.append((
+                _get_field(detection, OBJECT_CLASS_ID, Uint32Flags, 0),
+                _get_field(detection, OBJECT_SCORE, Float32Flags, 0.0),
+                _get_field(box, BOX_LEFT, Int32Flags, 0),
+                _get_field(box, BOX_TOP, Int32Flags, 0),
+                _get_field(box, BOX_RIGHT, Int32Flags, 0),
+                _get_field(box, BOX_BOTTOM, Int32Flags, 0)
+            ))
+        except Exception as e:
+            if on_error is not None:
+                on_error(i, e)
+    
+    return results
+
+def decode_detections(buf, on_error=None):
+    """
+    FlatBuffersデータから検出結果を取り出す
+    
+    Args:
+        buf (bytes): FlatBuffersでシリアライズされたデータ
+        on_error (function, optional): オブジェクトの処理に失敗したときに(インデックス, 例外)で呼ばれる関数
+    
+    Returns:
+        list: class_id, score, left, top, right, bottomを持つ辞書のリスト
+    """
+    return [
+        {"class_id": class_id, "score": score, "left": left, "top": top, "right": right, "bottom": bottom}
+        for class_id, score, left, top, right, bottom in decode_detection_rows(buf, on_error)
+    ]
+
+def detections_to_array(detections):
+    """
+    検出結果の辞書のリストを構造化配列に変換
+    
+    Args:
+        detections (list): decode_detectionsの戻り値
+    
+    Returns:
+        numpy.ndarray: DETECTION_DTYPEの配列
+    """
+    return np.array(
+        [(det["class_id"], det["score"], det["left"], det["top"], det["right"], det["bottom"]) for det in detections],
+        dtype=DETECTION_DTYPE
+    )
+
+def array_to_detections(array):
+    """
+    構造化配列を検出結果の辞書のリストに変換（描画処理などに渡す形式）
+    
+    Args:
+        array (numpy.ndarray): DETECTION_DTYPEのフィールドを持つ配列
+    
+    Returns:
+        list: class_id, score, left, top, right, bottomを持つ辞書のリスト
+    """
+    return [
+        {
+            "class_id": int(row["class_id"]),
+            "score": float(row["score"]),
+            "left": int(row["left"]),
+            "top": int(row["top"]),
+            "right": int(row["right"]),
+            "bottom": int(row["bottom"])
+        }
+        for row in array
+    ]
+
+def iter_inferences(inference_results):
+    """
+    推論結果APIのレスポンスに含まれる推論を古い順に列挙
+    
+    レスポンスは新しい順（order_by=DESC）に並んでおり、1件の結果に
+    NumberOfInferencesPerMessage個の推論（Inferences）が含まれる。
+    
+    Args:
+        inference_results (list): get_inference_resultsの戻り値
+    
+    Yields:
+        dict: T（タイムスタンプ）とO（Base64エンコードされたFlatBuffers）を持つ推論
+    """
+    if not isinstance(inference_results, list):
+        return
+    for result in reversed(inference_results):
+        inference_result = result.get("inference_result") if isinstance(result, dict) else None
+        if not inference_result or "Inferences" not in inference_result:
+            continue
+        for inference in inference_result["Inferences"]:
+            if "O" in inference:
+                yield inference
+
+def decode_inference_batch(inference_results, since=None, on_error=None):
+    """
+    レスポンスに含まれるすべての推論を1つの配列にデコード
+    
+    Args:
+        inference_results (list): get_inference_resultsの戻り値
+        since (str, optional): このタイムスタンプ以前の推論は対象外（前回のポーリングで処理済みのもの）、タイムスタンプ（T）のない推論は常に対象外
+        on_error (function, optional): 推論のデコードに失敗したときに(タイムスタンプ, 例外)で呼ばれる関数
+    
+    Returns:
+        tuple: (フレームのタイムスタンプのリスト, BATCH_DTYPEの配列)、配列のframeはタイムスタンプのインデックス
+    """
+    timestamps = []
+    rows = []
+    seen = set()
+    for inference in iter_inferences(inference_results):
+        timestamp = inference.get("T", "")
+        # タイムスタンプのない推論は処理済みか判定できず、ポーリングのたびに再送されるため除外
+        if not timestamp:
+            continue
+        # 処理済みの推論と、同じレスポンス内で重複する推論は除外
+        if (since is not None and timestamp <= since) or timestamp in seen:
+            continue
+        seen.add(timestamp)
+        
+        try:
+            detections = decode_detection_rows(base64_bytes(inference["O"]))
+        except Exception as e:
+            if on_error is not None:
+                on_error(timestamp, e)
+            continue
+        
+        frame = len(timestamps)
+        timestamps.append(timestamp)
+        rows.extend((frame,) + detection for detection in detections)
+    
+    return timestamps, np.array(rows, dtype=BATCH_DTYPE)
+
+def batch_frame(batch, frame):
+    """
+    連結した配列から1フレーム分の検出結果を取り出す
+    
+    Args:
+        batch (numpy.ndarray): BATCH_DTYPEの配列
+        frame (int): フレームのインデックス
+    
+    Returns:
+        numpy.ndarray: 指定したフレームの検出結果
+    """
+    return batch[batch["frame"] == frame]
@@ -6,36 +6,33 @@
 画像処理と検出のコア機能
 """
 
-import sys
-import os
-import base64
 import time
-import cv2
-import numpy as np
 import threading
 import asyncio
+import logging
 from datetime import datetime
 
-# 現在のディレクトリのパスを取得
-current_path = os.path.dirname(os.path.abspath(__file__))  # core
-root_path = os.path.dirname(current_path)  # プロジェクトルート
+from api.aitrios_client import AITRIOSClient
+from utils.image_utils import download_image, download_image_for_display, draw_bounding_boxes
+from utils.frame_cache import FrameCache
+from utils.overlay_renderer import OverlayRenderer
+from utils.log_buffer import LOG_LEVELS
+from utils.metrics import FRAMES_PROCESSED, FRAMES_DROPPED, DETECTIONS, STAGE_SECONDS
+from utils.lazy_import import lazy_import
+from utils.json_backend import base64_bytes
 
-# グローバルな変数でモジュールを確保
-sys.path.insert(0, root_path)
-ObjectDetectionTop = None
-BoundingBox = None
-BoundingBox2d = None
+# 起動を速くするため、OpenCV・NumPy・FlatBuffersのデコーダーは最初の使用時に読み込む
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+detection_decoder = lazy_import("core.detection_decoder")
 
-# モジュールの遅延インポート関数
-def ensure_modules_loaded():
-    global ObjectDetectionTop, BoundingBox, BoundingBox2d
-    if ObjectDetectionTop is None:
-        import ObjectDetectionTop
-        import BoundingBox
-        import BoundingBox2d
+logger = logging.getLogger(__name__)
 
-from api.aitrios_client import AITRIOSClient
-from utils.image_utils import download_image, draw_bounding_boxes
+# 推論結果ストリーミングモードで1回のポーリングで取得する推論結果の数
+STREAMING_RESULT_COUNT = 10
+
+# 通常モードで画像と照合するために取得する推論結果の数
+IMAGE_MATCH_RESULT_COUNT = 10
 
 class DetectionProcessor:
     """AITRIOSからの画像取得と物体検出を処理するクラス"""
@@ -56,8 +53,35 @@ class DetectionProcessor:
         self.device_monitor_thread = None
         self.device_monitor_flag = threading.Event()
         
-        # 初期化時にモジュールを確保
-        ensure_modules_loaded()
+        # デコード済みフレームのキャッシュと最後に表示したフレームのキー
+        self.frame_cache = FrameCache(max_entries=8)
+        self.last_frame_key = None
+        
+        # 表示領域のサイズ（縮小デコード用）と縮小デコードの有効フラグ
+        self.display_size = None
+        self.reduced_decode = True
+        
+        # ラベル画像をキャッシュして描画するレンダラー
+        self.overlay_renderer = OverlayRenderer()
+        
+        # キャンバスオーバーレイモード（画像に描画せず、検出結果を座標で通知する）
+        self.canvas_overlay = False
+        
+        # GUIに通知するステータスメッセージの最小レベル（フレームごとのDEBUGメッセージはデフォルトで通知しない）
+        self.status_level = LOG_LEVELS["INFO"]
+        
+        # デコードを別プロセスで実行するプール（Noneの場合は処理スレッドでデコード）
+        self.decode_pool = None
+        
+        # 推論結果のバッチを受け取るリスナー（トラッキング・録画・アラート用）と処理済みの最新タイムスタンプ
+        self.detection_listeners = []
+        self.last_batch_timestamp = None
+        
+        # 表示したフレームを受け取るリスナー（Web配信用）
+        self.frame_listeners = []
+        
+        # 表示したフレームを保存するファイル（外部ツール連携用、Noneで保存しない）
+        self.snapshot_path = None
     
     def set_callback(self, callback):
         """
@@ -75,17 +99,241 @@ class DetectionProcessor:
         Args:
             objclass (list): 検出対象のクラスリスト
         """
+        if objclass != self.objclass:
+            # キャッシュ済みのオーバーレイとラベルには古いクラス名が含まれるため破棄して表示し直す
+            self.frame_cache.clear()
+            self.last_frame_key = None
         self.objclass = objclass
     
-    def notify_status(self, message):
+    def set_display_size(self, width, height):
         """
-        ステータスメッセージをコールバックで通知
+        表示領域のサイズを設定（画像の縮小デコードに使用）
         
         Args:
-            message (str): ステータスメッセージ
+            width (int): 表示領域の幅
+            height (int): 表示領域の高さ
         """
-        if self.callback:
-            self.callback("status", message)
+        display_size = (int(width), int(height))
+        if display_size != self.display_size:
+            self.display_size = display_size
+            # 縮小率が変わるためキャッシュ済みのフレームは破棄し、
+            # 画像とオーバーレイの位置がずれないよう次のフレームで画像も改めて表示する
+            self.frame_cache.clear()
+            self.last_frame_key = None
+    
+    def set_canvas_overlay(self, enabled):
+        """
+        キャンバスオーバーレイモードを切り替え
+        
+        有効な場合、画像は新しいフレームが届いたときのみ"image"で通知し、
+        バウンディングボックスは画素に描画せず"overlay"イベントで座標を通知する。
+        
+        Args:
+            enabled (bool): キャンバスオーバーレイモードを有効にするかどうか
+        """
+        if bool(enabled) != self.canvas_overlay:
+            self.canvas_overlay = bool(enabled)
+            # 表示方法が変わるため次のフレームを改めて表示する
+            self.last_frame_key = None
+    
+    def is_frame_complete(self, cached):
+        """
+        キャッシュエントリが現在の表示モードで表示可能な状態かを判定
+        
+        Args:
+            cached (dict): キャッシュエントリ
+        
+        Returns:
+            bool: 推論結果まで反映済みであればTrue
+        """
+        if cached is None:
+            return False
+        if self.canvas_overlay:
+            return cached.get("boxes") is not None
+        return cached["overlay"] is not None
+    
+    def decode_image(self, image_data):
+        """
+        画像データをデコード（表示サイズが分かる場合は縮小デコード）
+        
+        Args:
+            image_data (str or bytes): Base64エンコードされた画像データ
+        
+        Returns:
+            tuple: (OpenCV画像データ, 元画像に対する縮小率)
+        """
+        with STAGE_SECONDS.time("decode_image"):
+            if self.reduced_decode and self.display_size:
+                return download_image_for_display(image_data, *self.display_size)
+            return download_image(image_data), 1.0
+    
+    def add_detection_listener(self, listener):
+        """
+        推論結果のバッチを受け取るリスナーを追加
+        
+        リスナーは処理スレッドから(タイムスタンプのリスト, BATCH_DTYPEの配列)で呼ばれる。
+        配列のframeはタイムスタンプのインデックスで、各推論は一度だけ通知される。
+        
+        Args:
+            listener (function): リスナー関数
+        """
+        if listener not in self.detection_listeners:
+            self.detection_listeners.append(listener)
+    
+    def remove_detection_listener(self, listener):
+        """
+        推論結果のバッチを受け取るリスナーを削除
+        
+        Args:
+            listener (function): add_detection_listenerで追加したリスナー関数
+        """
+        if listener in self.detection_listeners:
+            self.detection_listeners.remove(listener)
+    
+    def add_frame_listener(self, listener):
+        """
+        表示したフレームを受け取るリスナーを追加
+        
+        リスナーは処理スレッドから(フレームの識別キー, バウンディングボックスを描画した画像, 検出ラベルのリスト)で呼ばれる。
+        画像は共有されるため、リスナーは変更してはならない。
+        
+        Args:
+            listener (function): リスナー関数
+        """
+        if listener not in self.frame_listeners:
+            self.frame_listeners.append(listener)
+    
+    def remove_frame_listener(self, listener):
+        """
+        表示したフレームを受け取るリスナーを削除
+        
+        Args:
+            listener (function): add_frame_listenerで追加したリスナー関数
+        """
+        if listener in self.frame_listeners:
+            self.frame_listeners.remove(listener)
+    
+    def _notify_frame_listeners(self, frame_key, image, detection_labels, boxes=None, frame_size=None):
+        """
+        表示したフレームをリスナーに通知
+        
+        キャンバスオーバーレイモードでは画像にバウンディングボックスが描画されていないため、
+        リスナーがある場合のみコピーに描画する。
+        
+        Args:
+            frame_key (tuple): フレームの識別キー
+            image (numpy.ndarray): 表示した画像（なければNone）
+            detection_labels (list): 検出ラベルのリスト
+            boxes (list, optional): キャンバスに描画するバウンディングボックスのリスト
+            frame_size (tuple, optional): 画像がない場合のフレームサイズ (幅, 高さ)
+        """
+        if not self.frame_listeners:
+            return
+        
+        if self.canvas_overlay:
+            if image is not None:
+                image = image.copy()
+            elif frame_size is not None:
+                image = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+            else:
+                return
+            image = self.overlay_renderer.render_boxes(image, boxes or [])
+        elif image is None:
+            return
+        
+        for listener in list(self.frame_listeners):
+            try:
+                listener(frame_key, image, detection_labels)
+            except Exception:
+                logger.exception("フレームリスナーでエラーが発生しました")
+    
+    def process_inference_batch(self, inference_results):
+        """
+        レスポンスに含まれる未処理の推論をまとめてデコードしてリスナーに通知
+        
+        Args:
+            inference_results (list): get_inference_resultsの戻り値
+        
+        Returns:
+            tuple: (タイムスタンプのリスト, BATCH_DTYPEの配列)
+        """
+        def on_error(timestamp, e):
+            FRAMES_DROPPED.inc("error")
+            self.notify_status("推論結果 %s のデコードエラー: %s", timestamp, e, level="ERROR")
+        
+        with STAGE_SECONDS.time("deserialize"):
+            timestamps, batch = detection_decoder.decode_inference_batch(
+                inference_results, since=self.last_batch_timestamp, on_error=on_error
+            )
+        if not timestamps:
+            return timestamps, batch
+        
+        latest = max(timestamps)
+        if (self.last_batch_timestamp is None or latest > self.last_batch_timestamp):
+            self.last_batch_timestamp = latest
+        
+        self.notify_status("推論結果 %s 件（検出オブジェクト数: %s）をデコード", len(timestamps), len(batch), level="DEBUG")
+        
+        # クラスごとの検出数を記録
+        class_ids, counts = np.unique(batch["class_id"], return_counts=True)
+        for class_id, count in zip(class_ids, counts):
+            DETECTIONS.inc(OverlayRenderer.get_class_name(int(class_id), self.objclass), amount=int(count))
+        
+        for listener in list(self.detection_listeners):
+            try:
+                listener(timestamps, batch)
+            except Exception:
+                logger.exception("推論結果リスナーでエラーが発生しました")
+        
+        return timestamps, batch
+    
+    def set_decode_workers(self, workers):
+        """
+        デコード用のワーカープロセス数を設定
+        
+        0の場合はプロセスプールを使用せず、処理スレッドでデコードする。
+        
+        Args:
+            workers (int): ワーカープロセス数
+        """
+        if self.decode_pool is not None:
+            self.decode_pool.shutdown()
+            self.decode_pool = None
+        
+        if workers and workers > 0:
+            from core.decode_pool import DecodePool
+            self.decode_pool = DecodePool(max_workers=workers)
+    
+    def set_status_level(self, level):
+        """
+        GUIに通知するステータスメッセージの最小レベルを設定
+        
+        Args:
+            level (str): ログレベル（"DEBUG", "INFO", "WARNING", "ERROR"）
+        """
+        self.status_level = LOG_LEVELS.get(level, LOG_LEVELS["INFO"])
+    
+    def notify_status(self, message, *args, level="INFO"):
+        """
+        ステータスメッセージをコールバックとロガーで通知
+        
+        メッセージはloggingと同じ%形式で、GUIとロガーのどちらも出力しないレベルの場合は
+        文字列の組み立てを行わない。
+        
+        Args:
+            message (str): ステータスメッセージ（%形式の書式）
+            *args: 書式に埋め込む値
+            level (str): ログレベル（"DEBUG", "INFO", "WARNING", "ERROR"）
+        """
+        level_no = LOG_LEVELS.get(level, LOG_LEVELS["INFO"])
+        notify_ui = self.callback is not None and level_no >= self.status_level
+        if not notify_ui and not logger.isEnabledFor(level_no):
+            return
+        
+        text = message % args if args else message
+        logger.log(level_no, text)
+        if notify_ui:
+            self.callback("status", (text, level))
     
     def notify_device_state(self, connection_state, operation_state):
         """
@@ -99,21 +347,80 @@ class DetectionProcessor:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             self.callback("device_state", (connection_state, operation_state, timestamp))
     
+    def _publish_frame(self, frame_key, image, detection_labels, boxes=None, frame_size=None, source="new"):
+        """
+        フレームを保存してGUIに通知
+        
+        Args:
+            frame_key (tuple): フレームの識別キー（画像名, 推論結果の有無）
+            image (numpy.ndarray): 表示する画像（キャンバスオーバーレイモードでは描画前の画像、なければNone）
+            detection_labels (list): 検出ラベルのリスト
+            boxes (list, optional): キャンバスに描画するバウンディングボックスのリスト
+            frame_size (tuple, optional): 画像がない場合のフレームサイズ (幅, 高さ)
+            source (str): フレームの取得元（"new": 新たに処理, "cache": キャッシュ）
+        """
+        # 検出情報を保存
+        self.detected_labels = detection_labels
+        FRAMES_PROCESSED.inc(source)
+        
+        if self.canvas_overlay:
+            # 画像は新しいフレームの場合のみ通知し、検出結果は座標で通知
+            if self.callback:
+                if image is not None and (self.last_frame_key is None or self.last_frame_key[0] != frame_key[0]):
+                    self.callback("image", image)
+                if image is not None:
+                    frame_size = (image.shape[1], image.shape[0])
+                self.callback("overlay", {
+                    "frame_size": frame_size,
+                    "has_image": image is not None,
+                    "boxes": boxes or []
+                })
+                self.callback("detection", self.detected_labels)
+            
+            self._notify_frame_listeners(frame_key, image, detection_labels, boxes=boxes, frame_size=frame_size)
+            self.last_frame_key = frame_key
+            return
+        
+        # 画像をjpegで保存
+        if self.snapshot_path:
+            cv2.imwrite(self.snapshot_path, image)
+        
+        # GUIに画像とステータスを表示
+        if self.callback:
+            self.callback("image", image)
+            self.callback("detection", self.detected_labels)
+        
+        self._notify_frame_listeners(frame_key, image, detection_labels)
+        self.last_frame_key = frame_key
+    
+    def _publish_cached_frame(self, frame_key, cached):
+        """
+        キャッシュ済みのフレームをGUIに通知
+        
+        Args:
+            frame_key (tuple): フレームの識別キー
+            cached (dict): キャッシュエントリ
+        """
+        if self.canvas_overlay:
+            self._publish_frame(frame_key, cached["image"], cached["labels"], boxes=cached["boxes"], frame_size=cached.get("frame_size"), source="cache")
+        else:
+            self._publish_frame(frame_key, cached["overlay"], cached["labels"], source="cache")
+    
     def decode_base64(self, encoded_data):
         """
-        Base64エンコードされたデータをデコード
+        Base64エンコードされたデータをデコード（JSONバックエンドでデコード済みのbytesはそのまま返す）
         
         Args:
-            encoded_data (str): Base64エンコードされたデータ
+            encoded_data (str or bytes): Base64エンコードされたデータ
         
         Returns:
             bytes: デコードされたバイナリデータ
         """
-        return base64.b64decode(encoded_data)
-
+        return base64_bytes(encoded_data)
+    
     def deserialize_flatbuffers(self, buf):
         """
-        FlatBuffersデータをデシリアライズ（直接インポート方式）
+        FlatBuffersデータをデシリアライズ
         
         Args:
             buf (bytes): FlatBuffersでシリアライズされたデータ
@@ -122,120 +429,100 @@ class DetectionProcessor:
             list: 検出結果のリスト
         """
         try:
-            # 現在のディレクトリのパス確認（実行時も確認）
-            import sys
-            import os
-            current_path = os.path.dirname(os.path.abspath(__file__))  # core
-            root_path = os.path.dirname(current_path)  # プロジェクトルート
-            
-            # FlatBuffersファイルの直接インポート
-            sys.path.insert(0, root_path)
-            
-            # 絶対インポートを使用
-            import flatbuffers
-            from flatbuffers.table import Table
-            
-            # ObjectDetectionTopの実装を直接組み込む
-            table_pos = flatbuffers.encode.Get(flatbuffers.packer.uoffset, buf, 0)
-            obj_table = Table(buf, table_pos)
-            
-            # Perceptionフィールドを取得
-            o = flatbuffers.number_types.UOffsetTFlags.py_type(obj_table.Offset(4))
-            if o == 0:
-                self.notify_status("パーセプションデータなし")
-                return []
-            
-            perception_pos = obj_table.Indirect(o + obj_table.Pos)
-            perception_table = Table(buf, perception_pos)
+            results = detection_decoder.decode_detections(
+                buf,
+                on_error=lambda i, e: self.notify_status("オブジェクト %s の処理中にエラー: %s", i, e, level="ERROR")
+            )
+        except Exception as e:
+            self.notify_status("デシリアライズエラー: %s", e, level="ERROR")
+            logger.debug("デシリアライズエラーの詳細", exc_info=True)
+            return []
+        
+        self.notify_status("検出オブジェクト数: %s", len(results), level="DEBUG")
+        
+        # 結果がなかった場合の処理を追加
+        if len(results) == 0:
+            self.notify_status("推論結果なし")
+        
+        return results
+    
+    async def _process_frame_in_pool(self, image_name, image_data, metadata):
+        """
+        画像と推論結果をデコードプールで処理してGUIに通知
+        
+        Args:
+            image_name (str): 画像名
+            image_data (str or bytes): Base64エンコードされた画像データ
+            metadata (str or bytes): Base64エンコードされた推論結果
+        """
+        display_size = self.display_size if self.reduced_decode else None
+        with STAGE_SECONDS.time("pool_decode"):
+            image, scale, det_array, detection_labels = await self.decode_pool.decode(
+                image_bytes=self.decode_base64(image_data),
+                metadata_bytes=self.decode_base64(metadata),
+                display_size=display_size,
+                render=not self.canvas_overlay,
+                objclass=self.objclass
+            )
+        
+        # JPEGをデコードできなかったフレームは処理スレッドでのデコードと同様に破棄する
+        if image is None:
+            FRAMES_DROPPED.inc("error")
+            self.notify_status("画像処理エラー: %sをデコードできませんでした", image_name, level="ERROR")
+            return
+        
+        detections = detection_decoder.array_to_detections(det_array)
+        self.notify_status("検出オブジェクト数: %s", len(detections), level="DEBUG")
+        
+        if self.canvas_overlay:
+            # 画素には描画せず、キャンバスに描画する座標のみを算出
+            boxes, detection_labels = self.overlay_renderer.layout(detections, self.objclass, scale_x=scale, scale_y=scale)
+            self.frame_cache.put(image_name, image=image, boxes=boxes, labels=detection_labels, scale=scale)
+            self._publish_frame((image_name, True), image, detection_labels, boxes=boxes)
+        else:
+            # ワーカーで描画済みの画像をキャッシュ
+            self.frame_cache.put(image_name, overlay=image, labels=detection_labels, scale=scale)
+            self._publish_frame((image_name, True), image, detection_labels)
+    
+    def _publish_inference(self, timestamp, detections):
+        """
+        画像のない推論結果を320x320のフレームとして表示
+        
+        Args:
+            timestamp (str): 推論結果のタイムスタンプ（空の場合はキャッシュしない）
+            detections (list): 検出結果のリスト
+        """
+        cache_key = ("inference", timestamp)
+        cached = self.frame_cache.get(cache_key) if timestamp else None
+        if self.is_frame_complete(cached):
+            if self.last_frame_key != (cache_key, True):
+                self._publish_cached_frame((cache_key, True), cached)
+            return
+        
+        try:
+            if self.canvas_overlay:
+                # 画像は生成せず、キャンバスに検出結果のみを描画
+                boxes, detection_labels = self.overlay_renderer.layout(detections, self.objclass)
+                if timestamp:
+                    self.frame_cache.put(cache_key, boxes=boxes, labels=detection_labels, frame_size=(320, 320))
+                self._publish_frame((cache_key, True), None, detection_labels, boxes=boxes, frame_size=(320, 320))
+                return
             
-            # ObjectDetectionListの長さを取得
-            o = flatbuffers.number_types.UOffsetTFlags.py_type(perception_table.Offset(4))
-            if o == 0:
-                self.notify_status("検出オブジェクトなし")
-                return []
+            # 真っ黒な320x320の画像を生成
+            self.notify_status("黒画像に推論結果を表示", level="DEBUG")
+            image = np.zeros((320, 320, 3), dtype=np.uint8)  # 黒い画像
             
-            list_length = perception_table.VectorLen(o)
-            self.notify_status(f"検出オブジェクト数: {list_length}")
+            # バウンディングボックスの描画と検出情報の取得（生成した画像に直接描画）
+            image_with_boxes, detection_labels = self.overlay_renderer.render(image, detections, self.objclass)
             
-            results = []
-            for i in range(list_length):
-                try:
-                    # ベクターの要素を取得
-                    x = perception_table.Vector(o)
-                    x += flatbuffers.number_types.UOffsetTFlags.py_type(i) * 4
-                    x = perception_table.Indirect(x)
-                    detection_table = Table(buf, x)
-                    
-                    # ClassIdを取得
-                    class_id_offset = flatbuffers.number_types.UOffsetTFlags.py_type(detection_table.Offset(4))
-                    class_id = 0
-                    if class_id_offset != 0:
-                        class_id = detection_table.Get(flatbuffers.number_types.Uint32Flags, class_id_offset + detection_table.Pos)
-                    
-                    # Scoreを取得
-                    score_offset = flatbuffers.number_types.UOffsetTFlags.py_type(detection_table.Offset(10))
-                    score = 0.0
-                    if score_offset != 0:
-                        score = detection_table.Get(flatbuffers.number_types.Float32Flags, score_offset + detection_table.Pos)
-                    
-                    # BoundingBoxTypeを取得
-                    bbox_type_offset = flatbuffers.number_types.UOffsetTFlags.py_type(detection_table.Offset(6))
-                    bbox_type = 0
-                    if bbox_type_offset != 0:
-                        bbox_type = detection_table.Get(flatbuffers.number_types.Uint8Flags, bbox_type_offset + detection_table.Pos)
-                    
-                    # BoundingBox2dの場合のみ処理
-                    if bbox_type == 1:  # BoundingBox2d
-                        bbox_offset = flatbuffers.number_types.UOffsetTFlags.py_type(detection_table.Offset(8))
-                        if bbox_offset != 0:
-                            # BoundingBoxテーブルにアクセス
-                            bbox_table = Table(buf, detection_table.Indirect(bbox_offset + detection_table.Pos))
-                            
-                            # 座標を取得
-                            left = top = right = bottom = 0
-                            
-                            # left
-                            left_offset = flatbuffers.number_types.UOffsetTFlags.py_type(bbox_table.Offset(4))
-                            if left_offset != 0:
-                                left = bbox_table.Get(flatbuffers.number_types.Int32Flags, left_offset + bbox_table.Pos)
-                            
-                            # top
-                            top_offset = flatbuffers.number_types.UOffsetTFlags.py_type(bbox_table.Offset(6))
-                            if top_offset != 0:
-                                top = bbox_table.Get(flatbuffers.number_types.Int32Flags, top_offset + bbox_table.Pos)
-                            
-                            # right
-                            right_offset = flatbuffers.number_types.UOffsetTFlags.py_type(bbox_table.Offset(8))
-                            if right_offset != 0:
-                                right = bbox_table.Get(flatbuffers.number_types.Int32Flags, right_offset + bbox_table.Pos)
-                            
-                            # bottom
-                            bottom_offset = flatbuffers.number_types.UOffsetTFlags.py_type(bbox_table.Offset(10))
-                            if bottom_offset != 0:
-                                bottom = bbox_table.Get(flatbuffers.number_types.Int32Flags, bottom_offset + bbox_table.Pos)
-                            
-                            # 結果を追加
-                            results.append({
-                                "class_id": class_id,
-                                "score": score,
-                                "left": left,
-                                "top": top,
-                                "right": right,
-                                "bottom": bottom
-                            })
-                except Exception as e:
-                    self.notify_status(f"オブジェクト {i} の処理中にエラー: {str(e)}")
+            if timestamp:
+                self.frame_cache.put(cache_key, overlay=image_with_boxes, labels=detection_labels)
             
-            # 結果がなかった場合の処理を追加
-            if len(results) == 0:
-                self.notify_status("推論結果なし")
-                
-            return results
+            # GUIに画像とステータスを表示
+            self._publish_frame((cache_key, True), image_with_boxes, detection_labels)
         except Exception as e:
-            self.notify_status(f"デシリアライズエラー: {str(e)}")
-            import traceback
-            self.notify_status(traceback.format_exc())
-            return []
+            FRAMES_DROPPED.inc("error")
+            self.notify_status("推論結果処理エラー: %s", e, level="ERROR")
     
     async def monitor_device_state_async(self, running_flag):
         """
@@ -254,15 +541,15 @@ class DetectionProcessor:
                 
                 # デバイス状態に応じたログ
                 if connection_state == "Connected":
-                    self.notify_status(f"デバイス接続中: {operation_state}")
+                    self.notify_status("デバイス接続中: %s", operation_state, level="DEBUG")
                 else:
-                    self.notify_status(f"デバイス未接続: {connection_state}")
+                    self.notify_status("デバイス未接続: %s", connection_state, level="DEBUG")
                 
                 # 10秒ごとに状態を更新
                 await asyncio.sleep(10)
-                
+            
             except Exception as e:
-                self.notify_status(f"デバイス状態取得エラー: {str(e)}")
+                self.notify_status("デバイス状態取得エラー: %s", e, level="ERROR")
                 await asyncio.sleep(10)
     
     # tkinterとasyncioの連携のためのヘルパーメソッド
@@ -278,9 +565,12 @@ class DetectionProcessor:
         asyncio.set_event_loop(loop)
         
         # 非同期関数を実行
-        loop.run_until_complete(self.monitor_device_state_async(running_flag))
-        loop.close()
-            
+        try:
+            loop.run_until_complete(self.monitor_device_state_async(running_flag))
+        finally:
+            loop.run_until_complete(self.aitrios_client.close_session())
+            loop.close()
+    
     async def process_images_async(self, running_flag):
         """
         画像取得と検出処理のメインループ（非同期バージョン）
@@ -288,16 +578,6 @@ class DetectionProcessor:
         Args:
             running_flag (threading.Event): 処理実行のフラグ
         """
-        # 実行時にもパスの設定を確認
-        import sys
-        import os
-        current_path = os.path.dirname(os.path.abspath(__file__))  # core
-        root_path = os.path.dirname(current_path)  # プロジェクトルート
-        
-        if root_path not in sys.path:
-            sys.path.insert(0, root_path)
-            self.notify_status(f"パスを追加: {root_path}")
-        
         # 現在のデバイス状態
         current_connection_state = "Unknown"
         current_operation_state = "Unknown"
@@ -309,50 +589,32 @@ class DetectionProcessor:
                     connection_state, operation_state = await self.aitrios_client.get_connection_state()
                     current_connection_state = connection_state
                     current_operation_state = operation_state
-                    self.notify_status(f"デバイス状態: {connection_state} - {operation_state}")
+                    self.notify_status("デバイス状態: %s - %s", connection_state, operation_state, level="DEBUG")
                 except Exception as e:
-                    self.notify_status(f"デバイス状態取得エラー: {str(e)}")
+                    self.notify_status("デバイス状態取得エラー: %s", e, level="ERROR")
                 
                 # StreamingInferenceResultモードでの処理
                 if current_connection_state == "Connected" and current_operation_state == "StreamingInferenceResult":
-                    self.notify_status("推論結果ストリーミングモードで動作中")
+                    self.notify_status("推論結果ストリーミングモードで動作中", level="DEBUG")
                     
-                    # 推論結果のみを取得
-                    inference_results = await self.aitrios_client.get_inference_results(1)
+                    # 推論結果のみを取得（ポーリング間隔の間に届いた推論もまとめてデコード）
+                    inference_results = await self.aitrios_client.get_inference_results(STREAMING_RESULT_COUNT)
+                    timestamps, batch = self.process_inference_batch(inference_results)
                     
-                    if isinstance(inference_results, list) and len(inference_results) > 0:
-                        result = inference_results[0]
-                        if "inference_result" in result and "Inferences" in result["inference_result"]:
-                            for inference in result["inference_result"]["Inferences"]:
-                                if "O" in inference:
-                                    try:
-                                        # メタデータのデコードとデシリアライズ
-                                        decoded_data = self.decode_base64(inference["O"])
-                                        deserialized_data = self.deserialize_flatbuffers(decoded_data)
-                                        
-                                        # 真っ黒な320x320の画像を生成
-                                        self.notify_status("黒画像に推論結果を表示")
-                                        image = np.zeros((320, 320, 3), dtype=np.uint8)  # 黒い画像
-                                        
-                                        # バウンディングボックスの描画と検出情報の取得
-                                        image_with_boxes, detection_labels = draw_bounding_boxes(image, deserialized_data, self.objclass, scale_x=1, scale_y=1)
-                                        
-                                        # 検出情報を保存
-                                        self.detected_labels = detection_labels
-                                        
-                                        # 画像をjpegで保存
-                                        output_path = 'jpeg.jpg'
-                                        cv2.imwrite(output_path, image_with_boxes)
-                                        
-                                        # GUIに画像とステータスを表示
-                                        if self.callback:
-                                            # OpenCV画像をRGB形式に変換
-                                            self.callback("image", image_with_boxes)
-                                            self.callback("detection", self.detected_labels)
-                                    except Exception as e:
-                                        self.notify_status(f"推論結果処理エラー: {str(e)}")
-                                    
-                                    break  # 最初の推論結果のみを処理
+                    if timestamps:
+                        # 最新の推論結果を表示
+                        frame = len(timestamps) - 1
+                        detections = detection_decoder.array_to_detections(detection_decoder.batch_frame(batch, frame))
+                        if len(detections) == 0:
+                            self.notify_status("推論結果なし")
+                        self._publish_inference(timestamps[frame], detections)
+                    else:
+                        # 新しい推論がなければ、描画済みの最新の推論結果を再表示（再開直後など）
+                        if self.last_batch_timestamp:
+                            cache_key = ("inference", self.last_batch_timestamp)
+                            cached = self.frame_cache.get(cache_key)
+                            if self.is_frame_complete(cached) and self.last_frame_key != (cache_key, True):
+                                self._publish_cached_frame((cache_key, True), cached)
                     
                     # 短い間隔で更新
                     await asyncio.sleep(1)
@@ -362,23 +624,23 @@ class DetectionProcessor:
                 # 画像ディレクトリの取得
                 directories = await self.aitrios_client.get_image_directories()
                 if not directories or not directories[0]['devices']:
-                    self.notify_status("画像ディレクトリが見つかりません")
+                    self.notify_status("画像ディレクトリが見つかりません", level="WARNING")
                     await asyncio.sleep(5)
                     continue
-
+                
                 # 最新の1つの画像サブディレクトリ名を取得
                 latest_subdirs = directories[0]['devices'][0]['Image'][-1:]
-
+                
                 for i, subdir in enumerate(reversed(latest_subdirs)):
                     if not running_flag.is_set():
                         break
                     
                     # 最新の画像を取得
-                    self.notify_status(f"{subdir}から最新画像を取得中")
+                    self.notify_status("%sから最新画像を取得中", subdir, level="DEBUG")
                     image_data = await self.aitrios_client.get_images(subdir)
                     
                     if not image_data or 'images' not in image_data or len(image_data['images']) == 0:
-                        self.notify_status(f"サブディレクトリ {subdir} に画像が見つかりません")
+                        self.notify_status("サブディレクトリ %s に画像が見つかりません", subdir, level="WARNING")
                         continue
                     
                     # 最新画像の情報を取得
@@ -386,11 +648,21 @@ class DetectionProcessor:
                     image_name = latest_image["name"]
                     image_timestamp = image_name.split('.')[0]  # 拡張子を除いたファイル名（タイムスタンプ）
                     
-                    self.notify_status(f"最新画像: {image_name}, タイムスタンプ: {image_timestamp}")
+                    self.notify_status("最新画像: %s, タイムスタンプ: %s", image_name, image_timestamp, level="DEBUG")
+                    
+                    # 推論結果まで描画済みの画像であればメタデータの比較のみで終了
+                    cached = self.frame_cache.get(image_name)
+                    if self.is_frame_complete(cached):
+                        if self.last_frame_key != (image_name, True):
+                            self._publish_cached_frame((image_name, True), cached)
+                        else:
+                            self.notify_status("画像 %s に変更なし", image_name, level="DEBUG")
+                        continue
                     
                     # 推論結果を取得
-                    self.notify_status("推論結果を取得中")
-                    inference_results = await self.aitrios_client.get_inference_results(10)
+                    self.notify_status("推論結果を取得中", level="DEBUG")
+                    inference_results = await self.aitrios_client.get_inference_results(IMAGE_MATCH_RESULT_COUNT)
+                    timestamps, batch = self.process_inference_batch(inference_results)
                     
                     found_matching_inference = False
                     matching_inference = None
@@ -403,70 +675,92 @@ class DetectionProcessor:
                                     if "T" in inference and inference["T"] == image_timestamp:
                                         matching_inference = inference
                                         found_matching_inference = True
-                                        self.notify_status(f"画像 {image_name} に対応する推論結果を発見")
+                                        self.notify_status("画像 %s に対応する推論結果を発見", image_name, level="DEBUG")
                                         break
                                 if found_matching_inference:
                                     break
                     
                     # 一致する推論結果が見つからない場合
                     if not found_matching_inference:
-                        self.notify_status(f"画像 {image_name} に対応する推論結果が見つかりません")
+                        self.notify_status("画像 %s に対応する推論結果が見つかりません", image_name)
+                        
+                        # 表示済みの画像であれば再表示しない
+                        if self.last_frame_key == (image_name, False):
+                            continue
                         
                         # この部分を追加：推論結果がなくても画像を表示
                         try:
-                            # 画像をダウンロード
-                            image = download_image(latest_image["contents"])
+                            # 画像をダウンロード（キャッシュ済みであればデコードを省略）
+                            if cached is not None and cached["image"] is not None:
+                                image = cached["image"]
+                            else:
+                                image, scale = self.decode_image(latest_image["contents"])
+                                self.frame_cache.put(image_name, image=image, scale=scale)
                             
                             # 推論結果なしの場合でも画像を表示
-                            detection_labels = ["推論結果なし"]
-                            self.detected_labels = detection_labels
-                            
-                            # 画像をjpegで保存
-                            output_path = 'jpeg.jpg'
-                            cv2.imwrite(output_path, image)
-                            
-                            # GUIに画像とステータスを表示
-                            if self.callback:
-                                self.callback("image", image)
-                                self.callback("detection", self.detected_labels)
+                            self._publish_frame((image_name, False), image, ["推論結果なし"], boxes=[])
                         except Exception as e:
-                            self.notify_status(f"画像処理エラー: {str(e)}")
+                            FRAMES_DROPPED.inc("error")
+                            self.notify_status("画像処理エラー: %s", e, level="ERROR")
                         
                         continue
                     
                     # 対応する推論結果が見つかった場合の処理
                     if matching_inference and "O" in matching_inference:
                         try:
-                            # メタデータのデコードとデシリアライズ
-                            decoded_data = self.decode_base64(matching_inference["O"])
-                            deserialized_data = self.deserialize_flatbuffers(decoded_data)
+                            # デコードプールが有効で未デコードの画像であれば、デコードと描画をワーカープロセスで実行
+                            if self.decode_pool is not None and (cached is None or cached["image"] is None):
+                                await self._process_frame_in_pool(image_name, latest_image["contents"], matching_inference["O"])
+                                continue
                             
-                            # 画像をダウンロード
-                            image = download_image(latest_image["contents"])
+                            # 今回のバッチでデコード済みであれば再利用し、なければデコードとデシリアライズ
+                            if image_timestamp in timestamps:
+                                deserialized_data = detection_decoder.array_to_detections(
+                                    detection_decoder.batch_frame(batch, timestamps.index(image_timestamp))
+                                )
+                                if len(deserialized_data) == 0:
+                                    self.notify_status("推論結果なし")
+                            else:
+                                with STAGE_SECONDS.time("deserialize"):
+                                    decoded_data = self.decode_base64(matching_inference["O"])
+                                    deserialized_data = self.deserialize_flatbuffers(decoded_data)
                             
-                            # バウンディングボックスの描画と検出情報の取得
-                            image_with_boxes, detection_labels = draw_bounding_boxes(image, deserialized_data, self.objclass, scale_x=1, scale_y=1)
+                            # 画像をダウンロード（キャッシュ済みであればデコードを省略）
+                            # バウンディングボックスの描画と検出情報の取得（縮小デコードに合わせて座標をスケーリング）
+                            if self.canvas_overlay:
+                                # 画素には描画せず、キャンバスに描画する座標のみを算出
+                                if cached is not None and cached["image"] is not None:
+                                    image, scale = cached["image"], cached["scale"]
+                                else:
+                                    image, scale = self.decode_image(latest_image["contents"])
+                                boxes, detection_labels = self.overlay_renderer.layout(deserialized_data, self.objclass, scale_x=scale, scale_y=scale)
+                                self.frame_cache.put(image_name, image=image, boxes=boxes, labels=detection_labels, scale=scale)
+                                self._publish_frame((image_name, True), image, detection_labels, boxes=boxes)
+                                continue
                             
-                            # 検出情報を保存
-                            self.detected_labels = detection_labels
+                            if cached is not None and cached["image"] is not None:
+                                # 表示済みの画像は変更しないようコピーに描画
+                                image, scale = cached["image"], cached["scale"]
+                                image_with_boxes, detection_labels = draw_bounding_boxes(image, deserialized_data, self.objclass, scale_x=scale, scale_y=scale)
+                            else:
+                                # デコードしたばかりの画像には直接描画
+                                image, scale = self.decode_image(latest_image["contents"])
+                                image_with_boxes, detection_labels = self.overlay_renderer.render(image, deserialized_data, self.objclass, scale_x=scale, scale_y=scale)
                             
-                            # 画像をjpegで保存
-                            output_path = 'jpeg.jpg'
-                            cv2.imwrite(output_path, image_with_boxes)
+                            # 描画済み画像をキャッシュ
+                            self.frame_cache.put(image_name, overlay=image_with_boxes, labels=detection_labels, scale=scale)
                             
                             # GUIに画像とステータスを表示
-                            if self.callback:
-                                # OpenCV画像をRGB形式に変換
-                                self.callback("image", image_with_boxes)
-                                self.callback("detection", self.detected_labels)
+                            self._publish_frame((image_name, True), image_with_boxes, detection_labels)
                         except Exception as e:
-                            self.notify_status(f"推論結果処理エラー: {str(e)}")
+                            FRAMES_DROPPED.inc("error")
+                            self.notify_status("推論結果処理エラー: %s", e, level="ERROR")
                 
                 # 処理間隔を設ける
                 await asyncio.sleep(5)
-                
+            
             except Exception as e:
-                self.notify_status(f"エラー: {str(e)}")
+                self.notify_status("エラー: %s", e, level="ERROR")
                 await asyncio.sleep(5)
     
     # tkinterとasyncioの連携のためのヘルパーメソッド
@@ -481,6 +775,9 @@ class DetectionProcessor:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
+        # 再開時はキャッシュ済みのフレームも改めて表示する
+        self.last_frame_key = None
+        
         # デバイス状態監視スレッドの開始
         self.device_monitor_flag.set()
         self.device_monitor_thread = threading.Thread(
@@ -496,6 +793,7 @@ class DetectionProcessor:
         except asyncio.CancelledError:
             pass
         finally:
+            loop.run_until_complete(self.aitrios_client.close_session())
             loop.close()
             
             # 処理終了時にデバイス監視も終了
@@ -9,6 +9,9 @@
 import os
 import re
 import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class SettingsManager:
     """設定ファイルの読み書きを管理するクラス"""
@@ -26,15 +29,15 @@ class SettingsManager:
         if hasattr(settings_module, '__file__'):
             # モジュールの実際のファイルパスを取得
             self.settings_file = os.path.abspath(settings_module.__file__)
-            print(f"設定ファイルのパス: {self.settings_file}")
+            logger.debug("設定ファイルのパス: %s", self.settings_file)
         else:
             # モジュールのファイルパスが取得できない場合のフォールバック
-            print("警告: モジュールのファイルパスが取得できません。フォールバックを使用します。")
+            logger.warning("モジュールのファイルパスが取得できません。フォールバックを使用します。")
             # 現在のプロジェクトディレクトリを取得
             current_dir = os.path.dirname(os.path.abspath(__file__))
             parent_dir = os.path.dirname(current_dir)
             self.settings_file = os.path.join(parent_dir, "settings.py")
-            print(f"フォールバックパス: {self.settings_file}")
+            logger.info("フォールバックパス: %s", self.settings_file)
         
         self.config = {}
         self.load_settings()
@@ -70,7 +73,7 @@ class SettingsManager:
             if not os.path.exists(self.settings_file):
                 raise FileNotFoundError(f"設定ファイルが見つかりません: {self.settings_file}")
             
-            print(f"設定を保存: {self.settings_file}")
+            logger.info("設定を保存: %s", self.settings_file)
             
             # 設定ファイルの内容を一旦読み込む
             with open(self.settings_file, 'r', encoding='utf-8') as f:
@@ -88,7 +91,7 @@ class SettingsManager:
                     if re.search(pattern, modified_content):
                         modified_content = re.sub(pattern, replacement, modified_content)
                     else:
-                        print(f"警告: {key}のパターンがマッチしませんでした")
+                        logger.warning("%sのパターンがマッチしませんでした", key)
             
             # numberofclassの更新
             if 'numberofclass' in new_settings:
@@ -98,7 +101,7 @@ class SettingsManager:
                 if re.search(pattern, modified_content):
                     modified_content = re.sub(pattern, replacement, modified_content)
                 else:
-                    print(f"警告: numberofclassのパターンがマッチしませんでした")
+                    logger.warning("numberofclassのパターンがマッチしませんでした")
             
             # objclassの更新
             if 'objclass' in new_settings:
@@ -119,11 +122,11 @@ class SettingsManager:
                 if re.search(pattern, modified_content, re.DOTALL):
                     modified_content = re.sub(pattern, replacement, modified_content, flags=re.DOTALL)
                 else:
-                    print(f"警告: objclassのパターンがマッチしませんでした")
+                    logger.warning("objclassのパターンがマッチしませんでした")
             
             # 変更がないかチェック
             if content == modified_content:
-                print("情報: 変更がありませんでした。現在の設定が既に保存されています。")
+                logger.info("変更がありませんでした。現在の設定が既に保存されています。")
                 # 変更がなくても成功として扱う
                 return True
             
@@ -138,12 +141,10 @@ class SettingsManager:
             # コンフィグを更新
             self.config = new_settings
             
-            print("設定が正常に保存されました")
+            logger.info("設定が正常に保存されました")
             return True
         except Exception as e:
-            print(f"設定保存エラー: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("設定保存エラー: %s", e)
             return False
             
     def get_setting(self, key, default=None):
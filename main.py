@@ -8,49 +8,261 @@ Kumakita - AITRIOSによる物体検出と熊検出警告アプリケーショ
 作成者：AI Assistant
 """
 
+import time
+
+# 起動時間の計測開始
+_startup_start = time.perf_counter()
+
 import sys
 import os
 import argparse
+import logging
 
 # 現在のディレクトリをパスに追加
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-# デバッグ出力
-print(f"Python path: {sys.path}")
-print(f"Current directory: {current_dir}")
+# 起動時間の計測（インポートの内訳も記録）
+from utils.startup_timer import StartupTimer
+startup_timer = StartupTimer(_startup_start)
+startup_timer.import_timer.install()
 
 # UI部分をインポート
 from ui.main_window import KumakitaApp
+from utils.logging_utils import setup_logging, shutdown_logging, parse_module_levels
+from utils.metrics import start_metrics_server
+from utils.json_backend import BACKEND as JSON_BACKEND
+from utils.profiler import ProfilerManager, PROFILE_MODES, DEFAULT_REPORT_DIR
+from core.apply_journal import DEFAULT_JOURNAL_PATH
+from utils.image_utils import DISPLAY_INTERPOLATIONS
+
+startup_timer.mark("imports")
+
+logger = logging.getLogger(__name__)
 
 def parse_args():
     """コマンドライン引数をパース"""
     parser = argparse.ArgumentParser(description='KumaDesktop - AITRIOSデバイス物体検出モニター')
     parser.add_argument('--debug', action='store_true', help='デバッグモードを有効化')
     parser.add_argument('--settings', type=str, help='代替設定ファイルのパス')
+    parser.add_argument('--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='ログレベル（デフォルト: INFO）')
+    parser.add_argument('--log-module', action='append', default=[], metavar='NAME=LEVEL',
+                        help='モジュールごとのログレベル（例: api=DEBUG、複数指定可）')
+    parser.add_argument('--log-json', action='store_true', help='ログをJSON形式で出力')
+    parser.add_argument('--log-file', type=str, help='ログの出力先ファイル')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='メトリクスを公開するローカルHTTPポート（/metrics、0で無効）')
+    parser.add_argument('--decode-workers', type=int, default=0,
+                        help='画像と推論結果のデコードに使用するワーカープロセス数（0で処理スレッドでデコード）')
+    parser.add_argument('--display-quality', choices=list(DISPLAY_INTERPOLATIONS), default='quality',
+                        help='表示用リサイズの画質（fast: 最近傍、balanced: 線形補間、quality: 面積平均）')
+    parser.add_argument('--param-cache', type=str,
+                        help='コマンドパラメーターファイル一覧のキャッシュを保存するファイル（起動直後から前回の一覧を表示）')
+    parser.add_argument('--param-journal', type=str, default=DEFAULT_JOURNAL_PATH,
+                        help='コマンドパラメーター適用のジャーナルファイル（中断した適用を次回起動時に再開・取り消し）')
+    parser.add_argument('--web-port', type=int, default=0,
+                        help='Web UIとAPIを提供するHTTPポート（0で無効、--headlessでは省略時8080）')
+    parser.add_argument('--web-host', type=str, default='127.0.0.1',
+                        help='Webサーバーが待ち受けるアドレス（デフォルト: ローカルのみ、共有する場合は0.0.0.0）')
+    parser.add_argument('--web-max-fps', type=float, default=10,
+                        help='WebSocket・MJPEGでフレームを配信する最大頻度（1秒あたりの回数、0で制限なし）')
+    parser.add_argument('--snapshot', metavar='PATH', default=None,
+                        help='表示したフレームを指定したJPEGファイルに毎回保存する（外部ツール連携用、通常はMJPEG配信を使用）')
+    parser.add_argument('--clip-classes', type=str, default='',
+                        help='検出時に前後のクリップを録画するクラス名（カンマ区切り、例: bear,person、省略時は録画しない）')
+    parser.add_argument('--clip-dir', type=str, default='clips', help='クリップの保存先ディレクトリ')
+    parser.add_argument('--clip-format', type=str, default='mp4', choices=['mp4', 'avi'],
+                        help='クリップの形式（mp4: MPEG-4, avi: MJPEG）')
+    parser.add_argument('--clip-pre', type=float, default=10, help='クリップに含める検出前の秒数')
+    parser.add_argument('--clip-post', type=float, default=10, help='クリップに含める最後の検出後の秒数')
+    parser.add_argument('--clip-buffer-mb', type=float, default=64,
+                        help='検出前のフレームを保持するバッファの上限（MB、フレーム数ではなくサイズで制限）')
+    parser.add_argument('--headless', action='store_true',
+                        help='ウィンドウを表示せず、検出処理とWebサーバーのみを実行')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='最初の描画と最初のフレーム表示時に起動時間の内訳（インポート時間を含む）を出力')
+    parser.add_argument('--profile', action='append', default=[], choices=PROFILE_MODES,
+                        help='起動時に開始するプロファイル（cpu: cProfile, sample: サンプリング, memory: tracemalloc、複数指定可）')
+    parser.add_argument('--profile-dir', type=str, default=DEFAULT_REPORT_DIR, help='プロファイルレポートの出力先ディレクトリ')
+    parser.add_argument('--profile-duration', type=float, default=30, help='cProfileで計測する時間（秒）')
+    parser.add_argument('--profile-interval', type=float, default=10, help='メモリスナップショットの採取間隔（分）')
     return parser.parse_args()
 
+def start_clip_recorder(processor, args):
+    """
+    クリップ録画を開始（--clip-classes指定時のみ）
+    
+    Args:
+        processor (DetectionProcessor): フレームと推論結果を提供する検出プロセッサ
+        args (argparse.Namespace): コマンドライン引数
+    
+    Returns:
+        ClipRecorder: 開始したクリップ録画（録画しない場合はNone）
+    """
+    target_classes = [name.strip() for name in args.clip_classes.split(',') if name.strip()]
+    if not target_classes:
+        return None
+    
+    from core.clip_recorder import ClipRecorder
+    recorder = ClipRecorder(
+        processor,
+        args.clip_dir,
+        target_classes,
+        pre_seconds=args.clip_pre,
+        post_seconds=args.clip_post,
+        buffer_bytes=int(args.clip_buffer_mb * 1024 * 1024),
+        clip_format=args.clip_format
+    )
+    recorder.start()
+    logger.info("クリップ録画を開始しました: %s -> %s", ", ".join(target_classes), args.clip_dir)
+    return recorder
+
+def run_headless(args):
+    """
+    ウィンドウを表示せずに検出処理とWebサーバーを実行（Ctrl+Cで終了）
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+    """
+    import threading
+    import settings
+    from api.aitrios_client import AITRIOSClient
+    from core.command_parameter_manager import CommandParameterManager
+    from core.detection_processor import DetectionProcessor
+    from web.server import start_web_server, DEFAULT_WEB_PORT
+    
+    # デスクトップアプリと同じ構成で、APIクライアントとポーリング処理を1つだけ作成
+    aitrios_client = AITRIOSClient(settings.DEVICE_ID, settings.CLIENT_ID, settings.CLIENT_SECRET)
+    command_param_manager = CommandParameterManager(
+        aitrios_client,
+        cache_path=args.param_cache,
+        journal_path=args.param_journal
+    )
+    if command_param_manager.get_pending_transactions():
+        logger.warning("中断したコマンドパラメーターの適用があります。デスクトップアプリで再開または取り消してください")
+    
+    processor = DetectionProcessor(aitrios_client, settings.objclass)
+    processor.set_decode_workers(args.decode_workers)
+    processor.snapshot_path = args.snapshot
+    
+    clip_recorder = start_clip_recorder(processor, args)
+    
+    port = args.web_port or DEFAULT_WEB_PORT
+    web_server = start_web_server(processor, command_param_manager, port=port, host=args.web_host, max_fps=args.web_max_fps)
+    logger.info("Webサーバーを起動しました: http://%s:%d/", args.web_host, port)
+    
+    running_flag = threading.Event()
+    running_flag.set()
+    processing_thread = threading.Thread(target=processor.process_images, args=(running_flag,), daemon=True)
+    processing_thread.start()
+    
+    try:
+        while processing_thread.is_alive():
+            processing_thread.join(1.0)
+    except KeyboardInterrupt:
+        logger.info("終了します")
+    finally:
+        running_flag.clear()
+        processing_thread.join(1.0)
+        web_server.shutdown()
+        if clip_recorder is not None:
+            clip_recorder.stop()
+        processor.set_decode_workers(0)
+
 def main():
     """アプリケーションのエントリーポイント"""
     # コマンドライン引数を解析
     args = parse_args()
     
+    # ロギングを設定（デバッグモードではDEBUGレベル）
+    setup_logging(
+        level='DEBUG' if args.debug else args.log_level,
+        json_output=args.log_json,
+        module_levels=parse_module_levels(args.log_module),
+        log_file=args.log_file
+    )
+    
     # デバッグモードが有効な場合は追加の情報を出力
     if args.debug:
-        print("デバッグモードが有効です")
-        print("Python バージョン:", sys.version)
-        print("モジュールの検索パス:")
-        for path in sys.path:
-            print(f"  - {path}")
+        logger.debug("デバッグモードが有効です")
+        logger.debug("Python バージョン: %s", sys.version)
+        logger.debug("Current directory: %s", current_dir)
+        logger.debug("モジュールの検索パス: %s", sys.path)
+        logger.debug("JSONバックエンド: %s", JSON_BACKEND)
     
     # 代替設定ファイルの処理（未実装）
     if args.settings:
-        print(f"注意: 代替設定ファイル機能は未実装です: {args.settings}")
+        logger.warning("代替設定ファイル機能は未実装です: %s", args.settings)
+    
+    # メトリクス公開用のHTTPサーバーを起動（ローカルのみ）
+    metrics_server = None
+    if args.metrics_port:
+        try:
+            metrics_server = start_metrics_server(args.metrics_port)
+            logger.info("メトリクスを公開中: http://127.0.0.1:%d/metrics", args.metrics_port)
+        except OSError as e:
+            logger.error("メトリクスサーバーの起動に失敗しました: %s", e)
+    
+    # プロファイラーの準備（--profile指定時のみ、メニューとシグナルからも操作可能）
+    profiler = None
+    if args.profile:
+        profiler = ProfilerManager(
+            report_dir=args.profile_dir,
+            cpu_duration=args.profile_duration,
+            memory_interval=args.profile_interval
+        )
+        profiler.install_signal_handlers()
     
-    # アプリケーションを起動
-    app = KumakitaApp()
-    app.mainloop()
+    web_server = None
+    clip_recorder = None
+    try:
+        if args.headless:
+            # ウィンドウを描画しないため、ここでインポート時間の計測を終了する
+            startup_timer.import_timer.uninstall()
+            if args.startup_report:
+                logger.info("\n".join(startup_timer.report()))
+            if profiler is not None:
+                profiler.start(args.profile)
+            run_headless(args)
+            return
+        
+        # アプリケーションを起動
+        app = KumakitaApp(profiler=profiler, startup_timer=startup_timer, startup_report=args.startup_report,
+                          decode_workers=args.decode_workers, display_quality=args.display_quality,
+                          param_cache_path=args.param_cache, param_journal_path=args.param_journal)
+        app.processor.snapshot_path = args.snapshot
+        clip_recorder = start_clip_recorder(app.processor, args)
+        if profiler is not None:
+            profiler.start(args.profile)
+        
+        # Web UIとAPIを提供するサーバーを起動（アプリケーションと検出処理を共有）
+        if args.web_port:
+            try:
+                from web.server import start_web_server
+                web_server = start_web_server(app.processor, app.command_param_manager, port=args.web_port, host=args.web_host,
+                                              max_fps=args.web_max_fps)
+                logger.info("Webサーバーを起動しました: http://%s:%d/", args.web_host, args.web_port)
+            except OSError as e:
+                logger.error("Webサーバーの起動に失敗しました: %s", e)
+        
+        app.mainloop()
+    finally:
+        if web_server is not None:
+            web_server.shutdown()
+        
+        if clip_recorder is not None:
+            clip_recorder.stop()
+        
+        if profiler is not None:
+            profiler.shutdown()
+        
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        
+        # 残っているログを出力してから終了
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+/**
+ * Web UI共通モジュール
+ * デバイスの選択、モーダルの表示、トースト通知を担当
+ */
+
+document.addEventListener('DOMContentLoaded', () => {
+    loadDevices();
+    
+    const deviceSelect = document.getElementById('device-select');
+    if (deviceSelect) {
+        deviceSelect.addEventListener('change', () => showLiveStream(deviceSelect.value));
+    }
+});
+
+/**
+ * 推論結果を保持しているデバイスの一覧を読み込む
+ */
+function loadDevices() {
+    fetch('/api/devices')
+        .then(response => response.json())
+        .then(data => {
+            const deviceSelect = document.getElementById('device-select');
+            deviceSelect.innerHTML = '';
+            (data.devices || []).forEach(device => {
+                const option = document.createElement('option');
+                option.value = device.device_id;
+                option.textContent = device.device_id;
+                deviceSelect.appendChild(option);
+            });
+            showLiveStream(deviceSelect.value);
+        })
+        .catch(error => {
+            console.error('Error fetching devices:', error);
+            showToast('デバイス一覧の取得に失敗しました', 'error');
+        });
+}
+
+/**
+ * デバイスのMJPEGストリームを表示
+ * @param {string} deviceId - デバイスID
+ */
+function showLiveStream(deviceId) {
+    const stream = document.getElementById('live-stream');
+    if (!stream) {
+        return;
+    }
+    if (deviceId) {
+        stream.src = `/mjpeg/${encodeURIComponent(deviceId)}`;
+        stream.style.display = 'block';
+    } else {
+        stream.removeAttribute('src');
+        stream.style.display = 'none';
+    }
+}
+
+/**
+ * 選択したデバイスのコマンドパラメーター設定を開く
+ */
+function openCommandParams() {
+    const deviceId = document.getElementById('device-select').value;
+    if (!deviceId) {
+        showToast('デバイスが選択されていません', 'error');
+        return;
+    }
+    
+    document.getElementById('command-params-title').textContent = deviceId;
+    document.getElementById('command-params-device-id').setAttribute('value', deviceId);
+    document.getElementById('command-params-modal').classList.add('open');
+    loadCommandParameters(deviceId);
+}
+
+/**
+ * 表示中のモーダルをすべて閉じる
+ */
+function closeAllModals() {
+    document.querySelectorAll('.modal.open').forEach(modal => modal.classList.remove('open'));
+}
+
+/**
+ * トースト通知を表示
+ * @param {string} message - メッセージ
+ * @param {string} type - 種類（success, error）
+ */
+function showToast(message, type = 'success') {
+    const container = document.getElementById('toast-container');
+    const toast = document.createElement('div');
+    toast.className = `toast toast-${type}`;
+    toast.textContent = message;
+    container.appendChild(toast);
+    setTimeout(() => toast.remove(), 4000);
+}
@@ -6,7 +6,18 @@ UIモジュール
 
 from ui.main_window import KumakitaApp
 from ui.main_tab import MainTab
-from ui.settings_tab import SettingsTab
-from ui.command_params_tab import CommandParamsTab
+from ui.ui_dispatcher import UIDispatcher
 
-__all__ = ['KumakitaApp', 'MainTab', 'SettingsTab', 'CommandParamsTab']
\ No newline at end of file
+# 起動時に表示しないタブは最初に参照されたときに読み込む
+_LAZY_TABS = {
+    'SettingsTab': 'ui.settings_tab',
+    'CommandParamsTab': 'ui.command_params_tab',
+}
+
+def __getattr__(name):
+    if name in _LAZY_TABS:
+        import importlib
+        return getattr(importlib.import_module(_LAZY_TABS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['KumakitaApp', 'MainTab', 'SettingsTab', 'CommandParamsTab', 'UIDispatcher']
\ No newline at end of file
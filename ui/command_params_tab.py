@@ -7,19 +7,18 @@
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, StringVar, IntVar, DoubleVar
+from tkinter import ttk, messagebox, StringVar, IntVar, DoubleVar, BooleanVar
 import json
-import threading
-import re
-import asyncio
-import functools
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CommandParamsTab:
     """
     コマンドパラメータータブのUI実装
     """
     
-    def __init__(self, parent, command_param_manager, settings_manager, main_app=None):
+    def __init__(self, parent, command_param_manager, settings_manager, main_app=None, async_app=None):
         """
         コマンドパラメータータブの初期化
         
@@ -28,12 +27,17 @@ class CommandParamsTab:
             command_param_manager (CommandParameterManager): コマンドパラメーター管理オブジェクト
             settings_manager (SettingsManager): 設定管理オブジェクト
             main_app (KumakitaApp, optional): メインアプリケーションへの参照
+            async_app (AsyncTkApp, optional): 非同期処理を実行するイベントループ（省略時はmain_appのものを使用）
         """
         self.parent = parent
         self.command_param_manager = command_param_manager
         self.settings_manager = settings_manager
         self.main_app = main_app  # メインアプリケーションへの参照を保持
         
+        # 通信処理はアプリケーション共通のイベントループで実行し、タブを離れたらキャンセルする
+        self.async_app = async_app
+        self.pending_futures = set()
+        
         # UIの構築
         self.setup_ui()
     
@@ -63,6 +67,35 @@ class CommandParamsTab:
         self.bound_file_info = ttk.Label(device_selection_frame, text="", foreground="blue")
         self.bound_file_info.grid(row=1, column=0, columnspan=3, sticky=tk.W, padx=5, pady=2)
         
+        # 一括適用領域（パラメーター取得後、パラメーターファイルにバインドされているデバイスを表示）
+        bulk_frame = ttk.LabelFrame(self.device_frame, text="一括適用")
+        bulk_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        bulk_list_frame = ttk.Frame(bulk_frame)
+        bulk_list_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.bulk_device_list = tk.Listbox(bulk_list_frame, selectmode=tk.EXTENDED, height=5, exportselection=False)
+        self.bulk_device_list.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        bulk_scrollbar = ttk.Scrollbar(bulk_list_frame, orient=tk.VERTICAL, command=self.bulk_device_list.yview)
+        bulk_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.bulk_device_list.configure(yscrollcommand=bulk_scrollbar.set)
+        
+        bulk_button_frame = ttk.Frame(bulk_frame)
+        bulk_button_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.bulk_select_all_button = ttk.Button(bulk_button_frame, text="すべて選択",
+                                                 command=lambda: self.bulk_device_list.selection_set(0, tk.END))
+        self.bulk_select_all_button.pack(side=tk.LEFT, padx=5)
+        
+        self.bulk_apply_button = ttk.Button(bulk_button_frame, text="選択したデバイスに適用", command=self.apply_command_parameters_bulk)
+        self.bulk_apply_button.pack(side=tk.LEFT, padx=5)
+        
+        self.bulk_progress = ttk.Progressbar(bulk_button_frame, mode="determinate", length=200)
+        self.bulk_progress.pack(side=tk.LEFT, padx=5)
+        
+        self.bulk_status_var = StringVar()
+        ttk.Label(bulk_button_frame, textvariable=self.bulk_status_var).pack(side=tk.LEFT, padx=5)
+        
         # スクロール可能なキャンバス（大きなコンテンツ用）
         self.canvas = tk.Canvas(self.parent)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -229,6 +262,10 @@ class CommandParamsTab:
         self.reset_button = ttk.Button(button_frame, text="リセット", command=self.reset_parameters)
         self.reset_button.pack(side=tk.RIGHT, padx=5)
         
+        # 変更がなくてもデバイスを再設定する（単体・一括の適用で共通）
+        self.force_apply_var = BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="変更がなくても適用", variable=self.force_apply_var).pack(side=tk.RIGHT, padx=5)
+        
         # キャンバスの更新イベント
         self.scroll_frame.bind("<Configure>", self.on_frame_configure)
         self.canvas.bind("<Configure>", self.on_canvas_configure)
@@ -339,6 +376,7 @@ class CommandParamsTab:
         # ボタンも無効化
         self.apply_button.configure(state=tk.DISABLED)
         self.reset_button.configure(state=tk.DISABLED)
+        self.bulk_apply_button.configure(state=tk.DISABLED)
         
         # バインド情報をクリア
         self.bound_file_info.configure(text="")
@@ -362,28 +400,98 @@ class CommandParamsTab:
         # ボタンも有効化
         self.apply_button.configure(state=tk.NORMAL)
         self.reset_button.configure(state=tk.NORMAL)
+        self.bulk_apply_button.configure(state=tk.NORMAL)
     
-    def run_async(self, coro_func, *args, **kwargs):
+    def run_async(self, coro_func, *args, on_success=None, on_error=None, on_cancel=None, cancel_on_leave=True, **kwargs):
         """
-        非同期関数を同期的に実行するためのヘルパーメソッド
+        非同期関数をアプリケーション共通のイベントループで実行
+        
+        結果はTkinterのメインスレッドでコールバックに渡される。
         
         Args:
             coro_func: 実行する非同期関数
             *args: 引数
+            on_success (function, optional): 成功時に戻り値で呼ばれる関数
+            on_error (function, optional): 失敗時に例外で呼ばれる関数
+            on_cancel (function, optional): キャンセル時に呼ばれる関数
+            cancel_on_leave (bool): タブを離れたときにキャンセルするかどうか
             **kwargs: キーワード引数
-            
+        
         Returns:
-            関数の戻り値
+            concurrent.futures.Future: 実行中の処理のFuture（ループが終了済みの場合はNone）
         """
-        async def wrapper():
-            return await coro_func(*args, **kwargs)
+        async_app = self.get_async_app()
+        future = async_app.run_async(coro_func(*args, **kwargs)) if async_app is not None else None
+        if future is None:
+            return None
+        
+        if cancel_on_leave:
+            self.pending_futures.add(future)
+        
+        def on_done(done_future):
+            # 結果はメインスレッドで処理する
+            def dispatch():
+                self.pending_futures.discard(done_future)
+                if done_future.cancelled():
+                    if on_cancel is not None:
+                        on_cancel()
+                    return
+                
+                error = done_future.exception()
+                if error is not None:
+                    if on_error is not None:
+                        on_error(error)
+                    else:
+                        logger.error("コマンドパラメーターの処理でエラーが発生しました: %s", error)
+                elif on_success is not None:
+                    on_success(done_future.result())
             
-        # 新しいイベントループを作成して実行
-        loop = asyncio.new_event_loop()
+            self.parent.after(0, dispatch)
+        
+        future.add_done_callback(on_done)
+        return future
+    
+    def get_async_app(self):
+        """
+        処理を実行するAsyncTkAppを取得
+        
+        Returns:
+            AsyncTkApp: メインアプリケーションのAsyncTkApp（なければNone）
+        """
+        if self.async_app is None and self.main_app is not None:
+            self.async_app = getattr(self.main_app, "async_app", None)
+        return self.async_app
+    
+    def cancel_pending(self):
+        """
+        タブを離れたときに実行中のパラメーター取得などをキャンセル
+        """
+        for future in list(self.pending_futures):
+            future.cancel()
+    
+    async def load_device_parameters(self, device_id):
+        """
+        デバイスにバインドされたファイルとパラメーターを取得
+        
+        Args:
+            device_id (str): デバイスID
+        
+        Returns:
+            tuple: (ファイル名, ファイル情報, パラメーター)、バインドされていない場合のパラメーターはNone
+        """
+        # デバイスがパラメーターファイルにバインドされているか確認
+        bound_file_name, bound_file_info = None, None
         try:
-            return loop.run_until_complete(wrapper())
-        finally:
-            loop.close()
+            bound_file_name, bound_file_info = await self.command_param_manager.get_parameter_file_for_device(device_id)
+        except Exception as e:
+            logger.warning("バインド確認エラー: %s", e)
+        
+        if not bound_file_name or not bound_file_info:
+            return bound_file_name, bound_file_info, None
+        
+        # パラメーターを取得
+        parameters = await self.command_param_manager.get_device_parameters(device_id)
+        return bound_file_name, bound_file_info, parameters
     
     def fetch_parameters(self):
         """
@@ -406,87 +514,58 @@ class CommandParamsTab:
         # 結果表示をクリア
         self.params_result.pack_forget()
         
-        # バックグラウンドスレッドで実行
-        def run_in_thread():
-            try:
-                # デバイスがパラメーターファイルにバインドされているか確認
-                bound_file_name, bound_file_info = None, None
-                try:
-                    # 非同期関数を同期的に実行
-                    bound_file_name, bound_file_info = self.run_async(
-                        self.command_param_manager.get_parameter_file_for_device, 
-                        device_id
-                    )
-                except Exception as e:
-                    print(f"バインド確認エラー: {str(e)}")
-                
-                if not bound_file_name or not bound_file_info:
-                    def on_error():
-                        self.fetch_button.config(state=tk.NORMAL)
-                        error_message = "デバイスにコマンドパラメーターファイルがバインドされていません。コンソールでバインドしてください。"
-                        self.status_var.set(error_message)
-                        
-                        # エラーメッセージを表示
-                        self.params_result.configure(
-                            text=error_message,
-                            foreground="red"
-                        )
-                        self.params_result.pack(fill=tk.X, padx=5, pady=5)
-                        
-                        # バインド情報をクリア
-                        self.bound_file_info.configure(text="")
-                        
-                        messagebox.showerror("パラメーター取得エラー", error_message)
-                    
-                    self.parent.after(0, on_error)
-                    return
-                
-                # パラメーターを取得
-                parameters = self.run_async(
-                    self.command_param_manager.get_device_parameters, 
-                    device_id
-                )
-                
-                # 成功時の処理をメインスレッドで実行
-                def on_success():
-                    self.fetch_button.config(state=tk.NORMAL)
-                    
-                    # パラメーターをUIに設定
-                    self.set_parameters_to_ui(parameters)
-                    self.enable_parameters_ui()
-                    
-                    # バインド情報を表示
-                    self.bound_file_info.configure(
-                        text=f"バインドされているファイル: {bound_file_name}"
-                    )
-                    
-                    self.status_var.set("パラメーター取得完了")
-                
-                self.parent.after(0, on_success)
-                
-            except Exception as e:
-                # エラー時の処理をメインスレッドで実行
-                def on_error():
-                    self.fetch_button.config(state=tk.NORMAL)
-                    error_message = f"エラー: {str(e)}"
-                    self.status_var.set(error_message)
-                    
-                    # エラーメッセージを表示
-                    self.params_result.configure(
-                        text=error_message,
-                        foreground="red"
-                    )
-                    self.params_result.pack(fill=tk.X, padx=5, pady=5)
-                    
-                    # バインド情報をクリア
-                    self.bound_file_info.configure(text="")
-                    
-                    messagebox.showerror("パラメーター取得エラー", error_message)
-                
-                self.parent.after(0, on_error)
+        def show_error(error_message):
+            self.fetch_button.config(state=tk.NORMAL)
+            self.status_var.set(error_message)
+            
+            # エラーメッセージを表示
+            self.params_result.configure(
+                text=error_message,
+                foreground="red"
+            )
+            self.params_result.pack(fill=tk.X, padx=5, pady=5)
+            
+            # バインド情報をクリア
+            self.bound_file_info.configure(text="")
+            
+            messagebox.showerror("パラメーター取得エラー", error_message)
         
-        # バックグラウンドで実行
-        threading.Thread(target=run_in_thread, daemon=True).start()
+        def on_success(result):
+            bound_file_name, bound_file_info, parameters = result
+            if parameters is None:
+                show_error("デバイスにコマンドパラメーターファイルがバインドされていません。コンソールでバインドしてください。")
+                return
+            
+            self.fetch_button.config(state=tk.NORMAL)
+            
+            # パラメーターをUIに設定
+            self.set_parameters_to_ui(parameters)
+            self.enable_parameters_ui()
+            
+            # バインド情報を表示
+            self.bound_file_info.configure(
+                text=f"バインドされているファイル: {bound_file_name}"
+            )
+            
+            self.status_var.set("パラメーター取得完了")
+            
+            # 一括適用の対象デバイスを更新
+            self.update_bulk_device_list(device_id)
+        
+        def on_cancel():
+            self.fetch_button.config(state=tk.NORMAL)
+            self.status_var.set("パラメーター取得をキャンセルしました")
+        
+        # アプリケーション共通のイベントループで実行
+        future = self.run_async(
+            self.load_device_parameters,
+            device_id,
+            on_success=on_success,
+            on_error=lambda e: show_error(f"エラー: {str(e)}"),
+            on_cancel=on_cancel
+        )
+        if future is None:
+            self.fetch_button.config(state=tk.NORMAL)
     
     def set_parameters_to_ui(self, parameters):
         """
@@ -546,7 +625,7 @@ class CommandParamsTab:
             # パスプレビューを更新
             self.update_path_preview(self.storage_subdir_entry)
             self.update_path_preview(self.storage_subdir_ir_entry)
-            
+        
         except Exception as e:
             self.status_var.set(f"パラメーター設定エラー: {str(e)}")
             messagebox.showerror("パラメーター設定エラー", f"UIへのパラメーター設定中にエラーが発生しました:\n{str(e)}")
@@ -605,7 +684,7 @@ class CommandParamsTab:
             }
             
             return parameters
-            
+        
         except Exception as e:
             self.status_var.set(f"パラメーター取得エラー: {str(e)}")
             messagebox.showerror("パラメーター取得エラー", f"UIからのパラメーター取得中にエラーが発生しました:\n{str(e)}")
@@ -659,12 +738,31 @@ class CommandParamsTab:
                 return False
             
             return True
-            
+        
         except Exception as e:
             self.status_var.set(f"バリデーションエラー: {str(e)}")
             messagebox.showerror("バリデーションエラー", f"パラメーターのバリデーション中にエラーが発生しました:\n{str(e)}")
             return False
     
+    def _format_affected_devices(self, device_ids):
+        """
+        一緒にアンバインド・再バインドされるデバイスを確認ダイアログ用の文字列に変換
+        
+        Args:
+            device_ids (List[str]): 適用するデバイスIDのリスト
+        
+        Returns:
+            str: 確認ダイアログに追加する文字列（該当するデバイスがない場合は空）
+        """
+        affected = self.command_param_manager.get_affected_devices(device_ids)
+        if not affected:
+            return ""
+        listed = "\n".join(f"  {device_id}" for device_id in affected[:10])
+        if len(affected) > 10:
+            listed += f"\n  ...他 {len(affected) - 10} 台"
+        return (f"\n\n同じパラメーターファイルにバインドされている次の {len(affected)} 台のデバイスも"
+                f"アンバインド・再バインドされ、推論が中断されます:\n{listed}")
+    
     def apply_command_parameters(self):
         """
         パラメーターを適用
@@ -687,7 +785,7 @@ class CommandParamsTab:
         
         # 確認ダイアログを表示
         if not messagebox.askyesno("確認", f"パラメーターをデバイス {device_id} に適用しますか？\n"
-                                  f"(推論が中断されます)"):
+                                  f"(推論が中断されます){self._format_affected_devices([device_id])}"):
             return
         
         # ステータス更新
@@ -700,82 +798,194 @@ class CommandParamsTab:
         # 結果表示をクリア
         self.params_result.pack_forget()
         
-        # バックグラウンドスレッドで実行
-        def run_in_thread():
-            try:
-                # パラメーターを適用（非同期関数を同期的に実行）
-                result = self.run_async(
-                    self.command_param_manager.apply_parameters,
-                    device_id,
-                    parameters
+        # 成功時の処理
+        def on_success(result):
+            self.apply_button.config(state=tk.NORMAL)
+            
+            if result["success"] and result.get("skipped"):
+                # 変更がない場合はデバイスを再設定しないため、推論も停止しない
+                self.status_var.set(result["message"])
+                self.params_result.configure(text=result["message"], foreground="green")
+                self.params_result.pack(fill=tk.X, padx=5, pady=5)
+            
+            elif result["success"]:
+                self.status_var.set(f"パラメーター適用完了 ({device_id})")
+                
+                # 成功メッセージを表示（変更したフィールドも表示）
+                changed_paths = [change["path"] for change in result.get("changes", [])]
+                changed_text = f"\n変更: {', '.join(changed_paths[:5])}" if changed_paths else ""
+                if len(changed_paths) > 5:
+                    changed_text += f" ...他 {len(changed_paths) - 5} 件"
+                self.params_result.configure(
+                    text=f"コマンドパラメーターを正常に適用しました。監視画面で推論を再開させてください。{changed_text}",
+                    foreground="green"
                 )
+                self.params_result.pack(fill=tk.X, padx=5, pady=5)
                 
-                # 成功時の処理をメインスレッドで実行
-                def on_success():
-                    self.apply_button.config(state=tk.NORMAL)
-                    
-                    if result["success"]:
-                        self.status_var.set(f"パラメーター適用完了 ({device_id})")
-                        
-                        # 成功メッセージを表示
-                        self.params_result.configure(
-                            text="コマンドパラメーターを正常に適用しました。監視画面で推論を再開させてください。",
-                            foreground="green"
-                        )
-                        self.params_result.pack(fill=tk.X, padx=5, pady=5)
-                        
-                        # 推論を停止する
-                        if self.main_app is not None and hasattr(self.main_app, 'stop_inference_wrapper'):
-                            self.main_app.stop_inference_wrapper()
-                            # デバイス状態を更新
-                            self.main_app.check_device_status_wrapper()
-                        else:
-                            # メインアプリへの参照がない場合は親ウィンドウから取得を試みる
-                            try:
-                                parent_window = self.parent.winfo_toplevel()
-                                if hasattr(parent_window, 'stop_inference_wrapper'):
-                                    parent_window.stop_inference_wrapper()
-                                    if hasattr(parent_window, 'check_device_status_wrapper'):
-                                        parent_window.check_device_status_wrapper()
-                            except Exception as e:
-                                print(f"推論停止中にエラーが発生: {str(e)}")
-                        
-                        messagebox.showinfo("成功", "コマンドパラメーターを正常に適用しました。監視画面で推論を再開させてください。")
-
-                    else:
-                        self.status_var.set(result["message"])
-                        
-                        # エラーメッセージを表示
-                        self.params_result.configure(
-                            text=result["message"],
-                            foreground="red"
-                        )
-                        self.params_result.pack(fill=tk.X, padx=5, pady=5)
-                        
-                        messagebox.showerror("エラー", result["message"])
+                # 推論を停止する
+                if self.main_app is not None and hasattr(self.main_app, 'stop_inference_wrapper'):
+                    self.main_app.stop_inference_wrapper()
+                    # デバイス状態を更新
+                    self.main_app.check_device_status_wrapper()
+                else:
+                    # メインアプリへの参照がない場合は親ウィンドウから取得を試みる
+                    try:
+                        parent_window = self.parent.winfo_toplevel()
+                        if hasattr(parent_window, 'stop_inference_wrapper'):
+                            parent_window.stop_inference_wrapper()
+                            if hasattr(parent_window, 'check_device_status_wrapper'):
+                                parent_window.check_device_status_wrapper()
+                    except Exception as e:
+                        logger.error("推論停止中にエラーが発生: %s", e)
                 
-                self.parent.after(0, on_success)
+                messagebox.showinfo("成功", "コマンドパラメーターを正常に適用しました。監視画面で推論を再開させてください。")
+            
+            else:
+                self.status_var.set(result["message"])
                 
-            except Exception as e:
-                # エラー時の処理をメインスレッドで実行
-                def on_error():
-                    self.apply_button.config(state=tk.NORMAL)
-                    error_message = f"エラー: {str(e)}"
-                    self.status_var.set(error_message)
-                    
-                    # エラーメッセージを表示
-                    self.params_result.configure(
-                        text=error_message,
-                        foreground="red"
-                    )
-                    self.params_result.pack(fill=tk.X, padx=5, pady=5)
-                    
-                    messagebox.showerror("パラメーター適用エラー", error_message)
+                # エラーメッセージを表示
+                self.params_result.configure(
+                    text=result["message"],
+                    foreground="red"
+                )
+                self.params_result.pack(fill=tk.X, padx=5, pady=5)
                 
-                self.parent.after(0, on_error)
+                messagebox.showerror("エラー", result["message"])
+        
+        # エラー時の処理
+        def on_error(e):
+            self.apply_button.config(state=tk.NORMAL)
+            error_message = f"エラー: {str(e)}"
+            self.status_var.set(error_message)
+            
+            # エラーメッセージを表示
+            self.params_result.configure(
+                text=error_message,
+                foreground="red"
+            )
+            self.params_result.pack(fill=tk.X, padx=5, pady=5)
+            
+            messagebox.showerror("パラメーター適用エラー", error_message)
+        
+        # アプリケーション共通のイベントループで実行
+        # 適用は途中で中断するとデバイスの状態が不整合になるため、タブを離れてもキャンセルしない
+        future = self.run_async(
+            self.command_param_manager.apply_parameters,
+            device_id,
+            parameters,
+            force=self.force_apply_var.get(),
+            on_success=on_success,
+            on_error=on_error,
+            cancel_on_leave=False
+        )
+        if future is None:
+            self.apply_button.config(state=tk.NORMAL)
+    
+    def update_bulk_device_list(self, current_device_id=None):
+        """
+        一括適用の対象として選択できるデバイスの一覧を更新
+        
+        Args:
+            current_device_id (str, optional): 初期状態で選択するデバイスID
+        """
+        selected = {self.bulk_device_list.get(i) for i in self.bulk_device_list.curselection()}
+        if current_device_id:
+            selected.add(current_device_id)
+        
+        device_ids = sorted(self.command_param_manager.device_index)
+        self.bulk_device_list.delete(0, tk.END)
+        for index, device_id in enumerate(device_ids):
+            self.bulk_device_list.insert(tk.END, device_id)
+            if device_id in selected:
+                self.bulk_device_list.selection_set(index)
+    
+    def apply_command_parameters_bulk(self):
+        """
+        パラメーターを選択した複数のデバイスに適用
+        """
+        device_ids = [self.bulk_device_list.get(i) for i in self.bulk_device_list.curselection()]
+        if not device_ids:
+            self.bulk_status_var.set("デバイスが選択されていません")
+            return
+        
+        # パラメーターのバリデーション
+        if not self.validate_parameters():
+            return
+        
+        # UIからパラメーターを取得
+        parameters = self.get_parameters_from_ui()
+        if not parameters:
+            return
+        
+        # 確認ダイアログを表示
+        if not messagebox.askyesno("確認", f"パラメーターを {len(device_ids)} 台のデバイスに適用しますか？\n"
+                                  f"(推論が中断されます){self._format_affected_devices(device_ids)}"):
+            return
         
-        # バックグラウンドで実行
-        threading.Thread(target=run_in_thread, daemon=True).start()
+        # ボタンを無効化して進捗表示を初期化
+        total_devices = len(device_ids) + len(self.command_param_manager.get_affected_devices(device_ids))
+        self.apply_button.config(state=tk.DISABLED)
+        self.bulk_apply_button.config(state=tk.DISABLED)
+        self.bulk_progress.configure(maximum=total_devices, value=0)
+        self.bulk_status_var.set(f"0 / {total_devices}")
+        self.status_var.set(f"パラメーター一括適用中... ({total_devices}台)")
+        self.params_result.pack_forget()
+        
+        # 進捗はイベントループのスレッドから通知されるため、メインスレッドで表示
+        def on_progress(done, total, device_id, result):
+            def update():
+                self.bulk_progress.configure(maximum=total, value=done)
+                self.bulk_status_var.set(f"{done} / {total}")
+            self.parent.after(0, update)
+        
+        def on_success(result):
+            self.apply_button.config(state=tk.NORMAL)
+            self.bulk_apply_button.config(state=tk.NORMAL)
+            self.status_var.set(result["message"])
+            
+            failed = [(device_id, device_result["message"])
+                      for device_id, device_result in result.get("results", {}).items() if not device_result["success"]]
+            if failed:
+                details = "\n".join(f"{device_id}: {message}" for device_id, message in failed[:10])
+                if len(failed) > 10:
+                    details += f"\n...他 {len(failed) - 10} 台"
+                self.params_result.configure(text=f"{result['message']}（失敗: {len(failed)}台）", foreground="red")
+                self.params_result.pack(fill=tk.X, padx=5, pady=5)
+                messagebox.showerror("一括適用エラー", f"{result['message']}\n\n{details}")
+            else:
+                self.params_result.configure(
+                    text=f"{result['message']}。監視画面で推論を再開させてください。",
+                    foreground="green"
+                )
+                self.params_result.pack(fill=tk.X, padx=5, pady=5)
+            
+            # 監視中のデバイスに適用した場合は単体の適用と同様に推論を停止して状態を更新
+            current_result = result.get("results", {}).get(self.device_id_var.get())
+            if current_result and current_result["success"] and not current_result["skipped"] and self.main_app is not None:
+                self.main_app.stop_inference_wrapper()
+                self.main_app.check_device_status_wrapper()
+        
+        def on_error(e):
+            self.apply_button.config(state=tk.NORMAL)
+            self.bulk_apply_button.config(state=tk.NORMAL)
+            error_message = f"エラー: {str(e)}"
+            self.status_var.set(error_message)
+            messagebox.showerror("一括適用エラー", error_message)
+        
+        # アプリケーション共通のイベントループで実行（適用は途中でキャンセルしない）
+        future = self.run_async(
+            self.command_param_manager.apply_parameters_bulk,
+            device_ids,
+            parameters,
+            progress=on_progress,
+            force=self.force_apply_var.get(),
+            on_success=on_success,
+            on_error=on_error,
+            cancel_on_leave=False
+        )
+        if future is None:
+            self.apply_button.config(state=tk.NORMAL)
+            self.bulk_apply_button.config(state=tk.NORMAL)
     
     def reset_parameters(self):
         """
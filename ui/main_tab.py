@@ -6,22 +6,46 @@
 モニタリング画面のUIを実装
 """
 
+import itertools
+import time
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-from utils.image_utils import convert_cv_to_pil
+from collections import deque
+from utils.image_utils import prepare_for_display
+from utils.log_buffer import LogBuffer, LOG_LEVELS
+from utils.metrics import RENDER_SECONDS
+from utils.lazy_import import lazy_import
+
+# 起動を速くするため、PILは最初の画像表示時に読み込む
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
+# ログ表示を更新する間隔（ミリ秒）
+LOG_FLUSH_INTERVAL = 100
 
 class MainTab:
     """メイン監視タブのUI実装"""
     
-    def __init__(self, parent):
+    def __init__(self, parent, display_quality="quality", max_log_lines=5000):
         """
         メインタブの初期化
         
         Args:
             parent (tk.Frame): 親ウィジェット
+            display_quality (str): 表示用リサイズの画質（"fast", "balanced", "quality"）
+            max_log_lines (int): 保持するログの最大行数
         """
         self.parent = parent
+        self.display_quality = display_quality
+        
+        # ログはリングバッファで保持し、表示中の行のみをTextウィジェットに描画する
+        self.log_buffer = LogBuffer(max_lines=max_log_lines)
+        self.log_view = deque(maxlen=max_log_lines)  # 表示レベル以上のログ
+        self.log_first = 0  # 表示中の先頭行
+        self.log_follow = True  # 末尾に自動スクロールするかどうか
+        self.log_flush_pending = None
+        self.display_resize_command = None
+        self.log_level_command = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -54,6 +78,11 @@ class MainTab:
         self.stop_button = ttk.Button(display_frame, text="表示停止", width=10, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5, pady=2)
         
+        # キャンバスオーバーレイモードの切り替え
+        self.canvas_overlay_var = tk.BooleanVar(value=False)
+        self.canvas_overlay_check = ttk.Checkbutton(display_frame, text="キャンバス描画", variable=self.canvas_overlay_var)
+        self.canvas_overlay_check.pack(side=tk.LEFT, padx=5, pady=2)
+        
         # デバイス状態フレーム
         self.device_frame = ttk.LabelFrame(self.parent, text="デバイス状態")
         self.device_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
@@ -122,16 +151,36 @@ class MainTab:
         self.log_frame = ttk.LabelFrame(self.right_frame, text="ログ")
         self.log_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
         
+        # ログの表示レベル
+        log_control_frame = ttk.Frame(self.log_frame)
+        log_control_frame.pack(fill=tk.X, padx=2, pady=(2, 0))
+        
+        ttk.Label(log_control_frame, text="表示レベル:").pack(side=tk.LEFT)
+        self.log_level_var = tk.StringVar(value="INFO")
+        log_level_cb = ttk.Combobox(log_control_frame, textvariable=self.log_level_var, state="readonly", width=10)
+        log_level_cb['values'] = tuple(LOG_LEVELS.keys())
+        log_level_cb.pack(side=tk.LEFT, padx=5)
+        log_level_cb.bind("<<ComboboxSelected>>", self.on_log_level_changed)
+        
         self.log_text = tk.Text(self.log_frame, height=6, width=40, font=("Helvetica", 9), state=tk.DISABLED)
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=2, pady=2)
         
-        # ログのスクロールバー
-        log_scrollbar = ttk.Scrollbar(self.log_text, command=self.log_text.yview)
-        log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.log_text.config(yscrollcommand=log_scrollbar.set)
+        # ログのスクロールバー（表示位置はログバッファ上の行で管理）
+        self.log_scrollbar = ttk.Scrollbar(self.log_text, command=self.on_log_scroll)
+        self.log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # マウスホイールでのスクロール
+        self.log_text.bind("<MouseWheel>", self.on_log_mousewheel)  # Windows
+        self.log_text.bind("<Button-4>", self.on_log_mousewheel)  # Linux上スクロール
+        self.log_text.bind("<Button-5>", self.on_log_mousewheel)  # Linux下スクロール
+        self.log_text.bind("<Configure>", lambda e: self.render_log())
         
-        # 画像表示用の変数
+        # 画像表示用の変数（PhotoImageとキャンバスのアイテムはサイズが変わるまで再利用）
         self.photo = None
+        self.image_item = None
+        
+        # キャンバスに描画するバウンディングボックスのアイテム（矩形ID, テキストID）
+        self.overlay_items = []
     
     def on_window_resize(self, event):
         """ウィンドウサイズ変更時に呼ばれるハンドラー"""
@@ -152,6 +201,10 @@ class MainTab:
             
             # 画像更新時に正しいアスペクト比で表示されるようにキャンバスサイズも調整
             self.canvas.config(width=height, height=height)
+            
+            # 表示サイズの変更を通知（縮小デコード用）
+            if self.display_resize_command:
+                self.display_resize_command(height, height)
         else:
             # まだフレームが表示されていない場合は後で再試行
             self.parent.after(100, self.adjust_left_frame_width)
@@ -175,6 +228,45 @@ class MainTab:
         if inference_stop_command:
             self.inference_stop_button.config(command=inference_stop_command)
     
+    def set_display_resize_command(self, command):
+        """
+        表示領域のサイズ変更時に呼び出すコマンドを設定
+        
+        Args:
+            command (function): 幅と高さを受け取るコマンド
+        """
+        self.display_resize_command = command
+    
+    def set_log_level_command(self, command):
+        """
+        ログの表示レベル変更時に呼び出すコマンドを設定
+        
+        Args:
+            command (function): ログレベル名を受け取るコマンド
+        """
+        self.log_level_command = command
+    
+    def set_canvas_overlay_command(self, command):
+        """
+        キャンバスオーバーレイモード切り替え時に呼び出すコマンドを設定
+        
+        Args:
+            command (function): 有効/無効を受け取るコマンド
+        """
+        self.canvas_overlay_check.config(command=lambda: command(self.canvas_overlay_var.get()))
+    
+    def set_canvas_overlay(self, enabled):
+        """
+        キャンバスオーバーレイモードの表示を切り替え
+        
+        Args:
+            enabled (bool): キャンバスオーバーレイモードを有効にするかどうか
+        """
+        self.canvas_overlay_var.set(enabled)
+        if not enabled:
+            # 画素描画に戻す場合はキャンバス上のバウンディングボックスを隠す
+            self.hide_overlay_items(0)
+    
     def set_start_state(self, running=True):
         """
         表示ボタン状態を実行中/停止中に設定
@@ -213,17 +305,112 @@ class MainTab:
             self.inference_start_button.config(state=tk.DISABLED)
             self.inference_stop_button.config(state=tk.DISABLED)
                 
-    def update_log(self, message):
+    def update_log(self, message, level="INFO"):
         """
         ログテキストを更新
         
+        メッセージはリングバッファに追加し、表示はLOG_FLUSH_INTERVALごとにまとめて更新する。
+        
         Args:
             message (str): 表示するログメッセージ
+            level (str): ログレベル（"DEBUG", "INFO", "WARNING", "ERROR"）
+        """
+        self.log_buffer.append(message, level)
+        
+        if LOG_LEVELS.get(level, LOG_LEVELS["INFO"]) >= LOG_LEVELS.get(self.log_level_var.get(), LOG_LEVELS["INFO"]):
+            # 古い行が破棄される場合は表示位置を合わせる
+            if len(self.log_view) == self.log_view.maxlen and not self.log_follow:
+                self.log_first = max(0, self.log_first - 1)
+            self.log_view.append(message)
+            
+            if self.log_flush_pending is None:
+                self.log_flush_pending = self.parent.after(LOG_FLUSH_INTERVAL, self.flush_log)
+    
+    def flush_log(self):
+        """保留中のログをまとめて表示に反映"""
+        self.log_flush_pending = None
+        self.render_log()
+    
+    def get_log_rows(self):
+        """
+        ログ表示領域に表示できる行数を取得
+        
+        Returns:
+            int: 表示可能な行数
         """
+        height = self.log_text.winfo_height()
+        if height <= 1:
+            return int(self.log_text.cget("height"))
+        line_height = self.log_text.tk.call("font", "metrics", self.log_text.cget("font"), "-linespace")
+        return max(1, height // max(1, int(line_height)))
+    
+    def render_log(self):
+        """表示範囲のログのみをTextウィジェットに描画"""
+        total = len(self.log_view)
+        rows = self.get_log_rows()
+        
+        if self.log_follow:
+            self.log_first = max(0, total - rows)
+        self.log_first = min(self.log_first, max(0, total - rows))
+        
+        lines = itertools.islice(self.log_view, self.log_first, self.log_first + rows)
+        
         self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
+        self.log_text.delete("1.0", tk.END)
+        self.log_text.insert(tk.END, "\n".join(lines))
+        if self.log_follow:
+            self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
+        
+        # スクロールバーの位置を更新
+        if total > 0:
+            self.log_scrollbar.set(self.log_first / total, min(1.0, (self.log_first + rows) / total))
+        else:
+            self.log_scrollbar.set(0.0, 1.0)
+    
+    def on_log_scroll(self, *args):
+        """
+        ログのスクロールバー操作のハンドラ
+        
+        Args:
+            *args: スクロールバーのコマンド引数（"moveto", 位置 または "scroll", 量, 単位）
+        """
+        total = len(self.log_view)
+        rows = self.get_log_rows()
+        
+        if args[0] == "moveto":
+            first = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (rows if args[2] == "pages" else 1)
+            first = self.log_first + step
+        else:
+            return
+        
+        last_first = max(0, total - rows)
+        self.log_first = min(max(0, first), last_first)
+        self.log_follow = self.log_first >= last_first
+        self.render_log()
+    
+    def on_log_mousewheel(self, event):
+        """
+        ログ表示領域のマウスホイールイベントのハンドラ
+        """
+        if event.num == 4 or event.delta > 0:  # 上スクロール
+            self.on_log_scroll("scroll", -1, "units")
+        elif event.num == 5 or event.delta < 0:  # 下スクロール
+            self.on_log_scroll("scroll", 1, "units")
+        return "break"
+    
+    def on_log_level_changed(self, event=None):
+        """ログの表示レベル変更時のハンドラ"""
+        # 表示しないレベルのメッセージは通知元で組み立てないようにする
+        if self.log_level_command:
+            self.log_level_command(self.log_level_var.get())
+        
+        self.log_view.clear()
+        self.log_view.extend(self.log_buffer.get_lines(self.log_level_var.get()))
+        self.log_follow = True
+        self.render_log()
     
     def update_device_state(self, connection_state, operation_state, timestamp):
         """
@@ -253,16 +440,17 @@ class MainTab:
             operation_state=operation_state
         )
     
-    def update_image(self, cv_image):
+    def get_image_layout(self, img_width, img_height):
         """
-        画像を更新
+        キャンバスに画像を表示する際の配置を算出
         
         Args:
-            cv_image (numpy.ndarray): OpenCV形式の画像
-        """
-        # OpenCV画像をPIL形式に変換
-        pil_image = convert_cv_to_pil(cv_image)
+            img_width (int): 画像の幅
+            img_height (int): 画像の高さ
         
+        Returns:
+            tuple: (縮小率, X座標, Y座標, 表示幅, 表示高さ)
+        """
         # キャンバスのサイズを取得
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
@@ -274,24 +462,118 @@ class MainTab:
             canvas_height = 320
         
         # 画像のリサイズ（アスペクト比を維持）
-        img_width, img_height = pil_image.size
         ratio = min(canvas_width/img_width, canvas_height/img_height)
         new_width = int(img_width * ratio)
         new_height = int(img_height * ratio)
         
-        pil_image = pil_image.resize((new_width, new_height), Image.LANCZOS)
-        
-        # PIL画像をTkinter用に変換
-        self.photo = ImageTk.PhotoImage(image=pil_image)
-        
-        # キャンバスをクリアして新しい画像を表示
-        self.canvas.delete("all")
-        
         # 画像をキャンバスの中央に配置
         x = max(0, (canvas_width - new_width) // 2)
         y = max(0, (canvas_height - new_height) // 2)
         
-        self.canvas.create_image(x, y, anchor=tk.NW, image=self.photo)
+        return ratio, x, y, new_width, new_height
+    
+    def set_display_quality(self, quality):
+        """
+        表示用リサイズの画質を設定
+        
+        Args:
+            quality (str): 補間の画質（"fast", "balanced", "quality"）
+        """
+        self.display_quality = quality
+    
+    def update_image(self, cv_image):
+        """
+        画像を更新
+        
+        Args:
+            cv_image (numpy.ndarray): OpenCV形式の画像
+        """
+        start = time.perf_counter()
+        
+        # 画像のリサイズ（アスペクト比を維持）
+        img_height, img_width = cv_image.shape[:2]
+        ratio, x, y, new_width, new_height = self.get_image_layout(img_width, img_height)
+        new_width = max(1, new_width)
+        new_height = max(1, new_height)
+        
+        # リサイズとBGR→RGB変換をOpenCVでまとめて実行
+        rgb_image = prepare_for_display(cv_image, new_width, new_height, self.display_quality)
+        pil_image = Image.fromarray(rgb_image)
+        
+        # 同じサイズのPhotoImageがあれば内容のみ更新
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == (new_width, new_height):
+            self.photo.paste(pil_image)
+        else:
+            self.photo = ImageTk.PhotoImage(image=pil_image)
+            if self.image_item is not None:
+                self.canvas.itemconfigure(self.image_item, image=self.photo)
+        
+        # 画像をキャンバスの中央に配置（アイテムは再利用）
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(x, y, anchor=tk.NW, image=self.photo, tags="frame")
+            self.canvas.tag_raise("overlay")
+        else:
+            self.canvas.coords(self.image_item, x, y)
+        
+        RENDER_SECONDS.observe(time.perf_counter() - start, "image")
+    
+    def update_overlay(self, overlay):
+        """
+        バウンディングボックスをキャンバスのアイテムとして描画
+        
+        既存のアイテムはcoords()で移動して再利用し、不要なアイテムは非表示にする。
+        
+        Args:
+            overlay (dict): frame_size (幅, 高さ), has_image (画像の有無), boxes (left, top, right, bottom, ラベル)のリスト
+        """
+        start = time.perf_counter()
+        
+        frame_width, frame_height = overlay["frame_size"]
+        if not overlay["has_image"]:
+            # 画像を持たないフレーム（推論結果のみ）は黒背景に描画
+            self.canvas.delete("frame")
+            self.photo = None
+            self.image_item = None
+        
+        ratio, x, y, _, _ = self.get_image_layout(frame_width, frame_height)
+        
+        boxes = overlay["boxes"]
+        for i, (left, top, right, bottom, label) in enumerate(boxes):
+            x0 = x + left * ratio
+            y0 = y + top * ratio
+            x1 = x + right * ratio
+            y1 = y + bottom * ratio
+            
+            if i < len(self.overlay_items):
+                rect_id, text_id = self.overlay_items[i]
+                self.canvas.coords(rect_id, x0, y0, x1, y1)
+                self.canvas.coords(text_id, x0 + 2, y0 + 2)
+                if self.canvas.itemcget(text_id, "text") != label:
+                    self.canvas.itemconfigure(text_id, text=label)
+                self.canvas.itemconfigure(rect_id, state=tk.NORMAL)
+                self.canvas.itemconfigure(text_id, state=tk.NORMAL)
+            else:
+                rect_id = self.canvas.create_rectangle(x0, y0, x1, y1, outline="#00ff00", width=2, tags="overlay")
+                text_id = self.canvas.create_text(x0 + 2, y0 + 2, anchor=tk.NW, text=label, fill="#ffff00",
+                                                  font=("Helvetica", 9), tags="overlay")
+                self.overlay_items.append((rect_id, text_id))
+        
+        # 使用しなかったアイテムは非表示
+        self.hide_overlay_items(len(boxes))
+        self.canvas.tag_raise("overlay")
+        
+        RENDER_SECONDS.observe(time.perf_counter() - start, "overlay")
+    
+    def hide_overlay_items(self, start):
+        """
+        指定した位置以降のオーバーレイアイテムを非表示にする
+        
+        Args:
+            start (int): 非表示にする最初のアイテムの位置
+        """
+        for rect_id, text_id in self.overlay_items[start:]:
+            self.canvas.itemconfigure(rect_id, state=tk.HIDDEN)
+            self.canvas.itemconfigure(text_id, state=tk.HIDDEN)
     
     def update_detection_info(self, detections):
         """
@@ -11,6 +11,7 @@ from tkinter import ttk, messagebox
 import threading
 import time
 import asyncio
+import logging
 from datetime import datetime
 
 import settings
@@ -19,8 +20,12 @@ from core.detection_processor import DetectionProcessor
 from core.settings_manager import SettingsManager
 from core.command_parameter_manager import CommandParameterManager
 from ui.main_tab import MainTab
-from ui.settings_tab import SettingsTab
-from ui.command_params_tab import CommandParamsTab
+from ui.ui_dispatcher import UIDispatcher
+
+logger = logging.getLogger(__name__)
+
+# UI更新の最大頻度（1秒あたりの回数）
+UI_UPDATE_RATE = 30
 
 class AsyncTkApp:
     """tkinterとasyncioを連携するためのヘルパークラス"""
@@ -56,10 +61,35 @@ class AsyncTkApp:
 class KumakitaApp(tk.Tk):
     """アプリケーションのメインウィンドウクラス"""
     
-    def __init__(self):
-        """メインウィンドウの初期化"""
+    def __init__(self, profiler=None, startup_timer=None, startup_report=False, decode_workers=0, display_quality="quality",
+                 param_cache_path=None, param_journal_path=None):
+        """
+        メインウィンドウの初期化
+        
+        Args:
+            profiler (ProfilerManager, optional): 実行時に操作するプロファイラー（--profile指定時）
+            startup_timer (StartupTimer, optional): 起動時間を記録するタイマー
+            startup_report (bool): 最初の描画後に起動時間の内訳を出力するかどうか
+            decode_workers (int): デコードに使用するワーカープロセス数（0で処理スレッドでデコード）
+            display_quality (str): 表示用リサイズの画質（"fast", "balanced", "quality"）
+            param_cache_path (str, optional): コマンドパラメーターファイル一覧のキャッシュを保存するファイル
+            param_journal_path (str, optional): コマンドパラメーター適用のジャーナルを保存するファイル
+        """
         super().__init__()
         
+        # 起動時間の計測
+        self.startup_timer = startup_timer
+        self.startup_report = startup_report
+        self.first_frame_shown = False
+        
+        # 表示用リサイズの画質（メインタブの作成時に使用）
+        self.display_quality = display_quality
+        
+        # プロファイラー（cProfileの計測終了はメインスレッドで予約する）
+        self.profiler = profiler
+        if self.profiler is not None:
+            self.profiler.set_scheduler(lambda delay, callback: self.after(int(delay * 1000), callback))
+        
         # アプリケーションの基本設定
         self.title("Kumakita - AI Detection Monitor")
         self.geometry("1200x700")  # ウィンドウサイズを大きめに設定
@@ -68,6 +98,9 @@ class KumakitaApp(tk.Tk):
         # AsyncTkAppのインスタンスを作成
         self.async_app = AsyncTkApp(self)
         
+        # ワーカースレッドからのUI更新をまとめて処理するディスパッチャー
+        self.ui_dispatcher = UIDispatcher(self, self.dispatch_ui_event, max_rate=UI_UPDATE_RATE)
+        
         # 設定マネージャーの初期化
         self.settings_manager = SettingsManager(settings)
         
@@ -79,7 +112,11 @@ class KumakitaApp(tk.Tk):
         )
         
         # コマンドパラメーターマネージャーの初期化
-        self.command_param_manager = CommandParameterManager(self.aitrios_client)
+        self.command_param_manager = CommandParameterManager(
+            self.aitrios_client,
+            cache_path=param_cache_path,
+            journal_path=param_journal_path
+        )
         
         # 検出プロセッサの初期化
         self.processor = DetectionProcessor(
@@ -87,6 +124,7 @@ class KumakitaApp(tk.Tk):
             settings.objclass,
             self.handle_processor_callback
         )
+        self.processor.set_decode_workers(decode_workers)
         
         # 処理状態の管理用変数
         self.running_flag = threading.Event()
@@ -105,12 +143,12 @@ class KumakitaApp(tk.Tk):
         
         # UIの初期化
         self.init_ui()
+        self.ui_dispatcher.start()
+        if self.startup_timer is not None:
+            self.startup_timer.mark("ui_built")
         
-        # アプリケーション起動時にデバイス状態を初期確認
-        self.check_device_status_wrapper()
-        
-        # 定期的なデバイス状態の更新を開始
-        self.start_periodic_status_update()
+        # デバイス状態の初期確認はウィンドウの最初の描画後に開始
+        self.after_idle(self.on_first_paint)
         
         # アプリケーション終了時の処理を設定
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -142,44 +180,180 @@ class KumakitaApp(tk.Tk):
         self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         # メインタブのUI
-        self.main_tab = MainTab(self.main_tab_frame)
+        self.main_tab = MainTab(self.main_tab_frame, display_quality=self.display_quality)
         self.main_tab.set_button_commands(
             start_command=self.start_processing,
             stop_command=self.stop_processing,
             inference_start_command=self.start_inference_wrapper,
             inference_stop_command=self.stop_inference_wrapper
         )
+        self.main_tab.set_display_resize_command(self.processor.set_display_size)
+        self.main_tab.set_canvas_overlay_command(self.set_canvas_overlay)
+        self.main_tab.set_log_level_command(self.processor.set_status_level)
         
-        # 設定タブのUI
-        self.settings_tab = SettingsTab(self.settings_tab_frame, self.settings_manager)
-        self.settings_tab.set_cancel_command(lambda: self.tab_control.select(0))
-        self.settings_tab.set_on_settings_changed(self.on_settings_changed)
-        
-        # コマンドパラメータータブのUI
-        self.command_params_tab = CommandParamsTab(
-            self.command_params_tab_frame,
-            self.command_param_manager,
-            self.settings_manager,
-            main_app=self  # メインアプリケーションへの参照を渡す
-        )
+        # 設定タブとコマンドパラメータータブのUIは最初に選択されたときに作成
+        self.settings_tab = None
+        self.command_params_tab = None
         
         # ステータスバー
         self.status_bar = tk.Label(self, text="準備完了", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        # プロファイル用メニュー
+        if self.profiler is not None:
+            self.init_profile_menu()
+    
+    def init_profile_menu(self):
+        """プロファイラーを操作するメニューを作成"""
+        menubar = tk.Menu(self)
+        profile_menu = tk.Menu(menubar, tearoff=0)
+        profile_menu.add_command(
+            label=f"CPUプロファイル（{self.profiler.cpu_duration}秒）",
+            command=self.start_cpu_profile
+        )
+        profile_menu.add_command(label="サンプリング開始/停止", command=self.toggle_sampling_profile)
+        profile_menu.add_command(label="メモリスナップショット", command=self.snapshot_memory_profile)
+        profile_menu.add_separator()
+        profile_menu.add_command(label="レポートを出力", command=self.dump_profile_reports)
+        menubar.add_cascade(label="プロファイル", menu=profile_menu)
+        self.config(menu=menubar)
+    
+    def start_cpu_profile(self):
+        """メインスレッドのCPUプロファイルを開始"""
+        if self.profiler.start_cpu_profile():
+            self.update_status(f"CPUプロファイルを開始しました（{self.profiler.cpu_duration}秒）")
+        else:
+            self.update_status("CPUプロファイルは既に計測中です", "WARNING")
+    
+    def toggle_sampling_profile(self):
+        """サンプリングプロファイラーの開始・停止を切り替え"""
+        path = self.profiler.toggle_sampling()
+        if path:
+            self.update_status(f"集約スタックを出力しました: {path}")
+        else:
+            self.update_status("サンプリングプロファイラーを開始しました")
+    
+    def snapshot_memory_profile(self):
+        """メモリスナップショットを採取"""
+        path = self.profiler.snapshot_memory()
+        if path:
+            self.update_status(f"メモリスナップショットを出力しました: {path}")
+        else:
+            self.update_status("メモリ計測を開始しました")
+    
+    def dump_profile_reports(self):
+        """計測中のプロファイルのレポートを出力"""
+        paths = self.profiler.dump_reports()
+        if paths:
+            self.update_status(f"プロファイルを出力しました: {', '.join(paths)}")
+        else:
+            self.update_status("計測中のプロファイルはありません", "WARNING")
+    
+    def ensure_settings_tab(self):
+        """
+        設定タブのUIを作成（作成済みであれば何もしない）
+        
+        Returns:
+            SettingsTab: 設定タブ
+        """
+        if self.settings_tab is None:
+            from ui.settings_tab import SettingsTab
+            
+            self.settings_tab = SettingsTab(self.settings_tab_frame, self.settings_manager)
+            self.settings_tab.set_cancel_command(lambda: self.tab_control.select(0))
+            self.settings_tab.set_on_settings_changed(self.on_settings_changed)
+        return self.settings_tab
+    
+    def ensure_command_params_tab(self):
+        """
+        コマンドパラメータータブのUIを作成（作成済みであれば何もしない）
+        
+        Returns:
+            CommandParamsTab: コマンドパラメータータブ
+        """
+        if self.command_params_tab is None:
+            from ui.command_params_tab import CommandParamsTab
+            
+            self.command_params_tab = CommandParamsTab(
+                self.command_params_tab_frame,
+                self.command_param_manager,
+                self.settings_manager,
+                main_app=self,  # メインアプリケーションへの参照を渡す
+                async_app=self.async_app
+            )
+        return self.command_params_tab
+    
+    def on_first_paint(self):
+        """ウィンドウの最初の描画後の処理"""
+        if self.startup_timer is not None:
+            elapsed = self.startup_timer.mark("first_paint")
+            self.startup_timer.import_timer.uninstall()
+            logger.info("起動から最初の描画まで: %.1f ms", elapsed * 1000)
+            if self.startup_report:
+                logger.info("\n".join(self.startup_timer.report()))
+        
+        # アプリケーション起動時にデバイス状態を初期確認（通信は非同期ループで実行）
+        self.check_device_status_wrapper()
+        
+        # 定期的なデバイス状態の更新を開始
+        self.start_periodic_status_update()
+        
+        # 前回中断されたコマンドパラメーターの適用を確認
+        self.check_pending_parameter_transactions()
+    
+    def check_pending_parameter_transactions(self):
+        """前回の起動で完了しなかったコマンドパラメーターの適用を再開・取り消し"""
+        transactions = self.command_param_manager.get_pending_transactions()
+        if not transactions:
+            return
+        
+        files = ", ".join(sorted({transaction["file_name"] for transaction in transactions}))
+        answer = messagebox.askyesnocancel(
+            "中断されたパラメーター適用",
+            f"前回中断されたコマンドパラメーターの適用が {len(transactions)} 件あります（{files}）。\n\n"
+            "はい: 適用を再開する\nいいえ: 適用前の内容に戻す\nキャンセル: 次回起動時に確認する"
+        )
+        if answer is None:
+            return
+        
+        self.update_status("中断されたパラメーター適用を処理中...")
+        future = self.async_app.run_async(self.command_param_manager.recover_pending_transactions(rollback=not answer))
+        if future:
+            def on_done(done_future):
+                try:
+                    result = done_future.result()
+                    self.after(0, lambda: self.update_status(result["message"], "INFO" if result["success"] else "ERROR"))
+                except Exception as e:
+                    message = f"パラメーター適用の復旧エラー: {str(e)}"
+                    self.after(0, lambda: self.update_status(message, "ERROR"))
+            future.add_done_callback(on_done)
+    
+    def on_first_frame(self):
+        """最初のフレームを表示したときの処理"""
+        self.first_frame_shown = True
+        if self.startup_timer is not None:
+            elapsed = self.startup_timer.mark("first_frame")
+            logger.info("起動から最初のフレーム表示まで: %.1f ms", elapsed * 1000)
+            if self.startup_report:
+                logger.info("\n".join(self.startup_timer.report()))
     
     def on_tab_changed(self, event):
         """タブ切り替え時の処理"""
         selected_tab = self.tab_control.index("current")
         
+        # コマンドパラメータータブを離れた場合は実行中の取得処理をキャンセル
+        if selected_tab != 2 and self.command_params_tab is not None:
+            self.command_params_tab.cancel_pending()
+        
         # 設定タブが選択された場合（インデックス1）
         if selected_tab == 1:
             # 設定値を最新の状態に更新
-            self.settings_tab.refresh_settings()
+            self.ensure_settings_tab().refresh_settings()
             self.update_status("設定画面に切り替えました")
         # コマンドパラメータータブが選択された場合（インデックス2）
         elif selected_tab == 2:
             # コマンドパラメーター画面を更新
-            self.command_params_tab.refresh()
+            self.ensure_command_params_tab().refresh()
             self.update_status("コマンドパラメーター画面に切り替えました")
     
     def start_periodic_status_update(self):
@@ -215,21 +389,15 @@ class KumakitaApp(tk.Tk):
             connection_state, operation_state = await self.aitrios_client.get_connection_state()
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # UI更新 - 進行中フラグを考慮してボタン状態を決定
-            self.update_inference_buttons(connection_state, operation_state)
-            
-            # デバイス状態の更新（ボタン以外）
-            self.main_tab.update_device_state_ui(connection_state, operation_state, timestamp)
+            # UI更新（ボタン状態・デバイス状態・進行中フラグ）はメインスレッドで実行
+            self.ui_dispatcher.post("device_state", (connection_state, operation_state, timestamp))
             
             # ステータス更新
             status_message = "デバイス接続中" if connection_state == "Connected" else "デバイス未接続"
-            self.update_status(f"{status_message} ({operation_state})")
-            
-            # 推論状態の変化を検出して進行中フラグを解除
-            self.check_inference_state_change(operation_state)
-            
+            self.update_status(f"{status_message} ({operation_state})", "DEBUG")
+        
         except Exception as e:
-            self.update_status(f"デバイス状態取得エラー: {str(e)}")
+            self.update_status(f"デバイス状態取得エラー: {str(e)}", "ERROR")
     
     def update_inference_buttons(self, connection_state, operation_state):
         """
@@ -313,21 +481,21 @@ class KumakitaApp(tk.Tk):
         try:
             future.result()
         except Exception as e:
-            self.update_status(f"非同期処理エラー: {str(e)}")
+            self.update_status(f"非同期処理エラー: {str(e)}", "ERROR")
     
     def reset_inference_start_flag(self):
         """安全装置: 推論開始フラグを強制リセット"""
         self.inference_start_in_progress = False
         self.inference_start_timeout_timer = None
         self.check_device_status_wrapper()  # 状態を再確認して更新
-        self.update_status("推論開始タイムアウト: 状態を更新しました")
+        self.update_status("推論開始タイムアウト: 状態を更新しました", "WARNING")
     
     def reset_inference_stop_flag(self):
         """安全装置: 推論停止フラグを強制リセット"""
         self.inference_stop_in_progress = False
         self.inference_stop_timeout_timer = None
         self.check_device_status_wrapper()  # 状態を再確認して更新
-        self.update_status("推論停止タイムアウト: 状態を更新しました")
+        self.update_status("推論停止タイムアウト: 状態を更新しました", "WARNING")
     
     async def start_inference(self):
         """推論処理を開始する（非同期）"""
@@ -357,7 +525,7 @@ class KumakitaApp(tk.Tk):
                     self.after(1000, self.check_device_status_wrapper)
                 else:
                     error_message = result.get("message", "Unknown error")
-                    self.update_status(f"推論開始エラー: {error_message}")
+                    self.update_status(f"推論開始エラー: {error_message}", "ERROR")
                     
                     # エラー時はフラグをクリア
                     self.inference_start_in_progress = False
@@ -368,7 +536,7 @@ class KumakitaApp(tk.Tk):
                     # 状態を再確認
                     self.after(1000, self.check_device_status_wrapper)
             else:
-                self.update_status(f"推論開始条件を満たしていません: {connection_state} - {operation_state}")
+                self.update_status(f"推論開始条件を満たしていません: {connection_state} - {operation_state}", "WARNING")
                 
                 # 条件を満たさない場合はフラグをクリア
                 self.inference_start_in_progress = False
@@ -379,7 +547,7 @@ class KumakitaApp(tk.Tk):
                 # 状態を再確認
                 self.after(1000, self.check_device_status_wrapper)
         except Exception as e:
-            self.update_status(f"推論開始エラー: {str(e)}")
+            self.update_status(f"推論開始エラー: {str(e)}", "ERROR")
             
             # 例外発生時もフラグをクリア
             self.inference_start_in_progress = False
@@ -422,7 +590,7 @@ class KumakitaApp(tk.Tk):
                     self.after(1000, self.check_device_status_wrapper)
                 else:
                     error_message = result.get("message", "Unknown error")
-                    self.update_status(f"推論停止エラー: {error_message}")
+                    self.update_status(f"推論停止エラー: {error_message}", "ERROR")
                     
                     # エラー時はフラグをクリア
                     self.inference_stop_in_progress = False
@@ -433,7 +601,7 @@ class KumakitaApp(tk.Tk):
                     # 状態を再確認
                     self.after(1000, self.check_device_status_wrapper)
             else:
-                self.update_status(f"推論停止条件を満たしていません: {connection_state} - {operation_state}")
+                self.update_status(f"推論停止条件を満たしていません: {connection_state} - {operation_state}", "WARNING")
                 
                 # 条件を満たさない場合はフラグをクリア
                 self.inference_stop_in_progress = False
@@ -444,7 +612,7 @@ class KumakitaApp(tk.Tk):
                 # 状態を再確認
                 self.after(1000, self.check_device_status_wrapper)
         except Exception as e:
-            self.update_status(f"推論停止エラー: {str(e)}")
+            self.update_status(f"推論停止エラー: {str(e)}", "ERROR")
             
             # 例外発生時もフラグをクリア
             self.inference_stop_in_progress = False
@@ -463,8 +631,9 @@ class KumakitaApp(tk.Tk):
     
     def on_settings_changed(self):
         """設定変更時のコールバック"""
-        # APIクライアントの更新
+        # APIクライアントの更新（古いクライアントのHTTPセッションは閉じる）
         config = self.settings_manager.config
+        self.async_app.run_async(self.aitrios_client.close_session())
         self.aitrios_client = AITRIOSClient(
             config['DEVICE_ID'],
             config['CLIENT_ID'],
@@ -483,18 +652,54 @@ class KumakitaApp(tk.Tk):
         # デバイス状態を再取得
         self.check_device_status_wrapper()
     
+    def set_canvas_overlay(self, enabled):
+        """
+        キャンバスオーバーレイモードを切り替え
+        
+        Args:
+            enabled (bool): キャンバスオーバーレイモードを有効にするかどうか
+        """
+        self.processor.set_canvas_overlay(enabled)
+        self.main_tab.set_canvas_overlay(enabled)
+        self.update_status("キャンバス描画モードを有効にしました" if enabled else "キャンバス描画モードを無効にしました")
+    
     def handle_processor_callback(self, event_type, data):
         """
         検出プロセッサからのコールバック処理
         
+        ワーカースレッドから呼ばれるため、イベントはディスパッチャーに登録し
+        メインスレッドでまとめて処理する。
+        
         Args:
             event_type (str): イベントタイプ
             data: イベントデータ
         """
+        if event_type == "status" and not isinstance(data, tuple):
+            data = (data, "INFO")
+        self.ui_dispatcher.post(event_type, data)
+    
+    def dispatch_ui_event(self, event_type, data):
+        """
+        ディスパッチャーでまとめられたUI更新イベントの処理（メインスレッド）
+        
+        Args:
+            event_type (str): イベントタイプ
+            data: イベントデータ（"status"は(メッセージ, ログレベル)のリスト）
+        """
         if event_type == "status":
-            self.update_status(data)
+            for message, level in data:
+                self.main_tab.update_log(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", level)
+            # ステータスバーは最後のメッセージのみ表示
+            if data:
+                self.status_bar.config(text=data[-1][0])
         elif event_type == "image":
             self.main_tab.update_image(data)
+            if not self.first_frame_shown:
+                self.on_first_frame()
+        elif event_type == "overlay":
+            self.main_tab.update_overlay(data)
+            if not self.first_frame_shown:
+                self.on_first_frame()
         elif event_type == "detection":
             self.main_tab.update_detection_info(data)
         elif event_type == "device_state":
@@ -509,12 +714,13 @@ class KumakitaApp(tk.Tk):
             # 推論状態の変化を検出して進行中フラグを解除
             self.check_inference_state_change(operation_state)
     
-    def update_status(self, message):
+    def update_status(self, message, level="INFO"):
         """
         ステータスバーとログを更新
         
         Args:
             message (str): ステータスメッセージ
+            level (str): ログレベル（"DEBUG", "INFO", "WARNING", "ERROR"）
         """
         # UIスレッドからの呼び出しを保証
         def _update():
@@ -524,11 +730,11 @@ class KumakitaApp(tk.Tk):
             # ログの更新
             timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
             log_message = f"[{timestamp}] {message}"
-            self.main_tab.update_log(log_message)
+            self.main_tab.update_log(log_message, level)
         
-        # スレッドからの呼び出しの場合はafter()を使用
+        # スレッドからの呼び出しの場合はディスパッチャーでまとめて処理
         if threading.current_thread() is not threading.main_thread():
-            self.after(0, _update)
+            self.ui_dispatcher.post("status", (message, level))
         else:
             _update()
     
@@ -558,6 +764,10 @@ class KumakitaApp(tk.Tk):
     
     def on_closing(self):
         """アプリケーション終了時の処理"""
+        # 終了確認（キャンセルした場合はそのまま動作を続ける）
+        if not messagebox.askokcancel("終了確認", "アプリケーションを終了しますか？"):
+            return
+        
         # 実行中なら停止
         if self.running_flag.is_set():
             self.stop_processing()
@@ -571,9 +781,17 @@ class KumakitaApp(tk.Tk):
         if self.inference_stop_timeout_timer:
             self.after_cancel(self.inference_stop_timeout_timer)
         
-        # AsyncTkAppリソースをクリーンアップ
+        # HTTPセッションを閉じてからAsyncTkAppリソースをクリーンアップ
+        future = self.async_app.run_async(self.aitrios_client.close_session())
+        if future is not None:
+            try:
+                future.result(timeout=1.0)
+            except Exception as e:
+                logger.debug("Failed to close HTTP session: %s", e)
         self.async_app.close()
+        self.ui_dispatcher.stop()
+        
+        # デコード用のワーカープロセスを終了
+        self.processor.set_decode_workers(0)
         
-        # 終了確認
-        if messagebox.askokcancel("終了確認", "アプリケーションを終了しますか？"):
-            self.destroy()
\ No newline at end of file
+        self.destroy()
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+UI更新ディスパッチャー
+ワーカースレッドからのUI更新イベントをまとめてTkのメインスレッドで処理する
+"""
+
+import threading
+import logging
+from collections import deque
+from utils.metrics import FRAMES_DROPPED
+
+logger = logging.getLogger(__name__)
+
+# イベントタイプごとのまとめ方（"latest": 最新のみ, "batch": 全件をまとめて通知）
+DEFAULT_MERGE_POLICIES = {
+    "image": "latest",
+    "overlay": "latest",
+    "detection": "latest",
+    "device_state": "latest",
+    "status": "batch",
+}
+
+class UIDispatcher:
+    """UI更新イベントをタイプごとにまとめ、表示フレームごとに一括で処理するディスパッチャー"""
+    
+    def __init__(self, root, handler, max_rate=30, merge_policies=None, max_batch=500):
+        """
+        UI更新ディスパッチャーの初期化
+        
+        Args:
+            root (tk.Tk): after()を呼び出すルートウィジェット
+            handler (function): (イベントタイプ, データ)を受け取るハンドラ（メインスレッドで呼ばれる）
+            max_rate (float): 1秒あたりの最大処理回数
+            merge_policies (dict, optional): イベントタイプごとのまとめ方
+            max_batch (int): "batch"で保持する最大件数（超えた分は古い順に破棄）
+        """
+        self.root = root
+        self.handler = handler
+        self.merge_policies = dict(DEFAULT_MERGE_POLICIES)
+        if merge_policies:
+            self.merge_policies.update(merge_policies)
+        self.max_batch = max_batch
+        
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._running = False
+        self.set_max_rate(max_rate)
+    
+    def set_max_rate(self, max_rate):
+        """
+        1秒あたりの最大処理回数を設定
+        
+        Args:
+            max_rate (float): 1秒あたりの最大処理回数
+        """
+        self.max_rate = max(1.0, float(max_rate))
+        self.interval = max(1, int(1000 / self.max_rate))
+    
+    def post(self, event_type, data):
+        """
+        UI更新イベントを登録（どのスレッドからでも呼び出し可能）
+        
+        Args:
+            event_type (str): イベントタイプ
+            data: イベントデータ
+        """
+        policy = self.merge_policies.get(event_type, "latest")
+        with self._lock:
+            if policy == "batch":
+                batch = self._pending.get(event_type)
+                if batch is None:
+                    batch = deque(maxlen=self.max_batch)
+                    self._pending[event_type] = batch
+                batch.append(data)
+            else:
+                # 最新のデータのみを保持（"detection"はフレームごとに1回通知されるため、上書きをフレームの破棄として数える）
+                if self._pending.pop(event_type, None) is not None and event_type == "detection":
+                    FRAMES_DROPPED.inc("ui_coalesced")
+                self._pending[event_type] = data
+    
+    def start(self):
+        """メインスレッドでの定期処理を開始"""
+        if not self._running:
+            self._running = True
+            self._timer = self.root.after(self.interval, self._drain)
+    
+    def stop(self):
+        """定期処理を停止"""
+        self._running = False
+        if self._timer is not None:
+            try:
+                self.root.after_cancel(self._timer)
+            except Exception:
+                pass
+            self._timer = None
+    
+    def flush(self):
+        """保留中のイベントを全て処理（メインスレッドから呼び出す）"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        
+        for event_type, data in pending.items():
+            if isinstance(data, deque):
+                data = list(data)
+            try:
+                self.handler(event_type, data)
+            except Exception as e:
+                logger.exception("UI更新エラー (%s): %s", event_type, e)
+    
+    def _drain(self):
+        """表示フレームごとに保留中のイベントを処理"""
+        self._timer = None
+        if not self._running:
+            return
+        
+        self.flush()
+        self._timer = self.root.after(self.interval, self._drain)
@@ -4,10 +4,21 @@
 汎用的なユーティリティ関数を提供するモジュール
 """
 
-from utils.image_utils import download_image, draw_bounding_boxes, resize_for_display, convert_cv_to_pil
+from utils.image_utils import download_image, draw_bounding_boxes, resize_for_display, convert_cv_to_pil, prepare_for_display
+from utils.frame_cache import FrameCache
+from utils.overlay_renderer import OverlayRenderer
+from utils.log_buffer import LogBuffer
+from utils.logging_utils import setup_logging, shutdown_logging
+from utils.metrics import REGISTRY, MetricsRegistry, start_metrics_server
+from utils.profiler import ProfilerManager
+from utils.lazy_import import lazy_import
+from utils.startup_timer import StartupTimer
 from utils.file_utils import export_classes_to_csv, import_classes_from_csv, ensure_directory, get_latest_file
 
 __all__ = [
-    'download_image', 'draw_bounding_boxes', 'resize_for_display', 'convert_cv_to_pil',
+    'download_image', 'draw_bounding_boxes', 'resize_for_display', 'convert_cv_to_pil', 'prepare_for_display',
+    'FrameCache', 'OverlayRenderer', 'LogBuffer', 'setup_logging', 'shutdown_logging',
+    'REGISTRY', 'MetricsRegistry', 'start_metrics_server', 'ProfilerManager',
+    'lazy_import', 'StartupTimer',
     'export_classes_to_csv', 'import_classes_from_csv', 'ensure_directory', 'get_latest_file'
 ]
\ No newline at end of file
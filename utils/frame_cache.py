@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+フレームキャッシュモジュール
+デコード済み画像と描画済み画像を画像名ごとに保持するLRUキャッシュ
+"""
+
+import threading
+from collections import OrderedDict
+
+class FrameCache:
+    """画像名（タイムスタンプ）をキーにしたデコード済みフレームのLRUキャッシュ"""
+    
+    def __init__(self, max_entries=8):
+        """
+        フレームキャッシュの初期化
+        
+        Args:
+            max_entries (int): 保持する最大フレーム数
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        キャッシュからフレームを取得
+        
+        Args:
+            key (str): 画像名またはタイムスタンプ
+        
+        Returns:
+            dict: キャッシュエントリ（image, overlay, labels, scale, boxes, frame_size）、存在しない場合はNone
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # 最近使用した位置に移動
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, image=None, overlay=None, labels=None, scale=None, boxes=None, frame_size=None):
+        """
+        フレームをキャッシュに登録（既存エントリは指定された値のみ更新）
+        
+        Args:
+            key (str): 画像名またはタイムスタンプ
+            image (numpy.ndarray, optional): デコード済み画像
+            overlay (numpy.ndarray, optional): バウンディングボックス描画済み画像
+            labels (list, optional): 検出ラベルのリスト
+            scale (float, optional): デコード画像の元画像に対する縮小率
+            boxes (list, optional): キャンバスに描画するバウンディングボックスのリスト
+            frame_size (tuple, optional): 画像を持たないフレームのサイズ (幅, 高さ)
+        
+        Returns:
+            dict: 登録後のキャッシュエントリ
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {
+                    "image": None, "overlay": None, "labels": None,
+                    "scale": 1.0, "boxes": None, "frame_size": None
+                }
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+            
+            if image is not None:
+                entry["image"] = image
+            if overlay is not None:
+                entry["overlay"] = overlay
+            if labels is not None:
+                entry["labels"] = labels
+            if scale is not None:
+                entry["scale"] = scale
+            if boxes is not None:
+                entry["boxes"] = boxes
+            if frame_size is not None:
+                entry["frame_size"] = frame_size
+            
+            # 上限を超えた古いエントリを破棄
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            
+            return entry
+    
+    def clear(self):
+        """キャッシュを全て破棄"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
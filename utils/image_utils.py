@@ -6,28 +6,142 @@
 画像の処理と変換のためのユーティリティ関数
 """
 
-import base64
-import cv2
-import numpy as np
+from utils.json_backend import base64_bytes
+from utils.lazy_import import lazy_import
+from utils.overlay_renderer import OverlayRenderer
+
+# 起動を速くするため、OpenCVとNumPyは最初の使用時に読み込む
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# draw_bounding_boxesで共有するレンダラー（ラベル画像のキャッシュを共有）
+DEFAULT_OVERLAY_RENDERER = OverlayRenderer()
 
 def download_image(image_data):
     """
     Base64エンコードされた画像データを画像に変換
     
     Args:
-        image_data (str): Base64エンコードされた画像データ
+        image_data (str or bytes): Base64エンコードされた画像データ（JSONバックエンドでデコード済みのbytesも可）
     
     Returns:
         numpy.ndarray: OpenCV画像データ
     """
-    image_bytes = base64.b64decode(image_data)
+    image_bytes = base64_bytes(image_data)
     nparr = np.frombuffer(image_bytes, np.uint8)
     return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
+# 縮小デコードの倍率とOpenCVのフラグ名（大きい倍率から順に評価）
+REDUCED_DECODE_FLAGS = (
+    (8, "IMREAD_REDUCED_COLOR_8"),
+    (4, "IMREAD_REDUCED_COLOR_4"),
+    (2, "IMREAD_REDUCED_COLOR_2"),
+)
+
+# JPEGのSOFマーカー（DHT, JPG, DACを除くC0〜CF）
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def get_jpeg_size(image_bytes):
+    """
+    JPEGのヘッダーから画像サイズを取得（画像本体はデコードしない）
+    
+    Args:
+        image_bytes (bytes): JPEGファイルのバイト列
+    
+    Returns:
+        tuple: (幅, 高さ)、JPEGでない場合や取得できない場合はNone
+    """
+    if image_bytes[:2] != b'\xff\xd8':
+        return None
+    
+    i = 2
+    length = len(image_bytes)
+    while i + 9 < length:
+        if image_bytes[i] != 0xFF:
+            i += 1
+            continue
+        marker = image_bytes[i + 1]
+        # フィルバイトおよびセグメント長を持たないマーカーを読み飛ばす
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        
+        segment_length = int.from_bytes(image_bytes[i + 2:i + 4], 'big')
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(image_bytes[i + 5:i + 7], 'big')
+            width = int.from_bytes(image_bytes[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + segment_length
+    
+    return None
+
+def select_reduced_decode(width, height, max_width, max_height):
+    """
+    表示サイズに対して画質を落とさない最大の縮小デコード倍率を選択
+    
+    Args:
+        width (int): 元画像の幅
+        height (int): 元画像の高さ
+        max_width (int): 表示領域の幅
+        max_height (int): 表示領域の高さ
+    
+    Returns:
+        tuple: (縮小倍率, OpenCVのデコードフラグ)
+    """
+    if width <= 0 or height <= 0 or max_width <= 0 or max_height <= 0:
+        return 1, cv2.IMREAD_COLOR
+    
+    # アスペクト比を維持して表示する際の縮小率
+    display_ratio = min(max_width / width, max_height / height)
+    
+    for factor, flag_name in REDUCED_DECODE_FLAGS:
+        if factor * display_ratio <= 1:
+            return factor, getattr(cv2, flag_name)
+    
+    return 1, cv2.IMREAD_COLOR
+
+def download_image_for_display(image_data, max_width, max_height):
+    """
+    Base64エンコードされた画像データを表示サイズに合わせて縮小デコード
+    
+    JPEGの場合はDCT領域での縮小（IMREAD_REDUCED_COLOR_2/4/8）を使用するため、
+    フル解像度でデコードしてから縮小するよりもCPUとメモリの使用量が少ない。
+    アーカイブ用途などフル解像度が必要な場合はdownload_imageを使用する。
+    
+    Args:
+        image_data (str or bytes): Base64エンコードされた画像データ（JSONバックエンドでデコード済みのbytesも可）
+        max_width (int): 表示領域の幅
+        max_height (int): 表示領域の高さ
+    
+    Returns:
+        tuple: (OpenCV画像データ, 元画像に対する縮小率)
+    """
+    image_bytes = base64_bytes(image_data)
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    
+    size = get_jpeg_size(image_bytes)
+    if size is None:
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR), 1.0
+    
+    width, height = size
+    factor, flag = select_reduced_decode(width, height, max_width, max_height)
+    image = cv2.imdecode(nparr, flag)
+    if image is None or factor == 1:
+        return image, 1.0
+    
+    # 実際にデコードされたサイズから縮小率を算出（端数は切り上げられるため）
+    return image, image.shape[1] / width
+
 def draw_bounding_boxes(image, detections, objclass, scale_x=1, scale_y=1):
     """
     画像にバウンディングボックスを描画
     
+    元画像は変更せず、コピーに描画する。フレームのコピーが不要な場合は
+    OverlayRendererのrenderで直接描画する。
+    
     Args:
         image (numpy.ndarray): 元画像
         detections (list): 検出結果のリスト
@@ -40,38 +154,8 @@ def draw_bounding_boxes(image, detections, objclass, scale_x=1, scale_y=1):
     """
     # 画像のコピーを作成して描画
     result_image = image.copy()
-    detection_labels = []
-    
-    # 検出結果がない場合は元の画像と空のラベルリストを返す
-    if not detections:
-        return result_image, ["推論結果なし"]
-    
-    # OpenCVでの色定義 (BGR形式)
-    BOX_COLOR = (0, 255, 0)       # 緑色 (検出ボックス)
-    TEXT_COLOR = (0, 255, 255)    # 黄色 (テキストの色)
-    
-    for det in detections:
-        left, top, right, bottom = int(det['left'] * scale_x), int(det['top'] * scale_y), int(det['right'] * scale_x), int(det['bottom'] * scale_y)
-        
-        # クラスIDが範囲内かチェック
-        class_id = det['class_id']
-        if 0 <= class_id < len(objclass):
-            class_name = objclass[class_id]
-        else:
-            class_name = f"Unknown-{class_id}"
-        
-        # バウンディングボックスの描画
-        cv2.rectangle(result_image, (left, top), (right, bottom), BOX_COLOR, 2)
-        
-        # ラベルテキストの設定
-        label_text = f"Class: {class_name}, Score: {det['score']:.2f}"
-        detection_labels.append(label_text)
-        
-        # ラベルの描画
-        cv2.putText(result_image, label_text, (left+2, top+20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLOR, 1)
-    
-    return result_image, detection_labels
-        
+    return DEFAULT_OVERLAY_RENDERER.render(result_image, detections, objclass, scale_x=scale_x, scale_y=scale_y)
+
 def resize_for_display(image, max_width=800, max_height=600):
     """
     表示用に画像をリサイズ
@@ -97,6 +181,49 @@ def resize_for_display(image, max_width=800, max_height=600):
     
     return cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
 
+# 表示用リサイズの補間方法（画質の設定名とOpenCVの補間フラグ名）
+DISPLAY_INTERPOLATIONS = {
+    "fast": "INTER_NEAREST",
+    "balanced": "INTER_LINEAR",
+    "quality": "INTER_AREA",
+}
+
+def prepare_for_display(cv_image, width, height, quality="quality"):
+    """
+    OpenCV画像を表示サイズにリサイズしてRGB形式に変換
+    
+    リサイズを先に行うことで、色変換は縮小後の画素に対してのみ行う。
+    
+    Args:
+        cv_image (numpy.ndarray): OpenCV形式の画像（BGR）
+        width (int): 表示幅
+        height (int): 表示高さ
+        quality (str): 補間の画質（"fast", "balanced", "quality"）
+    
+    Returns:
+        numpy.ndarray: 表示サイズのRGB画像
+    """
+    if cv_image.shape[1] != width or cv_image.shape[0] != height:
+        interpolation = getattr(cv2, DISPLAY_INTERPOLATIONS.get(quality, "INTER_AREA"))
+        cv_image = cv2.resize(cv_image, (width, height), interpolation=interpolation)
+    return cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
+
+def encode_jpeg(image, quality=80):
+    """
+    OpenCV画像をJPEGにエンコード
+    
+    Args:
+        image (numpy.ndarray): OpenCV形式の画像（BGR）
+        quality (int): JPEGの品質（0〜100）
+    
+    Returns:
+        bytes: JPEGのバイト列（エンコードに失敗した場合はNone）
+    """
+    ok, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        return None
+    return buffer.tobytes()
+
 def convert_cv_to_pil(cv_image):
     """
     OpenCV画像をPIL画像に変換
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSONバックエンドモジュール
+APIレスポンスのJSONを高速なライブラリ（msgspec・orjson）で解析する
+
+msgspecがインストールされている場合、推論結果と画像のレスポンスは型付きの構造体で
+必要なフィールドのみをデコードし、Base64のフィールドはbytesとして取り出す。
+いずれもインストールされていない場合は標準のjsonモジュールを使用する。
+"""
+
+import base64
+import json
+from typing import List, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 使用中のバックエンド名
+if msgspec is not None:
+    BACKEND = "msgspec"
+elif orjson is not None:
+    BACKEND = "orjson"
+else:
+    BACKEND = "json"
+
+if msgspec is not None:
+    class Inference(msgspec.Struct):
+        """推論（Tはタイムスタンプ、OはFlatBuffersのバイト列）"""
+        T: str = ""
+        O: Optional[bytes] = None
+    
+    class InferenceResult(msgspec.Struct):
+        """推論結果（NumberOfInferencesPerMessage個の推論を含む）"""
+        Inferences: Optional[List[Inference]] = None
+    
+    class InferenceResultItem(msgspec.Struct):
+        """推論結果APIのレスポンスの要素"""
+        inference_result: Optional[InferenceResult] = None
+    
+    class Image(msgspec.Struct):
+        """画像（contentsはJPEGのバイト列）"""
+        name: str = ""
+        contents: Optional[bytes] = None
+    
+    class ImagesResponse(msgspec.Struct):
+        """画像取得APIのレスポンス"""
+        images: List[Image] = []
+    
+    _inference_results_decoder = msgspec.json.Decoder(List[InferenceResultItem])
+    _images_decoder = msgspec.json.Decoder(ImagesResponse)
+    _generic_decoder = msgspec.json.Decoder()
+
+def loads(data):
+    """
+    JSONを解析
+    
+    Args:
+        data (bytes or str): JSONデータ
+    
+    Returns:
+        解析結果のオブジェクト
+    
+    Raises:
+        ValueError: JSONとして不正な場合（どのバックエンドでも同じ例外にそろえる）
+    """
+    if msgspec is not None:
+        try:
+            return _generic_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # msgspecのバージョンによってはDecodeErrorがValueErrorのサブクラスではない
+            raise ValueError(str(e)) from e
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj):
+    """
+    オブジェクトをJSON文字列に変換
+    
+    Args:
+        obj: 変換するオブジェクト
+    
+    Returns:
+        str: JSON文字列
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    if msgspec is not None:
+        return msgspec.json.encode(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def decode_inference_results(data):
+    """
+    推論結果APIのレスポンスを解析
+    
+    msgspecを使用できる場合は推論のTとOのみをデコードし、Oはbytesで返す。
+    想定外の形式（エラーレスポンスなど）の場合は通常の解析結果を返す。
+    
+    Args:
+        data (bytes): レスポンスのボディ
+    
+    Returns:
+        list: inference_result.Inferencesを持つ辞書のリスト
+    """
+    if msgspec is None:
+        return loads(data)
+    
+    try:
+        items = _inference_results_decoder.decode(data)
+    except msgspec.ValidationError:
+        return loads(data)
+    
+    results = []
+    for item in items:
+        result = {}
+        if item.inference_result is not None:
+            inference_result = {}
+            if item.inference_result.Inferences is not None:
+                inference_result["Inferences"] = [
+                    {"T": inference.T, "O": inference.O} if inference.O is not None else {"T": inference.T}
+                    for inference in item.inference_result.Inferences
+                ]
+            result["inference_result"] = inference_result
+        results.append(result)
+    return results
+
+def decode_images(data):
+    """
+    画像取得APIのレスポンスを解析
+    
+    msgspecを使用できる場合は画像のnameとcontentsのみをデコードし、contentsはbytesで返す。
+    想定外の形式（エラーレスポンスなど）の場合は通常の解析結果を返す。
+    
+    Args:
+        data (bytes): レスポンスのボディ
+    
+    Returns:
+        dict: imagesを持つ辞書
+    """
+    if msgspec is None:
+        return loads(data)
+    
+    try:
+        response = _images_decoder.decode(data)
+    except msgspec.ValidationError:
+        return loads(data)
+    
+    return {
+        "images": [
+            {"name": image.name, "contents": image.contents}
+            for image in response.images
+        ]
+    }
+
+def base64_bytes(value):
+    """
+    Base64のフィールドをバイト列として取得
+    
+    JSONバックエンドでデコード済みのフィールド（bytes）はそのまま返す。
+    
+    Args:
+        value (str or bytes): Base64文字列、またはデコード済みのバイト列
+    
+    Returns:
+        bytes: デコードされたバイト列
+    """
+    if isinstance(value, str):
+        return base64.b64decode(value)
+    return value
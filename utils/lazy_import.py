@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+遅延インポートモジュール
+重いモジュールを最初に属性へアクセスした時点でインポートする
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+
+# 遅延インポートしたモジュールの読み込み時間（モジュール名: 秒）
+_import_times = {}
+_import_lock = threading.Lock()
+
+class LazyModule(types.ModuleType):
+    """最初の属性アクセス時に実際のモジュールを読み込むプロキシ"""
+    
+    def __init__(self, name):
+        """
+        遅延モジュールの初期化
+        
+        Args:
+            name (str): モジュール名（"PIL.Image"のようなサブモジュールも可）
+        """
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+    
+    def _load(self):
+        """
+        実際のモジュールを読み込み
+        
+        Returns:
+            module: 読み込んだモジュール
+        """
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            elapsed = time.perf_counter() - start
+            
+            with _import_lock:
+                _import_times.setdefault(self.__name__, elapsed)
+            
+            # 以降の属性アクセスは通常の辞書参照で解決されるよう、モジュールの属性を写す
+            self.__dict__.update(module.__dict__)
+            self.__dict__["_lazy_module"] = module
+        return module
+    
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+    
+    def __dir__(self):
+        return dir(self._load())
+    
+    @property
+    def is_loaded(self):
+        """実際のモジュールが読み込み済みかどうか"""
+        return self.__dict__["_lazy_module"] is not None
+
+def lazy_import(name):
+    """
+    モジュールを遅延インポート（読み込み済みであればそのモジュールを返す）
+    
+    Args:
+        name (str): モジュール名
+    
+    Returns:
+        module: 読み込み済みのモジュール、またはLazyModule
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+def get_lazy_import_times():
+    """
+    遅延インポートしたモジュールの読み込み時間を取得
+    
+    Returns:
+        dict: モジュール名と読み込み時間（秒）の辞書（読み込み順）
+    """
+    with _import_lock:
+        return dict(_import_times)
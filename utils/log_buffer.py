@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ログバッファモジュール
+固定サイズのリングバッファでログメッセージを保持する
+"""
+
+import threading
+from collections import deque
+
+# ログレベル名と数値（数値が大きいほど重要）
+LOG_LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARNING": 30,
+    "ERROR": 40,
+}
+
+class LogBuffer:
+    """レベル付きのログメッセージを固定件数だけ保持するリングバッファ"""
+    
+    def __init__(self, max_lines=5000):
+        """
+        ログバッファの初期化
+        
+        Args:
+            max_lines (int): 保持する最大行数（超えた分は古い順に破棄）
+        """
+        self.max_lines = max(1, int(max_lines))
+        self._entries = deque(maxlen=self.max_lines)
+        self._lock = threading.Lock()
+    
+    def append(self, message, level="INFO"):
+        """
+        ログメッセージを追加
+        
+        Args:
+            message (str): ログメッセージ
+            level (str): ログレベル（"DEBUG", "INFO", "WARNING", "ERROR"）
+        
+        Returns:
+            bool: 追加によって最も古い行が破棄された場合はTrue
+        """
+        with self._lock:
+            dropped = len(self._entries) == self.max_lines
+            self._entries.append((LOG_LEVELS.get(level, LOG_LEVELS["INFO"]), message))
+            return dropped
+    
+    def get_lines(self, min_level="DEBUG"):
+        """
+        指定レベル以上のログメッセージを取得
+        
+        Args:
+            min_level (str): 表示する最小のログレベル
+        
+        Returns:
+            list: ログメッセージのリスト（古い順）
+        """
+        threshold = LOG_LEVELS.get(min_level, LOG_LEVELS["DEBUG"])
+        with self._lock:
+            return [message for level_no, message in self._entries if level_no >= threshold]
+    
+    def clear(self):
+        """ログを全て破棄"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
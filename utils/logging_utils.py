@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ロギングユーティリティモジュール
+レベル付きの構造化ログをキュー経由で非同期に出力する
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+# 標準ログ属性（JSON出力時にextraとして扱わない属性）
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()) | {"message", "asctime"}
+
+# 起動中のキューリスナー
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """ログレコードを1行のJSONに整形するフォーマッター"""
+    
+    def format(self, record):
+        """
+        ログレコードをJSON文字列に変換
+        
+        Args:
+            record (logging.LogRecord): ログレコード
+        
+        Returns:
+            str: JSON文字列
+        """
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        
+        # extraで渡された項目を追加
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def setup_logging(level="INFO", json_output=False, module_levels=None, stream=None, log_file=None):
+    """
+    アプリケーションのロギングを設定
+    
+    ログはQueueHandlerでキューに積むだけにし、整形と出力はQueueListenerの
+    スレッドで行うため、呼び出し元のスレッドをブロックしない。
+    
+    Args:
+        level (str): ルートロガーのログレベル
+        json_output (bool): JSON形式で出力するかどうか
+        module_levels (dict, optional): モジュール名ごとのログレベル（例: {"api": "DEBUG"}）
+        stream (file, optional): 出力先ストリーム（デフォルトは標準エラー出力）
+        log_file (str, optional): 出力先ファイルのパス
+    
+    Returns:
+        logging.handlers.QueueListener: 起動したキューリスナー
+    """
+    global _listener
+    
+    # 再設定の場合は前のリスナーを停止
+    shutdown_logging()
+    
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+    
+    handlers = []
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+    
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    
+    # モジュールごとのログレベル
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper() if isinstance(module_level, str) else module_level)
+    
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """キューリスナーを停止し、残っているログを出力"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def parse_module_levels(specs):
+    """
+    "モジュール名=レベル"形式の指定を辞書に変換
+    
+    Args:
+        specs (list): "api=DEBUG"形式の文字列のリスト
+    
+    Returns:
+        dict: モジュール名とログレベルの辞書
+    """
+    module_levels = {}
+    for spec in specs or []:
+        name, sep, level = spec.partition("=")
+        if sep and name.strip() and level.strip():
+            module_levels[name.strip()] = level.strip().upper()
+    return module_levels
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+メトリクスモジュール
+アプリケーション内のカウンターとヒストグラムを集計し、Prometheus形式で公開する
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# レイテンシ用のデフォルトのバケット境界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# メトリクス公開用HTTPサーバーのデフォルトのポート
+DEFAULT_METRICS_PORT = 9464
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    """
+    ラベルをPrometheusのテキスト形式に整形
+    
+    Args:
+        labelnames (tuple): ラベル名のタプル
+        labelvalues (tuple): ラベル値のタプル
+        extra (tuple, optional): 追加する(ラベル名, 値)
+    
+    Returns:
+        str: "{name="value",...}"形式の文字列（ラベルがなければ空文字列）
+    """
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    
+    parts = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+class Counter:
+    """単調増加するカウンター"""
+    
+    type_name = "counter"
+    
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        カウンターの初期化
+        
+        Args:
+            name (str): メトリクス名
+            documentation (str): メトリクスの説明
+            labelnames (tuple): ラベル名のタプル
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labelvalues, amount=1):
+        """
+        カウンターを加算
+        
+        Args:
+            *labelvalues: ラベル値（labelnamesの順）
+            amount (float): 加算する値
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+    
+    def get(self, *labelvalues):
+        """
+        現在の値を取得
+        
+        Args:
+            *labelvalues: ラベル値（labelnamesの順）
+        
+        Returns:
+            float: カウンターの値
+        """
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+    
+    def snapshot(self):
+        """
+        現在の値のスナップショットを取得
+        
+        Returns:
+            list: {"labels": ラベルの辞書, "value": 値}のリスト
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in items]
+    
+    def render(self):
+        """
+        Prometheusのテキスト形式の行を生成
+        
+        Returns:
+            list: 出力行のリスト
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+class Histogram:
+    """バケットごとの件数と合計値を集計するヒストグラム"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        ヒストグラムの初期化
+        
+        Args:
+            name (str): メトリクス名
+            documentation (str): メトリクスの説明
+            labelnames (tuple): ラベル名のタプル
+            buckets (tuple): バケットの上限値（昇順）
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, *labelvalues):
+        """
+        値を記録
+        
+        Args:
+            value (float): 記録する値
+            *labelvalues: ラベル値（labelnamesの順）
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                # [バケットごとの件数（最後は+Inf）, 合計値, 件数]
+                entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[labelvalues] = entry
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def time(self, *labelvalues):
+        """
+        withブロックの処理時間を記録するタイマーを取得
+        
+        Args:
+            *labelvalues: ラベル値（labelnamesの順）
+        
+        Returns:
+            _Timer: コンテキストマネージャー
+        """
+        return _Timer(self, labelvalues)
+    
+    def snapshot(self):
+        """
+        現在の値のスナップショットを取得
+        
+        Returns:
+            list: {"labels", "count", "sum", "buckets"}の辞書のリスト（bucketsは累積件数）
+        """
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        
+        result = []
+        for key, counts, total, count in items:
+            cumulative = []
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                cumulative.append((bound, running))
+            result.append({
+                "labels": dict(zip(self.labelnames, key)),
+                "count": count,
+                "sum": total,
+                "buckets": cumulative
+            })
+        return result
+    
+    def render(self):
+        """
+        Prometheusのテキスト形式の行を生成
+        
+        Returns:
+            list: 出力行のリスト
+        """
+        lines = []
+        for sample in sorted(self.snapshot(), key=lambda s: tuple(s["labels"].values())):
+            key = tuple(sample["labels"].values())
+            for bound, count in sample["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', le))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {sample['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {sample['count']}")
+        return lines
+
+class _Timer:
+    """Histogram.time()が返すコンテキストマネージャー"""
+    
+    __slots__ = ("_histogram", "_labelvalues", "_start")
+    
+    def __init__(self, histogram, labelvalues):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+        self._start = 0.0
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labelvalues)
+        return False
+
+class MetricsRegistry:
+    """メトリクスを名前で管理するレジストリ"""
+    
+    def __init__(self):
+        """メトリクスレジストリの初期化"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric_class, name, documentation, labelnames, **kwargs):
+        """
+        メトリクスを登録（同名のメトリクスが登録済みであればそれを返す）
+        
+        Args:
+            metric_class (type): メトリクスのクラス
+            name (str): メトリクス名
+            documentation (str): メトリクスの説明
+            labelnames (tuple): ラベル名のタプル
+        
+        Returns:
+            Counter or Histogram: 登録されたメトリクス
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+            return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        """
+        カウンターを取得（未登録であれば作成）
+        
+        Args:
+            name (str): メトリクス名
+            documentation (str): メトリクスの説明
+            labelnames (tuple): ラベル名のタプル
+        
+        Returns:
+            Counter: カウンター
+        """
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        ヒストグラムを取得（未登録であれば作成）
+        
+        Args:
+            name (str): メトリクス名
+            documentation (str): メトリクスの説明
+            labelnames (tuple): ラベル名のタプル
+            buckets (tuple): バケットの上限値
+        
+        Returns:
+            Histogram: ヒストグラム
+        """
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def snapshot(self):
+        """
+        全メトリクスのスナップショットを取得
+        
+        Returns:
+            dict: メトリクス名をキーとした{"type", "help", "samples"}の辞書
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "type": metric.type_name,
+                "help": metric.documentation,
+                "samples": metric.snapshot()
+            }
+            for metric in metrics
+        }
+    
+    def render_prometheus(self):
+        """
+        全メトリクスをPrometheusのテキスト形式で出力
+        
+        Returns:
+            str: Prometheusのテキスト形式の文字列
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# アプリケーション全体で共有するレジストリ
+REGISTRY = MetricsRegistry()
+
+# アプリケーションのメトリクス
+API_CALLS = REGISTRY.counter("kumadt_api_calls_total", "AITRIOS API calls", ("endpoint", "outcome"))
+API_LATENCY = REGISTRY.histogram("kumadt_api_latency_seconds", "AITRIOS API call latency", ("endpoint",))
+TOKEN_REFRESHES = REGISTRY.counter("kumadt_token_refreshes_total", "Access token refreshes", ("outcome",))
+FRAMES_PROCESSED = REGISTRY.counter("kumadt_frames_processed_total", "Frames published to the UI", ("source",))
+FRAMES_DROPPED = REGISTRY.counter("kumadt_frames_dropped_total", "Frames dropped before display", ("reason",))
+DETECTIONS = REGISTRY.counter("kumadt_detections_total", "Detected objects per class", ("class_name",))
+STAGE_SECONDS = REGISTRY.histogram("kumadt_stage_seconds", "Detection processor stage duration", ("stage",))
+RENDER_SECONDS = REGISTRY.histogram("kumadt_render_seconds", "Main tab rendering duration", ("kind",))
+WEB_MESSAGES = REGISTRY.counter("kumadt_web_messages_total", "Messages pushed to web clients", ("kind", "outcome"))
+CLIPS = REGISTRY.counter("kumadt_clips_total", "Alert clips written", ("outcome",))
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """/metricsと/metrics.jsonを返すHTTPハンドラ"""
+    
+    registry = REGISTRY
+    
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body = self.registry.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+def start_metrics_server(port=DEFAULT_METRICS_PORT, host="127.0.0.1", registry=REGISTRY):
+    """
+    メトリクス公開用のHTTPサーバーをデーモンスレッドで起動
+    
+    Args:
+        port (int): 待ち受けるポート番号
+        host (str): 待ち受けるアドレス（デフォルトはローカルのみ）
+        registry (MetricsRegistry): 公開するレジストリ
+    
+    Returns:
+        ThreadingHTTPServer: 起動したサーバー（停止はshutdown()）
+    """
+    handler = type("MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
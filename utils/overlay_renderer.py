@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+オーバーレイ描画モジュール
+バウンディングボックスとラベルを画像に高速に描画する
+"""
+
+import threading
+from utils.lazy_import import lazy_import
+from utils.metrics import STAGE_SECONDS
+
+# 起動を速くするため、OpenCVとNumPyは最初の使用時に読み込む
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# OpenCVでの色定義 (BGR形式)
+BOX_COLOR = (0, 255, 0)       # 緑色 (検出ボックス)
+TEXT_COLOR = (0, 255, 255)    # 黄色 (テキストの色)
+
+# ラベル描画の設定
+LABEL_FONT = 0  # cv2.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.5
+LABEL_THICKNESS = 1
+LABEL_OFFSET_X = 2
+LABEL_OFFSET_Y = 20
+BOX_THICKNESS = 2
+
+class OverlayRenderer:
+    """ラベル画像をキャッシュしてバウンディングボックスを描画するレンダラー"""
+    
+    def __init__(self, max_glyphs=2048):
+        """
+        オーバーレイレンダラーの初期化
+        
+        Args:
+            max_glyphs (int): キャッシュするラベル画像の最大数
+        """
+        self.max_glyphs = max_glyphs
+        self._glyphs = {}
+        self._lock = threading.Lock()
+    
+    def get_label_text(self, class_name, score):
+        """
+        (クラス, スコア区分)ごとにキャッシュしたラベルテキストを取得
+        
+        Args:
+            class_name (str): クラス名
+            score (float): スコア
+        
+        Returns:
+            str: ラベルテキスト
+        """
+        return self.get_label(class_name, score)[0]
+    
+    def get_label(self, class_name, score):
+        """
+        (クラス, スコア区分)ごとに事前描画したラベルを取得
+        
+        Args:
+            class_name (str): クラス名
+            score (float): スコア
+        
+        Returns:
+            tuple: (ラベルテキスト, ラベルのマスク画像, ベースラインからの高さ)
+        """
+        # 表示は小数点以下2桁のため、スコアを0.01単位に区分する
+        key = (class_name, int(round(score * 100)))
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            return glyph
+        
+        label_text = f"Class: {class_name}, Score: {key[1] / 100:.2f}"
+        (text_width, text_height), baseline = cv2.getTextSize(label_text, LABEL_FONT, LABEL_FONT_SCALE, LABEL_THICKNESS)
+        
+        # テキストをマスク画像に描画（原点はベースライン）
+        bitmap = np.zeros((text_height + baseline, text_width), dtype=np.uint8)
+        cv2.putText(bitmap, label_text, (0, text_height), LABEL_FONT, LABEL_FONT_SCALE, 255, LABEL_THICKNESS)
+        glyph = (label_text, bitmap > 0, text_height)
+        
+        with self._lock:
+            # 上限を超えた場合はキャッシュを作り直す
+            if len(self._glyphs) >= self.max_glyphs:
+                self._glyphs.clear()
+            self._glyphs[key] = glyph
+        return glyph
+    
+    def layout(self, detections, objclass, scale_x=1, scale_y=1):
+        """
+        画素を描画せずにバウンディングボックスの座標とラベルを算出
+        
+        Args:
+            detections (list): 検出結果のリスト
+            objclass (list): クラスのリスト
+            scale_x (float): X方向のスケール係数
+            scale_y (float): Y方向のスケール係数
+        
+        Returns:
+            tuple: ((left, top, right, bottom, ラベル)のリスト, 検出ラベルのリスト)
+        """
+        if not detections:
+            return [], ["推論結果なし"]
+        
+        with STAGE_SECONDS.time("layout"):
+            return self._layout(detections, objclass, scale_x, scale_y)
+    
+    def _layout(self, detections, objclass, scale_x, scale_y):
+        """layout()の本体（検出結果が1件以上ある場合）"""
+        boxes = []
+        detection_labels = []
+        for det in detections:
+            label_text = self.get_label_text(self.get_class_name(det['class_id'], objclass), det['score'])
+            boxes.append((
+                int(det['left'] * scale_x), int(det['top'] * scale_y),
+                int(det['right'] * scale_x), int(det['bottom'] * scale_y),
+                label_text
+            ))
+            detection_labels.append(label_text)
+        
+        return boxes, detection_labels
+    
+    @staticmethod
+    def get_class_name(class_id, objclass):
+        """
+        クラスIDからクラス名を取得
+        
+        Args:
+            class_id (int): クラスID
+            objclass (list): クラスのリスト
+        
+        Returns:
+            str: クラス名（範囲外の場合はUnknown-ID）
+        """
+        if 0 <= class_id < len(objclass):
+            return objclass[class_id]
+        return f"Unknown-{class_id}"
+    
+    def render(self, image, detections, objclass, scale_x=1, scale_y=1):
+        """
+        バウンディングボックスとラベルを描画
+        
+        imageに直接描画する（フレーム全体のコピーは行わない）。元の画像を残す場合は呼び出し側でコピーを渡す。
+        
+        Args:
+            image (numpy.ndarray): 描画対象の画像
+            detections (list): 検出結果のリスト
+            objclass (list): クラスのリスト
+            scale_x (float): X方向のスケール係数
+            scale_y (float): Y方向のスケール係数
+        
+        Returns:
+            tuple: (描画された画像, 検出ラベルのリスト)
+        """
+        # 検出結果がない場合は空のラベルリストを返す
+        if not detections:
+            return image, ["推論結果なし"]
+        
+        with STAGE_SECONDS.time("render"):
+            return self._render(image, detections, objclass, scale_x, scale_y)
+    
+    def render_boxes(self, image, boxes):
+        """
+        レイアウト済みのバウンディングボックスとラベルを描画（imageに直接描画）
+        
+        Args:
+            image (numpy.ndarray): 描画対象の画像
+            boxes (list): layout()で算出した(left, top, right, bottom, ラベル)のリスト
+        
+        Returns:
+            numpy.ndarray: 描画された画像
+        """
+        if not boxes:
+            return image
+        
+        with STAGE_SECONDS.time("render"):
+            polygons = np.array(
+                [(left, top, right, top, right, bottom, left, bottom) for left, top, right, bottom, _ in boxes],
+                dtype=np.int32
+            ).reshape(-1, 4, 2)
+            cv2.polylines(image, list(polygons), True, BOX_COLOR, BOX_THICKNESS)
+            for left, top, _, _, label_text in boxes:
+                cv2.putText(image, label_text, (left + LABEL_OFFSET_X, top + LABEL_OFFSET_Y),
+                            LABEL_FONT, LABEL_FONT_SCALE, TEXT_COLOR, LABEL_THICKNESS)
+        return image
+    
+    def _render(self, image, detections, objclass, scale_x, scale_y):
+        """render()の本体（検出結果が1件以上ある場合）"""
+        # 座標をまとめてスケーリング
+        coords = np.array(
+            [(det['left'], det['top'], det['right'], det['bottom']) for det in detections],
+            dtype=np.float64
+        )
+        coords *= (scale_x, scale_y, scale_x, scale_y)
+        coords = coords.astype(np.int32)
+        
+        # バウンディングボックスを1回の呼び出しで描画
+        polygons = coords[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(image, list(polygons), True, BOX_COLOR, BOX_THICKNESS)
+        
+        image_height, image_width = image.shape[:2]
+        detection_labels = []
+        
+        for det, (left, top, _, _) in zip(detections, coords.tolist()):
+            class_name = self.get_class_name(det['class_id'], objclass)
+            label_text, mask, text_height = self.get_label(class_name, det['score'])
+            detection_labels.append(label_text)
+            
+            # ラベルを貼り付ける領域（画像外にはみ出す部分は切り詰める）
+            x0 = left + LABEL_OFFSET_X
+            y0 = top + LABEL_OFFSET_Y - text_height
+            x1 = min(x0 + mask.shape[1], image_width)
+            y1 = min(y0 + mask.shape[0], image_height)
+            mx0 = max(0, -x0)
+            my0 = max(0, -y0)
+            x0 = max(0, x0)
+            y0 = max(0, y0)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            
+            roi = image[y0:y1, x0:x1]
+            roi[mask[my0:my0 + (y1 - y0), mx0:mx0 + (x1 - x0)]] = TEXT_COLOR
+        
+        return image, detection_labels
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+プロファイラーモジュール
+実行中のアプリケーションのCPU使用状況とメモリ使用量を計測してレポートを出力する
+"""
+
+import os
+import sys
+import signal
+import logging
+import threading
+import cProfile
+import pstats
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# プロファイルのモード（cpu: cProfile, sample: サンプリング, memory: tracemalloc）
+PROFILE_MODES = ("cpu", "sample", "memory")
+
+# レポートの出力先ディレクトリ
+DEFAULT_REPORT_DIR = "profiles"
+
+class SamplingProfiler:
+    """全スレッドのスタックを一定間隔で採取し、フレームグラフ用の集約スタックを作成するプロファイラー"""
+    
+    def __init__(self, interval=0.005, max_depth=64):
+        """
+        サンプリングプロファイラーの初期化
+        
+        Args:
+            interval (float): サンプリング間隔（秒）
+            max_depth (int): 記録するスタックの最大の深さ
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = Counter()
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    @property
+    def is_running(self):
+        """サンプリング中かどうか"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """サンプリングを開始"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """サンプリングを停止"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+    
+    def clear(self):
+        """採取したスタックを破棄"""
+        with self._lock:
+            self._stacks.clear()
+    
+    def _frame_label(self, code):
+        """
+        コードオブジェクトの表示名を取得（キャッシュ付き）
+        
+        Args:
+            code (types.CodeType): コードオブジェクト
+        
+        Returns:
+            str: "関数名 (ファイル名:行番号)"形式の文字列
+        """
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+    
+    def _run(self):
+        """サンプリングスレッドの処理"""
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                samples.append(";".join(reversed(stack)))
+            
+            with self._lock:
+                self._stacks.update(samples)
+    
+    def dump(self, path):
+        """
+        集約スタックをファイルに出力（flamegraph.pl等で読み込める形式）
+        
+        Args:
+            path (str): 出力先のパス
+        
+        Returns:
+            int: 出力したスタックの種類数
+        """
+        with self._lock:
+            stacks = list(self._stacks.items())
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(stacks):
+                f.write(f"{stack} {count}\n")
+        return len(stacks)
+
+class MemoryMonitor:
+    """tracemallocのスナップショットを定期的に採取し、前回との差分を出力するモニター"""
+    
+    def __init__(self, interval_minutes=10, top=25, nframes=1):
+        """
+        メモリモニターの初期化
+        
+        Args:
+            interval_minutes (float): スナップショットを採取する間隔（分、0以下で自動採取しない）
+            top (int): レポートに出力する上位の件数
+            nframes (int): 確保元として記録するスタックの深さ
+        """
+        self.interval_minutes = interval_minutes
+        self.top = top
+        self.nframes = nframes
+        self._previous = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_tracing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def is_running(self):
+        """メモリ計測中かどうか"""
+        return tracemalloc.is_tracing()
+    
+    def start(self, report_path_factory):
+        """
+        メモリ計測を開始
+        
+        Args:
+            report_path_factory (function): レポートの出力先パスを返す関数
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started_tracing = True
+        self._previous = self._take_snapshot()
+        
+        if self.interval_minutes > 0 and self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(report_path_factory,), name="memory-monitor", daemon=True
+            )
+            self._thread.start()
+    
+    def stop(self):
+        """メモリ計測を停止"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._previous = None
+    
+    def _take_snapshot(self):
+        """tracemalloc自身とインポート機構の確保を除いたスナップショットを採取"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+    
+    def _run(self, report_path_factory):
+        """定期採取スレッドの処理"""
+        while not self._stop_event.wait(self.interval_minutes * 60):
+            try:
+                self.snapshot(report_path_factory())
+            except Exception as e:
+                logger.error("メモリスナップショットの出力に失敗しました: %s", e)
+    
+    def snapshot(self, path):
+        """
+        スナップショットを採取し、前回との差分をファイルに出力
+        
+        Args:
+            path (str): 出力先のパス
+        
+        Returns:
+            str: 出力したパス（計測中でない場合はNone）
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        
+        with self._lock:
+            current = self._take_snapshot()
+            previous = self._previous
+            self._previous = current
+        
+        current_size, peak_size = tracemalloc.get_traced_memory()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# traced: {current_size / 1024:.1f} KiB, peak: {peak_size / 1024:.1f} KiB\n")
+            if previous is None:
+                f.write("# top allocations\n")
+                for stat in current.statistics("lineno")[:self.top]:
+                    f.write(f"{stat}\n")
+            else:
+                f.write("# difference from previous snapshot\n")
+                for stat in current.compare_to(previous, "lineno")[:self.top]:
+                    f.write(f"{stat}\n")
+        return path
+
+class ProfilerManager:
+    """cProfile・サンプリング・tracemallocの計測を実行時に切り替えてレポートを出力するマネージャー"""
+    
+    def __init__(self, report_dir=DEFAULT_REPORT_DIR, cpu_duration=30, sample_interval=0.005, memory_interval=10):
+        """
+        プロファイラーマネージャーの初期化
+        
+        Args:
+            report_dir (str): レポートの出力先ディレクトリ
+            cpu_duration (float): cProfileで計測する時間（秒）
+            sample_interval (float): サンプリング間隔（秒）
+            memory_interval (float): メモリスナップショットを採取する間隔（分）
+        """
+        self.report_dir = report_dir
+        self.cpu_duration = cpu_duration
+        self.sampler = SamplingProfiler(interval=sample_interval)
+        self.memory = MemoryMonitor(interval_minutes=memory_interval)
+        self._cpu_profile = None
+        self._scheduler = None
+    
+    def set_scheduler(self, scheduler):
+        """
+        cProfileの計測終了を予約する関数を設定
+        
+        cProfileは開始したスレッドのみを計測し、同じスレッドで停止する必要があるため、
+        Tkのafter()のようにメインスレッドで呼び出しを予約する関数を設定する。
+        
+        Args:
+            scheduler (function): (遅延秒数, コールバック)を受け取る関数
+        """
+        self._scheduler = scheduler
+    
+    def report_path(self, prefix, extension):
+        """
+        タイムスタンプ付きのレポート出力先パスを生成
+        
+        Args:
+            prefix (str): ファイル名の接頭辞
+            extension (str): 拡張子
+        
+        Returns:
+            str: 出力先のパス
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+        return os.path.join(self.report_dir, f"{prefix}-{timestamp}.{extension}")
+    
+    @property
+    def cpu_profiling(self):
+        """cProfileで計測中かどうか"""
+        return self._cpu_profile is not None
+    
+    def start_cpu_profile(self, duration=None):
+        """
+        呼び出したスレッドでcProfileによる計測を開始
+        
+        Args:
+            duration (float, optional): 計測する時間（秒、省略時はcpu_duration）
+        
+        Returns:
+            bool: 計測を開始した場合はTrue（計測中の場合はFalse）
+        """
+        if self._cpu_profile is not None:
+            return False
+        
+        self._cpu_profile = cProfile.Profile()
+        self._cpu_profile.enable()
+        logger.info("CPUプロファイルを開始しました（%s秒）", duration or self.cpu_duration)
+        
+        if self._scheduler is not None:
+            self._scheduler(duration or self.cpu_duration, self.stop_cpu_profile)
+        return True
+    
+    def stop_cpu_profile(self):
+        """
+        cProfileによる計測を停止してレポートを出力
+        
+        Returns:
+            str: 出力したテキストレポートのパス（計測中でない場合はNone）
+        """
+        profile = self._cpu_profile
+        if profile is None:
+            return None
+        profile.disable()
+        self._cpu_profile = None
+        
+        prof_path = self.report_path("cpu", "prof")
+        profile.dump_stats(prof_path)
+        
+        text_path = prof_path[:-len(".prof")] + ".txt"
+        with open(text_path, 'w', encoding='utf-8') as f:
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+        
+        logger.info("CPUプロファイルを出力しました: %s", text_path)
+        return text_path
+    
+    def start_sampling(self):
+        """サンプリングプロファイラーを開始"""
+        self.sampler.start()
+        logger.info("サンプリングプロファイラーを開始しました")
+    
+    def stop_sampling(self):
+        """
+        サンプリングプロファイラーを停止して集約スタックを出力
+        
+        Returns:
+            str: 出力したパス
+        """
+        self.sampler.stop()
+        path = self.dump_sampling()
+        self.sampler.clear()
+        return path
+    
+    def toggle_sampling(self):
+        """
+        サンプリングプロファイラーの開始・停止を切り替え
+        
+        Returns:
+            str: 停止した場合は出力したパス、開始した場合はNone
+        """
+        if self.sampler.is_running:
+            return self.stop_sampling()
+        self.start_sampling()
+        return None
+    
+    def dump_sampling(self):
+        """
+        これまでに採取した集約スタックを出力（サンプリングは継続）
+        
+        Returns:
+            str: 出力したパス
+        """
+        path = self.report_path("stacks", "folded")
+        count = self.sampler.dump(path)
+        logger.info("集約スタックを出力しました: %s（%d種類）", path, count)
+        return path
+    
+    def start_memory(self):
+        """tracemallocによるメモリ計測を開始"""
+        self.memory.start(lambda: self.report_path("memory", "txt"))
+        logger.info("メモリ計測を開始しました")
+    
+    def snapshot_memory(self):
+        """
+        メモリスナップショットを採取して前回との差分を出力（計測中でなければ開始する）
+        
+        Returns:
+            str: 出力したパス（計測を開始した場合はNone）
+        """
+        if not self.memory.is_running:
+            self.start_memory()
+            return None
+        path = self.memory.snapshot(self.report_path("memory", "txt"))
+        logger.info("メモリスナップショットを出力しました: %s", path)
+        return path
+    
+    def dump_reports(self):
+        """
+        計測中のサンプリングとメモリのレポートを出力
+        
+        Returns:
+            list: 出力したパスのリスト
+        """
+        paths = []
+        if self.sampler.is_running:
+            paths.append(self.dump_sampling())
+        if self.memory.is_running:
+            paths.append(self.snapshot_memory())
+        return paths
+    
+    def start(self, modes):
+        """
+        指定されたモードの計測を開始
+        
+        Args:
+            modes (list): PROFILE_MODESのいずれかのリスト
+        """
+        if "sample" in modes:
+            self.start_sampling()
+        if "memory" in modes:
+            self.start_memory()
+        if "cpu" in modes:
+            self.start_cpu_profile()
+    
+    def install_signal_handlers(self):
+        """
+        シグナルによる計測の操作を設定（SIGUSR1: CPUプロファイル開始, SIGUSR2: レポート出力）
+        
+        シグナルハンドラはメインスレッドで実行されるため、cProfileはメインスレッドを計測する。
+        SIGUSR1/SIGUSR2がないプラットフォームでは何もしない。
+        """
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.start_cpu_profile())
+        if hasattr(signal, "SIGUSR2"):
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.dump_reports())
+    
+    def shutdown(self):
+        """全ての計測を停止し、残っているレポートを出力"""
+        self.stop_cpu_profile()
+        if self.sampler.is_running:
+            self.stop_sampling()
+        if self.memory.is_running:
+            self.snapshot_memory()
+            self.memory.stop()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+起動時間計測モジュール
+起動処理のフェーズごとの所要時間とモジュールのインポート時間を記録してレポートを作成する
+"""
+
+import builtins
+import sys
+import threading
+import time
+
+from utils.lazy_import import get_lazy_import_times
+
+class ImportTimer:
+    """
+    起動中のインポート時間を記録するフック（python -X importtime と同様の内訳）
+    
+    builtins.__import__を一時的に置き換え、初めて読み込まれたモジュールごとに
+    自身のインポート時間（self）と依存モジュールを含む時間（cumulative）を記録する。
+    """
+    
+    def __init__(self):
+        """インポートタイマーの初期化"""
+        self.records = []
+        self._original_import = None
+        self._stack = []
+        self._thread_id = None
+    
+    def install(self):
+        """フックを設置（メインスレッドのインポートのみ記録）"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        self._thread_id = threading.get_ident()
+        builtins.__import__ = self._import
+    
+    def uninstall(self):
+        """フックを解除"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+    
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        # 相対インポート・読み込み済みモジュール・他スレッドからのインポートはそのまま処理
+        if level != 0 or name in sys.modules or original is None or threading.get_ident() != self._thread_id:
+            return original(name, globals, locals, fromlist, level)
+        
+        depth = len(self._stack)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.records.append((depth, name, cumulative - children, cumulative))
+    
+    def top(self, limit=15):
+        """
+        インポート時間の長いモジュールを取得
+        
+        Args:
+            limit (int): 取得する件数
+        
+        Returns:
+            list: (モジュール名, self秒, cumulative秒)のリスト（cumulativeの降順）
+        """
+        records = sorted(self.records, key=lambda record: record[3], reverse=True)
+        return [(name, self_time, cumulative) for _, name, self_time, cumulative in records[:limit]]
+
+class StartupTimer:
+    """起動処理のフェーズごとの経過時間を記録するタイマー"""
+    
+    def __init__(self, start_time=None):
+        """
+        起動タイマーの初期化
+        
+        Args:
+            start_time (float, optional): 起動開始時刻（time.perf_counter()の値）
+        """
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.marks = []
+        self.import_timer = ImportTimer()
+    
+    def mark(self, phase):
+        """
+        フェーズの完了時刻を記録
+        
+        Args:
+            phase (str): フェーズ名
+        
+        Returns:
+            float: 起動開始からの経過時間（秒）
+        """
+        elapsed = time.perf_counter() - self.start_time
+        self.marks.append((phase, elapsed))
+        return elapsed
+    
+    def elapsed(self, phase):
+        """
+        記録済みのフェーズの経過時間を取得
+        
+        Args:
+            phase (str): フェーズ名
+        
+        Returns:
+            float: 起動開始からの経過時間（秒）、未記録の場合はNone
+        """
+        for name, elapsed in self.marks:
+            if name == phase:
+                return elapsed
+        return None
+    
+    def report(self, import_limit=15):
+        """
+        起動時間のレポートを作成
+        
+        Args:
+            import_limit (int): 表示するインポートの件数
+        
+        Returns:
+            list: レポートの行のリスト
+        """
+        lines = ["起動時間レポート:"]
+        previous = 0.0
+        for phase, elapsed in self.marks:
+            lines.append(f"  {phase:<24} {elapsed * 1000:9.1f} ms (+{(elapsed - previous) * 1000:.1f} ms)")
+            previous = elapsed
+        
+        top_imports = self.import_timer.top(import_limit)
+        if top_imports:
+            lines.append("  インポート時間（self / cumulative）:")
+            for name, self_time, cumulative in top_imports:
+                lines.append(f"    {name:<32} {self_time * 1000:8.1f} ms / {cumulative * 1000:8.1f} ms")
+        
+        lazy_times = get_lazy_import_times()
+        if lazy_times:
+            lines.append("  遅延インポート:")
+            for name, elapsed in lazy_times.items():
+                lines.append(f"    {name:<32} {elapsed * 1000:8.1f} ms")
+        
+        return lines
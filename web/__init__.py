@@ -0,0 +1,13 @@
+"""
+Webモジュール
+
+ブラウザから監視とコマンドパラメーター設定を行うためのWebサーバーを提供するモジュール
+"""
+
+from web.broadcaster import Broadcaster, ClientQueue
+from web.detection_store import DetectionStore
+from web.frame_encoder import FrameEncoder, EncodedFrame
+from web.mjpeg import MjpegStreamer
+from web.server import WebServer, start_web_server
+
+__all__ = ['Broadcaster', 'ClientQueue', 'DetectionStore', 'FrameEncoder', 'EncodedFrame', 'MjpegStreamer', 'WebServer', 'start_web_server']
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ブロードキャストモジュール
+検出結果とフレームをWebSocket・SSEのクライアントに配信する
+
+メッセージは1回だけエンコードし、同じ文字列・バイト列を全クライアントで共有する。
+クライアントごとのキューは上限を超えると古いメッセージから破棄するため、
+遅いクライアントがいても検出プロセッサの処理は待たされない。
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+from utils import json_backend
+from utils.metrics import WEB_MESSAGES
+from utils.overlay_renderer import OverlayRenderer
+
+logger = logging.getLogger(__name__)
+
+# クライアントごとのキューに保持するメッセージの最大数
+DEFAULT_CLIENT_QUEUE_SIZE = 32
+
+class ClientQueue:
+    """1つのクライアントに配信するメッセージのキュー（上限を超えると古いものから破棄）"""
+    
+    def __init__(self, maxsize=DEFAULT_CLIENT_QUEUE_SIZE, frames=False):
+        """
+        クライアントキューの初期化
+        
+        Args:
+            maxsize (int): 保持するメッセージの最大数
+            frames (bool): フレームを配信するかどうか
+        """
+        self.items = deque(maxlen=maxsize)
+        self.frames = frames
+        self.dropped = 0
+        self.event = asyncio.Event()
+    
+    def put(self, kind, item):
+        """
+        メッセージを追加（イベントループのスレッドから呼ぶ）
+        
+        Args:
+            kind (str): メッセージの種類（"detections", "frame"）
+            item: エンコード済みのメッセージ
+        """
+        if len(self.items) == self.items.maxlen:
+            # 最も古いメッセージはdequeのmaxlenにより破棄される
+            self.dropped += 1
+            WEB_MESSAGES.inc(self.items[0][0], "dropped")
+        self.items.append((kind, item))
+        self.event.set()
+    
+    async def get(self):
+        """
+        次のメッセージを取得（なければ届くまで待機）
+        
+        Returns:
+            tuple: (メッセージの種類, エンコード済みのメッセージ)
+        """
+        while not self.items:
+            self.event.clear()
+            await self.event.wait()
+        return self.items.popleft()
+
+class Broadcaster:
+    """検出プロセッサのリスナーとして検出結果とフレームをクライアントに配信するクラス"""
+    
+    def __init__(self, processor, frame_encoder, queue_size=DEFAULT_CLIENT_QUEUE_SIZE):
+        """
+        ブロードキャスターの初期化
+        
+        Args:
+            processor (DetectionProcessor): 検出結果を提供する検出プロセッサ
+            frame_encoder (FrameEncoder): フレームをエンコードするエンコーダー（MJPEG配信と共有）
+            queue_size (int): クライアントごとのキューの上限
+        """
+        self.processor = processor
+        self.frame_encoder = frame_encoder
+        self.queue_size = queue_size
+        self.loop = None
+        
+        # 接続中のクライアント（イベントループのスレッドでのみ変更）
+        self.clients = set()
+        self.frame_clients = 0
+    
+    def attach(self, loop):
+        """
+        検出プロセッサとフレームエンコーダーに登録
+        
+        Args:
+            loop (asyncio.AbstractEventLoop): クライアントに配信するイベントループ
+        """
+        self.loop = loop
+        self.processor.add_detection_listener(self.on_batch)
+        self.frame_encoder.subscribe(self.on_encoded_frame)
+    
+    def detach(self):
+        """検出プロセッサのリスナーから削除"""
+        self.processor.remove_detection_listener(self.on_batch)
+    
+    def connect(self, frames=False):
+        """
+        クライアントを登録（イベントループのスレッドから呼ぶ）
+        
+        Args:
+            frames (bool): フレームも配信するかどうか
+        
+        Returns:
+            ClientQueue: クライアントのキュー
+        """
+        client = ClientQueue(self.queue_size, frames=frames)
+        self.clients.add(client)
+        if frames:
+            self.frame_clients += 1
+            self.frame_encoder.acquire()
+        return client
+    
+    def disconnect(self, client):
+        """
+        クライアントの登録を解除（イベントループのスレッドから呼ぶ）
+        
+        Args:
+            client (ClientQueue): connectで取得したキュー
+        """
+        if client in self.clients:
+            self.clients.discard(client)
+            if client.frames:
+                self.frame_clients -= 1
+                self.frame_encoder.release()
+            if client.dropped:
+                logger.info("Web client disconnected (%d messages dropped)", client.dropped)
+    
+    def _publish(self, kind, item):
+        """
+        エンコード済みのメッセージを全クライアントのキューに追加（イベントループのスレッドで実行）
+        
+        Args:
+            kind (str): メッセージの種類
+            item: エンコード済みのメッセージ
+        """
+        for client in list(self.clients):
+            if kind == "frame" and not client.frames:
+                continue
+            client.put(kind, item)
+            WEB_MESSAGES.inc(kind, "queued")
+    
+    def _call_in_loop(self, callback, *args):
+        """
+        イベントループのスレッドで関数を実行
+        
+        Args:
+            callback (function): 実行する関数
+            *args: 関数の引数
+        """
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # サーバーの停止後にイベントループが閉じられている
+            pass
+    
+    def on_batch(self, timestamps, batch):
+        """
+        推論結果のバッチを配信（検出プロセッサのリスナー、処理スレッドから呼ばれる）
+        
+        メッセージはフレームごとに[class_id, score, left, top, right, bottom]の配列を持つ
+        コンパクトなJSONで、クラス名はnamesにまとめて含める。
+        
+        Args:
+            timestamps (list): フレームのタイムスタンプのリスト
+            batch (numpy.ndarray): BATCH_DTYPEの配列
+        """
+        if not self.clients or self.loop is None:
+            return
+        
+        frames = [{"t": timestamp, "d": []} for timestamp in timestamps]
+        names = {}
+        objclass = self.processor.objclass
+        for frame, class_id, score, left, top, right, bottom in batch.tolist():
+            frames[frame]["d"].append([class_id, round(score, 4), left, top, right, bottom])
+            if class_id not in names:
+                names[class_id] = OverlayRenderer.get_class_name(class_id, objclass)
+        
+        message = json_backend.dumps({
+            "type": "detections",
+            "device_id": getattr(self.processor.aitrios_client, "device_id", ""),
+            "names": {str(class_id): name for class_id, name in names.items()},
+            "frames": frames
+        })
+        self._call_in_loop(self._publish, "detections", message)
+    
+    def on_encoded_frame(self, frame):
+        """
+        エンコード済みのフレームを配信（フレームエンコーダーの購読者、イベントループのスレッドで呼ばれる）
+        
+        Args:
+            frame (EncodedFrame): エンコード済みのフレーム
+        """
+        if not self.frame_clients:
+            return
+        
+        header = json_backend.dumps({
+            "type": "frame",
+            "device_id": frame.device_id,
+            "frame": frame.frame_id,
+            "labels": frame.labels,
+            "size": len(frame.jpeg)
+        })
+        self._publish("frame", (header, frame.jpeg))
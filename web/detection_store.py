@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+検出結果ストアモジュール
+DetectionProcessorの推論結果のバッチを受け取り、Web APIで参照できるようデバイスごとに保持する
+"""
+
+import threading
+from collections import deque
+
+from utils.overlay_renderer import OverlayRenderer
+
+# デバイスごとに保持する推論結果の数
+DEFAULT_HISTORY_SIZE = 100
+
+class DetectionStore:
+    """デバイスごとの最近の推論結果を保持するストア"""
+    
+    def __init__(self, processor, history_size=DEFAULT_HISTORY_SIZE):
+        """
+        検出結果ストアの初期化
+        
+        Args:
+            processor (DetectionProcessor): 推論結果を受け取る検出プロセッサ
+            history_size (int): デバイスごとに保持する推論結果の数
+        """
+        self.processor = processor
+        self.history_size = history_size
+        self.history = {}
+        # リスナーは処理スレッドから、参照はWebサーバーのスレッドから呼ばれる
+        self.lock = threading.Lock()
+    
+    def attach(self):
+        """検出プロセッサのリスナーとして登録"""
+        self.processor.add_detection_listener(self.on_batch)
+    
+    def detach(self):
+        """検出プロセッサのリスナーから削除"""
+        self.processor.remove_detection_listener(self.on_batch)
+    
+    def get_device_id(self):
+        """
+        検出プロセッサが処理しているデバイスのIDを取得
+        
+        Returns:
+            str: デバイスID
+        """
+        return getattr(self.processor.aitrios_client, "device_id", "") or ""
+    
+    def on_batch(self, timestamps, batch):
+        """
+        推論結果のバッチを保存（検出プロセッサのリスナー）
+        
+        Args:
+            timestamps (list): フレームのタイムスタンプのリスト
+            batch (numpy.ndarray): BATCH_DTYPEの配列
+        """
+        device_id = self.get_device_id()
+        objclass = self.processor.objclass
+        
+        # フレームごとに検出結果をまとめる（配列はフレーム順に並んでいる）
+        frames = [[] for _ in timestamps]
+        for row in batch.tolist():
+            frame, class_id, score, left, top, right, bottom = row
+            frames[frame].append({
+                "class_id": class_id,
+                "class_name": OverlayRenderer.get_class_name(class_id, objclass),
+                "score": round(score, 4),
+                "left": left,
+                "top": top,
+                "right": right,
+                "bottom": bottom
+            })
+        
+        records = [
+            {"device_id": device_id, "timestamp": timestamp, "detections": detections}
+            for timestamp, detections in zip(timestamps, frames)
+        ]
+        
+        with self.lock:
+            history = self.history.get(device_id)
+            if history is None:
+                history = self.history[device_id] = deque(maxlen=self.history_size)
+            history.extend(records)
+    
+    def get_devices(self):
+        """
+        推論結果を保持しているデバイスの一覧を取得
+        
+        Returns:
+            list: デバイスIDと最新のタイムスタンプを持つ辞書のリスト
+        """
+        with self.lock:
+            return [
+                {"device_id": device_id, "latest_timestamp": history[-1]["timestamp"] if history else None}
+                for device_id, history in self.history.items()
+            ]
+    
+    def get_latest(self, device_id):
+        """
+        デバイスの最新の推論結果を取得
+        
+        Args:
+            device_id (str): デバイスID
+        
+        Returns:
+            dict: 推論結果（なければNone）
+        """
+        with self.lock:
+            history = self.history.get(device_id)
+            return history[-1] if history else None
+    
+    def get_history(self, device_id, since=None, limit=None):
+        """
+        デバイスの最近の推論結果を古い順に取得
+        
+        Args:
+            device_id (str): デバイスID
+            since (str, optional): このタイムスタンプより新しい推論結果のみを返す
+            limit (int, optional): 返す推論結果の最大数（新しいものを優先）
+        
+        Returns:
+            list: 推論結果のリスト
+        """
+        with self.lock:
+            records = list(self.history.get(device_id, ()))
+        
+        if since:
+            records = [record for record in records if record["timestamp"] > since]
+        if limit is not None and limit >= 0:
+            records = records[-limit:] if limit else []
+        return records
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+フレームエンコーダーモジュール
+検出プロセッサが表示したフレームをJPEGに1回だけエンコードし、WebSocket・MJPEGの配信で共有する
+"""
+
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+
+from utils.image_utils import encode_jpeg
+from utils.metrics import WEB_MESSAGES, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 配信するフレームのJPEG品質
+DEFAULT_JPEG_QUALITY = 80
+
+# フレームをエンコードする最大頻度（1秒あたりの回数）
+DEFAULT_MAX_FPS = 10
+
+# エンコード済みのフレーム（jpegは全クライアントで共有するバイト列）
+EncodedFrame = namedtuple("EncodedFrame", ["device_id", "frame_id", "labels", "jpeg", "sequence"])
+
+def frame_id(frame_key):
+    """
+    フレームの識別キーから配信用のIDを取得
+    
+    Args:
+        frame_key (tuple): フレームの識別キー（画像名, 推論結果の有無）
+    
+    Returns:
+        str: 画像名、または推論結果のみのフレームのタイムスタンプ
+    """
+    name = frame_key[0]
+    if isinstance(name, tuple):
+        return str(name[-1])
+    return str(name)
+
+class FrameEncoder:
+    """表示したフレームをJPEGにエンコードして購読者に通知するクラス"""
+    
+    def __init__(self, processor, jpeg_quality=DEFAULT_JPEG_QUALITY, max_fps=DEFAULT_MAX_FPS):
+        """
+        フレームエンコーダーの初期化
+        
+        Args:
+            processor (DetectionProcessor): フレームを提供する検出プロセッサ
+            jpeg_quality (int): JPEGの品質
+            max_fps (float): エンコードする最大頻度（0以下で制限なし）
+        """
+        self.processor = processor
+        self.jpeg_quality = jpeg_quality
+        self.max_fps = max_fps
+        self.loop = None
+        
+        # エンコード済みのフレームを受け取る関数（イベントループのスレッドで呼ばれる）
+        self.subscribers = []
+        
+        # フレームを必要としているクライアントの数（0の場合はエンコードしない）
+        self.consumers = 0
+        
+        # エンコード待ちの最新フレーム（エンコード中に届いたフレームは最新のもので上書き）
+        self._lock = threading.Lock()
+        self._pending_frame = None
+        self._encoding = False
+        self._last_encode_time = None
+        self._sequence = 0
+    
+    def attach(self, loop):
+        """
+        検出プロセッサのリスナーとして登録
+        
+        Args:
+            loop (asyncio.AbstractEventLoop): エンコードと通知を行うイベントループ
+        """
+        self.loop = loop
+        self.processor.add_frame_listener(self.on_frame)
+    
+    def detach(self):
+        """検出プロセッサのリスナーから削除"""
+        self.processor.remove_frame_listener(self.on_frame)
+    
+    def subscribe(self, callback):
+        """
+        エンコード済みのフレームを受け取る関数を登録
+        
+        Args:
+            callback (function): EncodedFrameを引数に取る関数
+        """
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+    
+    def acquire(self):
+        """フレームを必要とするクライアントを追加（イベントループのスレッドから呼ぶ）"""
+        self.consumers += 1
+    
+    def release(self):
+        """フレームを必要とするクライアントを削除（イベントループのスレッドから呼ぶ）"""
+        self.consumers = max(0, self.consumers - 1)
+    
+    def on_frame(self, frame_key, image, detection_labels):
+        """
+        表示したフレームを受け取る（検出プロセッサのリスナー、処理スレッドから呼ばれる）
+        
+        JPEGエンコードはイベントループのスレッドプールで行い、処理スレッドでは待たない。
+        
+        Args:
+            frame_key (tuple): フレームの識別キー
+            image (numpy.ndarray): バウンディングボックスを描画した画像
+            detection_labels (list): 検出ラベルのリスト
+        """
+        if not self.consumers or self.loop is None:
+            return
+        
+        device_id = getattr(self.processor.aitrios_client, "device_id", "")
+        with self._lock:
+            if self._pending_frame is not None:
+                WEB_MESSAGES.inc("frame", "superseded")
+            self._pending_frame = (frame_key, image, list(detection_labels), device_id)
+            if self._encoding:
+                return
+            self._encoding = True
+        
+        try:
+            self.loop.call_soon_threadsafe(self._start_encoding)
+        except RuntimeError:
+            # サーバーの停止後にイベントループが閉じられている
+            pass
+    
+    def _start_encoding(self):
+        """フレームのエンコードを開始（イベントループのスレッドで実行）"""
+        self.loop.create_task(self._encode_frames())
+    
+    async def _encode_frames(self):
+        """エンコード待ちのフレームがなくなるまで、最大頻度を守ってエンコードして通知"""
+        while True:
+            # 前回のエンコードから間隔を空ける（待機中に届いたフレームは最新のもので上書きされる）
+            if self.max_fps and self.max_fps > 0 and self._last_encode_time is not None:
+                delay = self._last_encode_time + 1.0 / self.max_fps - self.loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            
+            with self._lock:
+                pending = self._pending_frame
+                self._pending_frame = None
+                if pending is None:
+                    self._encoding = False
+                    return
+            
+            frame_key, image, detection_labels, device_id = pending
+            self._last_encode_time = self.loop.time()
+            try:
+                jpeg = await self.loop.run_in_executor(None, self._encode, image)
+            except Exception as e:
+                logger.error("Failed to encode frame for web clients: %s", e)
+                continue
+            if jpeg is None:
+                continue
+            
+            self._sequence += 1
+            frame = EncodedFrame(device_id, frame_id(frame_key), detection_labels, jpeg, self._sequence)
+            for callback in list(self.subscribers):
+                try:
+                    callback(frame)
+                except Exception:
+                    logger.exception("フレームの配信でエラーが発生しました")
+    
+    def _encode(self, image):
+        """
+        フレームをJPEGにエンコード（スレッドプールで実行）
+        
+        Args:
+            image (numpy.ndarray): エンコードする画像
+        
+        Returns:
+            bytes: JPEGのバイト列
+        """
+        with STAGE_SECONDS.time("web_encode"):
+            return encode_jpeg(image, self.jpeg_quality)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MJPEG配信モジュール
+バウンディングボックスを描画したフレームをmultipart/x-mixed-replaceで配信する（NVRや簡易ビューアー向け）
+"""
+
+import asyncio
+
+# multipartの境界文字列
+MJPEG_BOUNDARY = "kumadtframe"
+
+class MjpegStreamer:
+    """デバイスごとの最新フレームを保持し、MJPEGの視聴者に通知するクラス"""
+    
+    def __init__(self, frame_encoder):
+        """
+        MJPEG配信の初期化
+        
+        Args:
+            frame_encoder (FrameEncoder): フレームをエンコードするエンコーダー（WebSocket配信と共有）
+        """
+        self.frame_encoder = frame_encoder
+        self.latest = {}
+        self._events = {}
+        self.viewers = 0
+    
+    def attach(self):
+        """フレームエンコーダーに登録"""
+        self.frame_encoder.subscribe(self.on_encoded_frame)
+    
+    def on_encoded_frame(self, frame):
+        """
+        エンコード済みのフレームを保存して待機中の視聴者を起こす（イベントループのスレッドで呼ばれる）
+        
+        Args:
+            frame (EncodedFrame): エンコード済みのフレーム
+        """
+        self.latest[frame.device_id] = frame
+        event = self._events.pop(frame.device_id, None)
+        if event is not None:
+            event.set()
+    
+    async def next_frame(self, device_id, after=0):
+        """
+        指定した番号より新しいフレームを取得（なければ届くまで待機）
+        
+        Args:
+            device_id (str): デバイスID
+            after (int): 前回送信したフレームの番号
+        
+        Returns:
+            EncodedFrame: エンコード済みのフレーム
+        """
+        while True:
+            frame = self.latest.get(device_id)
+            if frame is not None and frame.sequence > after:
+                return frame
+            event = self._events.get(device_id)
+            if event is None:
+                event = self._events[device_id] = asyncio.Event()
+            await event.wait()
+    
+    async def stream(self, response, device_id, max_fps):
+        """
+        フレームをmultipartのパートとして書き込み続ける（接続が切れるまで）
+        
+        同じJPEGのバイト列をすべての視聴者にそのまま書き込み、視聴者ごとに再エンコードしない。
+        
+        Args:
+            response (aiohttp.web.StreamResponse): 準備済みのレスポンス
+            device_id (str): デバイスID
+            max_fps (float): 送信する最大頻度（0以下で制限なし）
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0
+        last_sent = None
+        sequence = 0
+        
+        self.viewers += 1
+        self.frame_encoder.acquire()
+        try:
+            while True:
+                frame = await self.next_frame(device_id, sequence)
+                
+                # 最大頻度を超えないよう待機し、待機中に届いた最新のフレームを送る
+                if interval and last_sent is not None:
+                    delay = last_sent + interval - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        frame = self.latest.get(device_id, frame)
+                
+                await response.write(
+                    f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(frame.jpeg)}\r\n\r\n".encode("ascii")
+                )
+                await response.write(frame.jpeg)
+                await response.write(b"\r\n")
+                last_sent = loop.time()
+                sequence = frame.sequence
+        finally:
+            self.viewers -= 1
+            self.frame_encoder.release()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Webサーバーモジュール
+templates/とstatic/のWeb UIを配信し、コマンドパラメーターと検出結果のAPIを提供する
+
+複数の利用者が1つのプロセス（1つのAPIトークンと1つのポーリング処理）を共有できるよう、
+aiohttpのサーバーを専用のイベントループでデーモンスレッドとして実行する。
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+from utils import json_backend
+from web.broadcaster import Broadcaster
+from web.frame_encoder import FrameEncoder, DEFAULT_MAX_FPS
+from web.mjpeg import MjpegStreamer, MJPEG_BOUNDARY
+from web.detection_store import DetectionStore
+
+logger = logging.getLogger(__name__)
+
+# Webサーバーのデフォルトのポート
+DEFAULT_WEB_PORT = 8080
+
+# 配信するテンプレートと静的ファイルのディレクトリ
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT_DIR, "templates")
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+
+def is_same_origin(request):
+    """
+    リクエストのOriginヘッダーがサーバーのホストと一致するかどうか
+    
+    Args:
+        request (aiohttp.web.Request): リクエスト
+    
+    Returns:
+        bool: Originヘッダーがない場合（ブラウザ以外のクライアント）と、ホストが一致する場合はTrue
+    """
+    origin = request.headers.get("Origin")
+    if origin is None:
+        return True
+    return urlsplit(origin).netloc == request.host
+
+def json_response(data, status=200):
+    """
+    JSONバックエンドでシリアライズしたレスポンスを作成
+    
+    Args:
+        data: レスポンスのオブジェクト
+        status (int): HTTPステータス
+    
+    Returns:
+        aiohttp.web.Response: レスポンス
+    """
+    return web.json_response(data, status=status, dumps=json_backend.dumps)
+
+class WebServer:
+    """Web UIとAPIを提供するサーバー"""
+    
+    def __init__(self, processor, command_param_manager, host="127.0.0.1", port=DEFAULT_WEB_PORT, max_fps=DEFAULT_MAX_FPS):
+        """
+        Webサーバーの初期化
+        
+        Args:
+            processor (DetectionProcessor): 検出結果を提供する検出プロセッサ
+            command_param_manager (CommandParameterManager): コマンドパラメーター管理
+            host (str): 待ち受けるアドレス（デフォルトはローカルのみ）
+            port (int): 待ち受けるポート番号
+            max_fps (float): フレームを配信する最大頻度（1秒あたりの回数、0以下で制限なし）
+        """
+        self.processor = processor
+        self.command_param_manager = command_param_manager
+        self.host = host
+        self.port = port
+        self.store = DetectionStore(processor)
+        self.max_fps = max_fps
+        
+        # フレームは1回だけエンコードし、WebSocketとMJPEGの配信で共有する
+        self.frame_encoder = FrameEncoder(processor, max_fps=max_fps)
+        self.broadcaster = Broadcaster(processor, self.frame_encoder)
+        self.mjpeg = MjpegStreamer(self.frame_encoder)
+        
+        # サーバー専用のイベントループとスレッド
+        self.loop = None
+        self.thread = None
+        self.runner = None
+    
+    def create_app(self):
+        """
+        aiohttpのアプリケーションを作成
+        
+        Returns:
+            aiohttp.web.Application: ルーティングを設定したアプリケーション
+        """
+        app = web.Application()
+        app.router.add_get("/", self.handle_index)
+        app.router.add_get("/api/command_parameters/{device_id}", self.handle_get_command_parameters)
+        app.router.add_post("/api/command_parameters/{device_id}", self.handle_post_command_parameters)
+        app.router.add_get("/api/devices", self.handle_get_devices)
+        app.router.add_get("/api/detections/{device_id}", self.handle_get_detections)
+        app.router.add_get("/api/detections/{device_id}/latest", self.handle_get_latest_detection)
+        app.router.add_get("/ws", self.handle_websocket)
+        app.router.add_get("/api/events", self.handle_events)
+        app.router.add_get("/mjpeg/{device_id}", self.handle_mjpeg)
+        if os.path.isdir(STATIC_DIR):
+            app.router.add_static("/static/", STATIC_DIR)
+        return app
+    
+    def start(self):
+        """
+        サーバーをデーモンスレッドで起動（待ち受けを開始するまで待機）
+        
+        Raises:
+            OSError: ポートを待ち受けできない場合
+        """
+        started = threading.Event()
+        errors = []
+        
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.frame_encoder.attach(self.loop)
+            self.broadcaster.attach(self.loop)
+            self.mjpeg.attach()
+            try:
+                self.loop.run_until_complete(self._start_site())
+            except Exception as e:
+                errors.append(e)
+                self.frame_encoder.detach()
+                self.broadcaster.detach()
+                started.set()
+                self.loop.close()
+                return
+            started.set()
+            try:
+                self.loop.run_forever()
+            finally:
+                self.loop.run_until_complete(self._cleanup())
+                self.loop.close()
+        
+        self.store.attach()
+        self.thread = threading.Thread(target=run, name="web-server", daemon=True)
+        self.thread.start()
+        started.wait()
+        if errors:
+            self.store.detach()
+            raise errors[0]
+    
+    async def _start_site(self):
+        """アプリケーションを作成して待ち受けを開始"""
+        self.runner = web.AppRunner(self.create_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+    
+    async def _cleanup(self):
+        """待ち受けを終了して接続を閉じる"""
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        
+        # このループで作成したAPIクライアントのHTTPセッションを閉じる
+        for client in {self.processor.aitrios_client, self.command_param_manager.aitrios_client}:
+            await client.close_session()
+    
+    def shutdown(self, timeout=5.0):
+        """
+        サーバーを停止
+        
+        Args:
+            timeout (float): スレッドの終了を待つ最大時間（秒）
+        """
+        self.store.detach()
+        self.frame_encoder.detach()
+        self.broadcaster.detach()
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout)
+    
+    async def handle_index(self, request):
+        """
+        Web UIのページを返す
+        
+        index.htmlはモーダルの断片のため、スクリプトとスタイルを読み込むlayout.htmlに埋め込んで返す。
+        """
+        layout_path = os.path.join(TEMPLATE_DIR, "layout.html")
+        content_path = os.path.join(TEMPLATE_DIR, "index.html")
+        if not os.path.exists(layout_path) or not os.path.exists(content_path):
+            raise web.HTTPNotFound()
+        with open(layout_path, "r", encoding="utf-8") as f:
+            layout = f.read()
+        with open(content_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return web.Response(text=layout.replace("<!-- content -->", content, 1), content_type="text/html", charset="utf-8")
+    
+    async def handle_get_command_parameters(self, request):
+        """
+        デバイスにバインドされているコマンドパラメーターを返す
+        
+        Returns:
+            aiohttp.web.Response: success, bound_file, parameters, messageを持つJSON
+        """
+        device_id = request.match_info["device_id"]
+        try:
+            bound_file, bound_info = await self.command_param_manager.get_parameter_file_for_device(device_id)
+        except Exception as e:
+            logger.error("Error getting command parameters for %s: %s", device_id, e)
+            return json_response({"success": False, "bound_file": None, "parameters": None, "message": f"エラー: {str(e)}"}, status=500)
+        
+        if not bound_file:
+            return json_response({
+                "success": True,
+                "bound_file": None,
+                "parameters": None,
+                "message": f"デバイス {device_id} にバインドされたパラメーターファイルがありません"
+            })
+        
+        return json_response({
+            "success": True,
+            "bound_file": bound_file,
+            "parameters": bound_info.get("parameter", {}),
+            "message": ""
+        })
+    
+    async def handle_post_command_parameters(self, request):
+        """
+        デバイスにコマンドパラメーターを適用
+        
+        デスクトップアプリと同様に、適用後はこのプロセスが監視しているデバイスの推論を停止する。
+        クエリのforce=1を指定すると、変更がなくてもデバイスを再設定する。
+        
+        他のサイトのページから送られたリクエストでデバイスを操作されないよう、Content-Typeは
+        application/jsonのみ受け付け（クロスオリジンではプリフライトが必要になり、このサーバーは応答しない）、
+        別のオリジンからのリクエストは拒否する。
+        
+        Returns:
+            aiohttp.web.Response: success, message, skipped, changesを持つJSON
+        """
+        device_id = request.match_info["device_id"]
+        if not is_same_origin(request):
+            return json_response({"success": False, "message": "別のオリジンからのリクエストは受け付けません"}, status=403)
+        if request.content_type != "application/json":
+            return json_response({"success": False, "message": "Content-Typeにはapplication/jsonを指定してください"}, status=415)
+        try:
+            parameters = json_backend.loads(await request.read())
+        except ValueError as e:
+            return json_response({"success": False, "message": f"JSONの解析に失敗しました: {e}"}, status=400)
+        if not isinstance(parameters, dict) or not isinstance(parameters.get("commands"), list):
+            return json_response({"success": False, "message": "commandsを含むパラメーターを指定してください"}, status=400)
+        
+        # 適用は途中で中断するとデバイスの状態が不整合になるため、接続が切れても完了させる
+        try:
+            result = await asyncio.shield(self.command_param_manager.apply_parameters(
+                device_id, parameters, force=request.query.get("force") in ("1", "true")
+            ))
+        except Exception as e:
+            logger.error("Error applying command parameters to %s: %s", device_id, e)
+            return json_response({"success": False, "message": f"エラー: {str(e)}"}, status=500)
+        
+        response = {
+            "success": result["success"],
+            "message": result["message"],
+            "skipped": result.get("skipped", False),
+            "changes": result.get("changes", [])
+        }
+        
+        # 変更を適用した場合は推論を停止する（監視画面で再開する）
+        client = self.processor.aitrios_client
+        if result["success"] and not response["skipped"] and device_id == getattr(client, "device_id", None):
+            try:
+                await client.stop_inference()
+                response["message"] += "。推論を停止しました。監視画面で推論を再開させてください"
+            except Exception as e:
+                logger.warning("Failed to stop inference after applying parameters: %s", e)
+                response["message"] += f"。推論の停止に失敗しました: {e}"
+        
+        return json_response(response)
+    
+    async def handle_get_devices(self, request):
+        """
+        推論結果を保持しているデバイスの一覧を返す
+        
+        Returns:
+            aiohttp.web.Response: devicesを持つJSON
+        """
+        devices = self.store.get_devices()
+        device_id = self.store.get_device_id()
+        if device_id and all(device["device_id"] != device_id for device in devices):
+            devices.append({"device_id": device_id, "latest_timestamp": None})
+        return json_response({"devices": devices})
+    
+    async def handle_get_detections(self, request):
+        """
+        デバイスの最近の推論結果を返す（クエリのsinceとlimitで絞り込み）
+        
+        Returns:
+            aiohttp.web.Response: device_idとdetections（推論結果のリスト）を持つJSON
+        """
+        device_id = request.match_info["device_id"]
+        since = request.query.get("since")
+        try:
+            limit = int(request.query["limit"]) if "limit" in request.query else None
+        except ValueError:
+            return json_response({"success": False, "message": "limitには整数を指定してください"}, status=400)
+        
+        records = self.store.get_history(device_id, since=since, limit=limit)
+        return json_response({"device_id": device_id, "detections": records})
+    
+    async def handle_get_latest_detection(self, request):
+        """
+        デバイスの最新の推論結果を返す
+        
+        Returns:
+            aiohttp.web.Response: 推論結果のJSON（まだない場合は404）
+        """
+        device_id = request.match_info["device_id"]
+        record = self.store.get_latest(device_id)
+        if record is None:
+            return json_response({"success": False, "message": f"デバイス {device_id} の推論結果はまだありません"}, status=404)
+        return json_response(record)
+    
+    async def handle_websocket(self, request):
+        """
+        検出結果（とクエリのframes=1でフレーム）をWebSocketで配信
+        
+        検出結果はテキストメッセージのJSONで送る。フレームはJSONのヘッダー（type=frame）の
+        テキストメッセージに続けて、JPEGのバイナリメッセージで送る。
+        
+        Returns:
+            aiohttp.web.WebSocketResponse: WebSocketのレスポンス
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        
+        client = self.broadcaster.connect(frames=request.query.get("frames") == "1")
+        
+        async def send_messages():
+            while True:
+                kind, item = await client.get()
+                if kind == "frame":
+                    header, jpeg = item
+                    await ws.send_str(header)
+                    await ws.send_bytes(jpeg)
+                else:
+                    await ws.send_str(item)
+        
+        sender = asyncio.ensure_future(send_messages())
+        try:
+            # クライアントからのメッセージは使用しない（切断の検出のみ）
+            async for _ in ws:
+                if sender.done():
+                    break
+        finally:
+            sender.cancel()
+            self.broadcaster.disconnect(client)
+        return ws
+    
+    async def handle_events(self, request):
+        """
+        検出結果をServer-Sent Eventsで配信（フレームはWebSocketのみ）
+        
+        Returns:
+            aiohttp.web.StreamResponse: text/event-streamのレスポンス
+        """
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache"
+        })
+        await response.prepare(request)
+        
+        client = self.broadcaster.connect(frames=False)
+        try:
+            while True:
+                kind, item = await client.get()
+                await response.write(f"event: {kind}\ndata: {item}\n\n".encode("utf-8"))
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.broadcaster.disconnect(client)
+        return response
+    
+    async def handle_mjpeg(self, request):
+        """
+        デバイスのフレームをMJPEG（multipart/x-mixed-replace）で配信
+        
+        クエリのfpsで視聴者ごとの最大頻度をさらに下げられる（サーバーの最大頻度は超えない）。
+        
+        Returns:
+            aiohttp.web.StreamResponse: multipart/x-mixed-replaceのレスポンス
+        """
+        device_id = request.match_info["device_id"]
+        if device_id != self.store.get_device_id() and device_id not in self.mjpeg.latest:
+            raise web.HTTPNotFound(text=f"Unknown device: {device_id}")
+        
+        max_fps = self.max_fps
+        if "fps" in request.query:
+            try:
+                fps = float(request.query["fps"])
+            except ValueError:
+                raise web.HTTPBadRequest(text="fps must be a number")
+            if fps > 0 and (not max_fps or max_fps <= 0 or fps < max_fps):
+                max_fps = fps
+        
+        response = web.StreamResponse(headers={
+            "Content-Type": f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+            "Cache-Control": "no-cache, no-store",
+            "Pragma": "no-cache"
+        })
+        await response.prepare(request)
+        try:
+            await self.mjpeg.stream(response, device_id, max_fps)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+def start_web_server(processor, command_param_manager, port=DEFAULT_WEB_PORT, host="127.0.0.1", max_fps=DEFAULT_MAX_FPS):
+    """
+    Webサーバーをデーモンスレッドで起動
+    
+    Args:
+        processor (DetectionProcessor): 検出結果を提供する検出プロセッサ
+        command_param_manager (CommandParameterManager): コマンドパラメーター管理
+        port (int): 待ち受けるポート番号
+        host (str): 待ち受けるアドレス（デフォルトはローカルのみ）
+        max_fps (float): フレームを配信する最大頻度（1秒あたりの回数、0以下で制限なし）
+    
+    Returns:
+        WebServer: 起動したサーバー（停止はshutdown()）
+    """
+    server = WebServer(processor, command_param_manager, host=host, port=port, max_fps=max_fps)
+    server.start()
+    return server